@@ -1,20 +1,31 @@
 from .nodes.volcengine_seedream_v3 import VolcengineSeeDreamV3Node
-from .nodes.volcengine_i2v_s2pro import VolcengineI2VS2Pro
+from .nodes.volcengine_i2v_s2pro import VolcengineI2VS2Pro, VolcengineI2VS2ProSubmit
 from .nodes.volcengine_img_edit_v3 import VolcengineImgEditV3
-from .nodes.volcengine_doubao_seedance import VolcengineDoubaoSeedance
+from .nodes.volcengine_doubao_seedance import VolcengineDoubaoSeedance, VolcengineDoubaoSeedanceSubmit
+from .nodes.volcengine_task_collect import VolcengineTaskCollect
+from .utils import metrics
+
+# 注册 /jm_volcengine/metrics 指标端点（及可选的 JSON 定时导出）
+metrics.setup()
 
 NODE_CLASS_MAPPINGS = {
     "volcengine-seedream-v3": VolcengineSeeDreamV3Node,
     "volcengine-i2v-s2pro": VolcengineI2VS2Pro,
     "volcengine-img-edit-v3": VolcengineImgEditV3,
-    "volcengine-doubao-seedance": VolcengineDoubaoSeedance
+    "volcengine-doubao-seedance": VolcengineDoubaoSeedance,
+    "volcengine-i2v-s2pro-submit": VolcengineI2VS2ProSubmit,
+    "volcengine-doubao-seedance-submit": VolcengineDoubaoSeedanceSubmit,
+    "volcengine-task-collect": VolcengineTaskCollect
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
     "volcengine-seedream-v3": "Volcengine SeeDream V3",
     "volcengine-i2v-s2pro": "Volcengine I2V S2.0Pro",
     "volcengine-img-edit-v3": "Volcengine Img Edit V3.0",
-    "volcengine-doubao-seedance": "Volcengine Doubao Seedance"
+    "volcengine-doubao-seedance": "Volcengine Doubao Seedance",
+    "volcengine-i2v-s2pro-submit": "Volcengine I2V S2.0Pro Submit",
+    "volcengine-doubao-seedance-submit": "Volcengine Doubao Seedance Submit",
+    "volcengine-task-collect": "Volcengine Task Collect"
 }
 
 __all__ = ['NODE_CLASS_MAPPINGS', 'NODE_DISPLAY_NAME_MAPPINGS'] 
\ No newline at end of file
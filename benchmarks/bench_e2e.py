@@ -0,0 +1,175 @@
+"""
+端到端吞吐基准：在进程内启动 benchmarks/mock_server.py，按不同并发度调用各节点
+
+每个节点、每个并发度报告 requests/s、端到端延迟 p50/p95/p99 以及 tracemalloc 峰值内存。
+请求使用不同的提示词并关闭结果缓存，任务日志也被关闭，测量的是完整的提交-轮询-下载-保存路径。
+
+需要 ComfyUI 的运行环境（torch、numpy、Pillow、requests）；不在 ComfyUI 中运行时输出写入临时目录。
+
+用法（在插件根目录执行）:
+    python benchmarks/bench_e2e.py [--nodes seedream,img_edit,i2v,seedance] [--concurrency 1,4,16] [--requests 32]
+"""
+import argparse
+import importlib.util
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import mock_server
+
+PLUGIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+PACKAGE = "jm_volcengine_api"
+
+
+def load_plugin(endpoint):
+    """把服务地址指向模拟服务后以包的形式加载插件（配置在导入时读取，必须先设置环境变量）"""
+    os.environ["JM_VOLCENGINE_VISUAL_ENDPOINT"] = endpoint
+    os.environ["JM_VOLCENGINE_ARK_ENDPOINT"] = endpoint
+    os.environ.setdefault("JM_VOLCENGINE_JOURNAL_ENABLED", "0")
+    os.environ.setdefault("JM_VOLCENGINE_LOG_LEVEL", "WARNING")
+
+    if "folder_paths" not in sys.modules:
+        try:
+            import folder_paths  # noqa: F401
+        except ImportError:
+            output_dir = tempfile.mkdtemp(prefix="jm_volcengine_bench_")
+            folder_paths = types.ModuleType("folder_paths")
+            folder_paths.output_directory = output_dir
+            folder_paths.get_output_directory = lambda: output_dir
+            sys.modules["folder_paths"] = folder_paths
+
+    spec = importlib.util.spec_from_file_location(
+        PACKAGE, os.path.join(PLUGIN_DIR, "__init__.py"), submodule_search_locations=[PLUGIN_DIR])
+    plugin = importlib.util.module_from_spec(spec)
+    sys.modules[PACKAGE] = plugin
+    spec.loader.exec_module(plugin)
+
+    # 模拟任务几秒内完成，缩短轮询间隔，避免测到的是默认的首次等待
+    polling = importlib.import_module(f"{PACKAGE}.utils.polling")
+    polling.IMAGE_POLICY = polling.PollingPolicy(first_delay=0.1, interval=0.1, max_interval=0.5, deadline=120.0)
+    polling.VIDEO_POLICY = polling.PollingPolicy(first_delay=0.1, interval=0.2, max_interval=1.0, deadline=300.0)
+    return plugin
+
+
+def make_image(width=1024, height=1024):
+    import torch
+    return torch.rand(1, height, width, 3)
+
+
+def node_calls(plugin):
+    """节点名 -> 以序号为参数的调用函数"""
+    mappings = plugin.NODE_CLASS_MAPPINGS
+    image = make_image()
+    seedream = mappings["volcengine-seedream-v3"]()
+    img_edit = mappings["volcengine-img-edit-v3"]()
+    i2v = mappings["volcengine-i2v-s2pro"]()
+    seedance = mappings["volcengine-doubao-seedance"]()
+    return {
+        "seedream": lambda i: seedream.generate_image(
+            "ak", "sk", f"bench prompt {i}", False, i, 2.5, "1:1", True, "bench_seedream", 1, "off"),
+        "img_edit": lambda i: img_edit.edit_image(
+            "ak", "sk", image, f"bench prompt {i}", 0.5, i, "bench_img_edit", True, "off"),
+        "i2v": lambda i: i2v.generate_video(
+            "ak", "sk", image, "16:9", f"bench prompt {i}", i, True, "bench_i2v", "off"),
+        "seedance": lambda i: seedance.generate_video(
+            "ak", "doubao-seedance-1-0-pro-250528", f"bench prompt {i}", image, None, "720p", "adaptive",
+            5, 24, False, i, False, True, "bench_seedance", "off"),
+    }
+
+
+def succeeded(result):
+    """
+    节点以字符串返回错误信息，出现错误字样或全部字符串输出为空视为失败
+
+    OUTPUT_IS_LIST 的输出（如 I2V 的逐帧列表）要求每个元素都非空且不含错误信息
+    """
+    texts = [item for item in result if isinstance(item, str)]
+    lists = [item for item in result if isinstance(item, list)]
+    items = texts + [item for values in lists for item in values]
+    if any(isinstance(item, str) and ("错误" in item or "失败" in item) for item in items):
+        return False
+    if lists:
+        return all(values and all(values) for values in lists)
+    return any(texts)
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return float("nan")
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_level(call, concurrency, total):
+    latencies = []
+    failures = 0
+    lock = threading.Lock()
+
+    def one(index):
+        nonlocal failures
+        start = time.perf_counter()
+        ok = succeeded(call(index))
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            failures += not ok
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    wall = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "rps": total / wall,
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "peak_mb": peak / 1024 / 1024,
+        "failures": failures,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="节点端到端吞吐基准")
+    parser.add_argument("--nodes", default="seedream,img_edit,i2v,seedance")
+    parser.add_argument("--concurrency", default="1,4,16")
+    parser.add_argument("--requests", type=int, default=32, help="每个并发度的请求数")
+    parser.add_argument("--latency", default="fixed:0.02")
+    parser.add_argument("--queue-time", default="uniform:0.2,0.5")
+    parser.add_argument("--run-time", default="uniform:0.5,1.5")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--video-mb", type=float, default=4.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    config = mock_server.MockConfig(latency=args.latency, queue_time=args.queue_time, run_time=args.run_time,
+                                    error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+                                    video_bytes=int(args.video_mb * 1024 * 1024), drop_rate=args.drop_rate)
+    server = mock_server.MockServer(config).start()
+    try:
+        calls = node_calls(load_plugin(server.url))
+        print(f"mock server: {server.url}")
+        print(f"{'node':<10}{'conc':>6}{'req/s':>9}{'p50 s':>9}{'p95 s':>9}{'p99 s':>9}{'peak MB':>10}{'fail':>6}")
+        for name in args.nodes.split(","):
+            for concurrency in (int(c) for c in args.concurrency.split(",")):
+                r = run_level(calls[name], concurrency, max(args.requests, concurrency))
+                print(f"{name:<10}{concurrency:>6}{r['rps']:>9.2f}{r['p50']:>9.3f}{r['p95']:>9.3f}"
+                      f"{r['p99']:>9.3f}{r['peak_mb']:>10.1f}{r['failures']:>6}")
+        print(f"server requests: {server.state.requests}")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
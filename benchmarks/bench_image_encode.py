@@ -0,0 +1,95 @@
+"""
+上传图片编码基准：旧版逐节点实现 vs utils/image_codec
+
+用法（在插件根目录执行，需要 torch / numpy / Pillow）:
+    python benchmarks/bench_image_encode.py
+"""
+import base64
+import importlib
+import io
+import os
+import sys
+import timeit
+import types
+
+import numpy as np
+import torch
+from PIL import Image
+
+# utils 使用包内相对导入，这里挂一个临时包名加载
+_utils = types.ModuleType("jm_volcengine_utils")
+_utils.__path__ = [os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils")]
+sys.modules["jm_volcengine_utils"] = _utils
+image_codec = importlib.import_module("jm_volcengine_utils.image_codec")
+
+RESOLUTIONS = {
+    "480p": (480, 854),
+    "720p": (720, 1280),
+    "1080p": (1080, 1920),
+    "1440p": (1440, 2560),
+    "4K": (2160, 3840),
+}
+
+
+def legacy_jpeg_base64(image):
+    """旧版 I2V / 图片编辑节点中的实现"""
+    if len(image.shape) == 4:
+        image = image[0]
+    image_np = (image.cpu().numpy() * 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(image_np).save(buffer, format="JPEG", quality=95)
+    return base64.b64encode(buffer.getvalue()).decode("utf-8")
+
+
+def legacy_png_data_uri(image):
+    """旧版 Seedance 节点中的实现（去掉调试输出，保留 min/max 同步）"""
+    image.min().item()
+    image.max().item()
+    if image.dim() == 4:
+        image = image.squeeze(0)
+    image_np = image.cpu().numpy()
+    if image_np.dtype != np.uint8:
+        image_np = (image_np * 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(image_np).save(buffer, format="PNG")
+    return f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode('utf-8')}"
+
+
+def make_frame(height, width):
+    """带渐变和噪声的测试帧，避免纯色图让 PNG 压缩结果失真"""
+    torch.manual_seed(0)
+    y = torch.linspace(0, 1, height).view(height, 1, 1)
+    x = torch.linspace(0, 1, width).view(1, width, 1)
+    frame = (0.5 * y + 0.5 * x).expand(height, width, 3) + 0.05 * torch.rand(height, width, 3)
+    return frame.clamp(0, 1).unsqueeze(0)
+
+
+def check_equivalence():
+    frame = make_frame(64, 96)
+    old = (frame[0].numpy() * 255).astype(np.uint8).astype(np.int16)
+    new = image_codec.tensor_to_uint8(frame).astype(np.int16)
+    # 新实现四舍五入，旧实现截断，逐像素差值不超过 1
+    assert np.abs(new - old).max() <= 1
+    assert image_codec.encode_data_uri(frame, "PNG").startswith("data:image/png;base64,")
+    print("equivalence: OK")
+
+
+def bench(number=5):
+    print(f"{'size':>6} {'legacy jpeg':>12} {'codec jpeg':>12} {'legacy png':>12} {'codec png':>12}  (ms/frame)")
+    for name, (height, width) in RESOLUTIONS.items():
+        frame = make_frame(height, width)
+        timings = [
+            timeit.timeit(lambda: fn(frame), number=number) / number * 1000
+            for fn in (
+                legacy_jpeg_base64,
+                lambda f: image_codec.encode_base64(f, "JPEG", quality=95),
+                legacy_png_data_uri,
+                lambda f: image_codec.encode_data_uri(f, "PNG"),
+            )
+        ]
+        print(f"{name:>6} " + " ".join(f"{t:12.1f}" for t in timings))
+
+
+if __name__ == "__main__":
+    check_equivalence()
+    bench()
@@ -0,0 +1,73 @@
+"""
+请求体构造内存基准：旧版 base64 str + json.dumps + encode 路径 vs utils/request_body
+
+每种实现在独立子进程中运行，比较构造（含签名/指纹哈希）前后的峰值 RSS 增量。
+
+用法（在插件根目录执行，仅 Linux/macOS）:
+    python benchmarks/bench_request_body.py [图片MB数，默认20]
+"""
+import base64
+import hashlib
+import importlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import types
+
+_utils = types.ModuleType("jm_volcengine_utils")
+_utils.__path__ = [os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "utils")]
+sys.modules["jm_volcengine_utils"] = _utils
+request_body = importlib.import_module("jm_volcengine_utils.request_body")
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def legacy(buffer):
+    """旧版 Seedance 路径：多次 getvalue、str 形式的 data URI、json.dumps 后 encode，签名与指纹各哈希一遍"""
+    print(len(buffer.getvalue()), file=sys.stderr)
+    image_base64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
+    payload = {"model": "m", "content": [{"type": "image_url", "image_url": {"url": f"data:image/png;base64,{image_base64}"}}]}
+    data = json.dumps(payload).encode("utf-8")
+    hashlib.sha256(data).hexdigest()
+    hashlib.sha256(data).hexdigest()
+    return len(data)
+
+
+def current(buffer):
+    field = request_body.Base64Field(buffer.getbuffer(), prefix="data:image/png;base64,")
+    body = request_body.build({"model": "m", "content": [{"type": "image_url", "image_url": {"url": field}}]})
+    body.hexdigest
+    return len(body)
+
+
+def run_child(mode, size_mb):
+    buffer = io.BytesIO(os.urandom(size_mb * 1024 * 1024))
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    size = (legacy if mode == "legacy" else current)(buffer)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"delta_mb": peak_rss_mb() - before, "ms": elapsed * 1000, "body": size}))
+
+
+def main(size_mb):
+    print(f"image: {size_mb} MB (encoded)")
+    for mode in ("legacy", "current"):
+        out = subprocess.run([sys.executable, __file__, "--child", mode, str(size_mb)],
+                             capture_output=True, text=True, check=True).stdout
+        result = json.loads(out)
+        print(f"{mode:>8}: peak RSS +{result['delta_mb']:7.1f} MB  {result['ms']:8.1f} ms  body {result['body']} bytes")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        run_child(sys.argv[2], int(sys.argv[3]))
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,328 @@
+"""
+本地模拟的火山引擎视觉服务 / 方舟视频生成服务，用于离线测试和压测
+
+实现的接口:
+    POST /?Action=CVProcess                       同步文生图（SeeDream）
+    POST /?Action=CVSync2AsyncSubmitTask          异步提交（图片编辑、图生视频）
+    POST /?Action=CVSync2AsyncGetResult           异步查询：in_queue -> generating -> done，超时后 expired
+    POST /api/v3/contents/generations/tasks       方舟创建任务（Seedance）
+    GET  /api/v3/contents/generations/tasks/<id>  方舟查询任务：queued -> running -> succeeded
+    DELETE /api/v3/contents/generations/tasks/<id>  方舟取消任务：只能取消排队中的任务
+    GET  /files/image.png, /files/video.mp4       结果文件（支持 Range 请求，可按概率在传输中途断开）
+
+不校验签名和密钥。延迟按分布采样，可注入 5xx 错误和 429 限流。
+
+用法（在插件根目录执行）:
+    python benchmarks/mock_server.py --port 8765 --queue-time uniform:0.5,1 --run-time uniform:1,3
+    export JM_VOLCENGINE_VISUAL_ENDPOINT=http://127.0.0.1:8765
+    export JM_VOLCENGINE_ARK_ENDPOINT=http://127.0.0.1:8765
+"""
+import argparse
+import base64
+import itertools
+import json
+import random
+import re
+import struct
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class Distribution:
+    """
+    延迟分布，规格字符串:
+        fixed:0.1  uniform:0.05,0.2  normal:均值,标准差  lognormal:mu,sigma  exp:均值
+    """
+
+    def __init__(self, spec):
+        kind, _, args = spec.partition(":")
+        self.spec = spec
+        self.kind = kind
+        self.args = [float(x) for x in args.split(",") if x]
+
+    def sample(self):
+        if self.kind == "fixed":
+            return self.args[0]
+        if self.kind == "uniform":
+            return random.uniform(*self.args)
+        if self.kind == "normal":
+            return max(0.0, random.gauss(*self.args))
+        if self.kind == "lognormal":
+            return random.lognormvariate(*self.args)
+        if self.kind == "exp":
+            return random.expovariate(1.0 / self.args[0])
+        raise ValueError(f"unknown distribution: {self.spec}")
+
+
+def make_png(width, height):
+    """生成一张渐变 PNG（不依赖 Pillow）"""
+    rows = bytearray()
+    for y in range(height):
+        rows.append(0)
+        for x in range(width):
+            rows += bytes((x * 255 // max(1, width - 1), y * 255 // max(1, height - 1), 128))
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(bytes(rows), 1))
+            + chunk(b"IEND", b""))
+
+
+def make_mp4(size):
+    """生成指定大小的占位 MP4（只有 ftyp 头，内容用于下载吞吐测试）"""
+    header = struct.pack(">I", 24) + b"ftypisom" + struct.pack(">I", 512) + b"isomiso2"
+    return header + b"\0" * max(0, size - len(header))
+
+
+class MockConfig:
+    def __init__(self, latency="fixed:0.02", queue_time="uniform:0.2,0.5", run_time="uniform:0.5,1.5",
+                 error_rate=0.0, throttle_rate=0.0, expire_after=3600.0, image_size=(1024, 1024),
+                 video_bytes=4 * 1024 * 1024, drop_rate=0.0):
+        self.latency = Distribution(latency)
+        self.queue_time = Distribution(queue_time)
+        self.run_time = Distribution(run_time)
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.expire_after = expire_after
+        self.drop_rate = drop_rate
+        self.image = make_png(*image_size)
+        self.video = make_mp4(video_bytes)
+
+
+class MockState:
+    """任务表：每个任务在提交时采样排队与生成时长，查询时按经过时间推导状态"""
+
+    def __init__(self, config):
+        self.config = config
+        self.lock = threading.Lock()
+        self.tasks = {}
+        self.ids = itertools.count(1)
+        self.requests = 0
+
+    def create(self, kind):
+        now = time.monotonic()
+        queued_until = now + self.config.queue_time.sample()
+        with self.lock:
+            task_id = f"mock-{next(self.ids)}"
+            self.tasks[task_id] = {
+                "kind": kind,
+                "created": now,
+                "created_at": int(time.time()),
+                "queued_until": queued_until,
+                "done_at": queued_until + self.config.run_time.sample(),
+            }
+        return task_id
+
+    def phase(self, task_id):
+        """返回 (任务, 阶段)，阶段为 queued/running/done/expired/cancelled，未知任务返回 (None, None)"""
+        task = self.tasks.get(task_id)
+        if task is None:
+            return None, None
+        now = time.monotonic()
+        if task.get("cancelled"):
+            return task, "cancelled"
+        if now - task["created"] > self.config.expire_after:
+            return task, "expired"
+        if now < task["queued_until"]:
+            return task, "queued"
+        if now < task["done_at"]:
+            return task, "running"
+        return task, "done"
+
+
+VISUAL_STATUS = {"queued": "in_queue", "running": "generating", "done": "done", "expired": "expired"}
+ARK_STATUS = {"queued": "queued", "running": "running", "done": "succeeded", "expired": "failed",
+              "cancelled": "cancelled"}
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, obj):
+        data = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_bytes(self, content_type, data):
+        start, end = 0, len(data)
+        match = re.match(r"bytes=(\d+)-(\d*)$", self.headers.get("Range", ""))
+        if match:
+            start = int(match.group(1))
+            end = min(end, int(match.group(2)) + 1) if match.group(2) else end
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end - 1}/{len(data)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(end - start))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        if end - start > 1024 and random.random() < self.state.config.drop_rate:
+            # 模拟 CDN 连接中途断开：只发送一半内容后关闭连接
+            end = start + (end - start) // 2
+            self.close_connection = True
+        try:
+            self.wfile.write(data[start:end])
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端读完响应头后主动关闭（如下载器改用分段下载）
+            self.close_connection = True
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else b""
+        return json.loads(body) if body else {}
+
+    def inject(self):
+        """按配置模拟服务端延迟、限流和错误，已经发送了响应时返回 True"""
+        config = self.state.config
+        with self.state.lock:
+            self.state.requests += 1
+        time.sleep(config.latency.sample())
+        roll = random.random()
+        if roll < config.throttle_rate:
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return True
+        if roll < config.throttle_rate + config.error_rate:
+            self.send_json(500, {"code": 50000, "message": "mock internal error"})
+            return True
+        return False
+
+    def file_url(self, name):
+        return f"http://{self.headers.get('Host')}/files/{name}"
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/files/image.png":
+            return self.send_bytes("image/png", self.state.config.image)
+        if path == "/files/video.mp4":
+            return self.send_bytes("video/mp4", self.state.config.video)
+        if path.startswith("/api/v3/contents/generations/tasks/"):
+            if self.inject():
+                return
+            task_id = path.rsplit("/", 1)[1]
+            task, phase = self.state.phase(task_id)
+            if task is None:
+                return self.send_json(404, {"error": {"code": "NotFound", "message": "task not found"}})
+            result = {"id": task_id, "model": task["kind"], "status": ARK_STATUS[phase],
+                      "created_at": task["created_at"]}
+            if phase == "done":
+                result["content"] = {"video_url": self.file_url("video.mp4")}
+            elif phase == "expired":
+                result["error"] = {"code": "Expired", "message": "task expired"}
+            return self.send_json(200, result)
+        self.send_json(404, {"message": "not found"})
+
+    def do_DELETE(self):
+        path = urlparse(self.path).path
+        if not path.startswith("/api/v3/contents/generations/tasks/"):
+            return self.send_json(404, {"message": "not found"})
+        if self.inject():
+            return
+        task, phase = self.state.phase(path.rsplit("/", 1)[1])
+        if task is None:
+            return self.send_json(404, {"error": {"code": "NotFound", "message": "task not found"}})
+        if phase == "running":
+            return self.send_json(409, {"error": {"code": "InvalidAction", "message": "running task cannot be cancelled"}})
+        task["cancelled"] = True
+        self.send_json(200, {})
+
+    def do_POST(self):
+        parsed = urlparse(self.path)
+        body = self.read_json()
+        if self.inject():
+            return
+        if parsed.path == "/api/v3/contents/generations/tasks":
+            return self.send_json(200, {"id": self.state.create(body.get("model", "seedance"))})
+
+        action = parse_qs(parsed.query).get("Action", [""])[0]
+        if action == "CVProcess":
+            time.sleep(self.state.config.run_time.sample())
+            if body.get("return_url", True):
+                data = {"image_urls": [self.file_url("image.png")]}
+            else:
+                data = {"binary_data_base64": [base64.b64encode(self.state.config.image).decode("ascii")]}
+            return self.send_json(200, {"code": 10000, "message": "Success", "data": data})
+        if action == "CVSync2AsyncSubmitTask":
+            task_id = self.state.create(body.get("req_key", ""))
+            return self.send_json(200, {"code": 10000, "message": "Success", "data": {"task_id": task_id}})
+        if action == "CVSync2AsyncGetResult":
+            task, phase = self.state.phase(body.get("task_id"))
+            if task is None:
+                return self.send_json(200, {"code": 10000, "data": {"status": "not_found"}})
+            data = {"status": VISUAL_STATUS[phase]}
+            if phase == "done":
+                if "i2v" in task["kind"]:
+                    data["video_url"] = self.file_url("video.mp4")
+                else:
+                    data["image_urls"] = [self.file_url("image.png")]
+            return self.send_json(200, {"code": 10000, "message": "Success", "data": data})
+        self.send_json(400, {"code": 40000, "message": f"unsupported action: {action}"})
+
+
+class MockServer:
+    """在后台线程中运行的模拟服务，url 为可直接用作 endpoint 的地址"""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.state = MockState(config or MockConfig())
+        handler = type("BoundMockHandler", (MockHandler,), {"state": self.state})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_port}"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="mock-volcengine", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="本地模拟火山引擎/方舟服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="fixed:0.02", help="每个请求的服务端处理延迟分布")
+    parser.add_argument("--queue-time", default="uniform:0.2,0.5", help="任务排队时长分布")
+    parser.add_argument("--run-time", default="uniform:0.5,1.5", help="任务生成时长分布（CVProcess 同步等待该时长）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 500 的概率")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="返回 429 的概率")
+    parser.add_argument("--expire-after", type=float, default=3600.0, help="任务创建多少秒后变为 expired")
+    parser.add_argument("--video-mb", type=float, default=4.0, help="结果视频大小（MB）")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="结果文件传输中途断开的概率")
+    return parser.parse_args(argv)
+
+
+def config_from_args(args):
+    return MockConfig(latency=args.latency, queue_time=args.queue_time, run_time=args.run_time,
+                      error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+                      expire_after=args.expire_after, video_bytes=int(args.video_mb * 1024 * 1024),
+                      drop_rate=args.drop_rate)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    server = MockServer(config_from_args(args), args.host, args.port)
+    print(f"mock server listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
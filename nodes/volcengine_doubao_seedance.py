@@ -1,18 +1,10 @@
-import json
-import time
-import base64
-import hashlib
-import hmac
-import datetime
-from urllib.parse import urlencode
 import requests
-import torch
-import numpy as np
-from PIL import Image
-import io
-import os
+from ..utils import cancellation, concurrency, config, credentials, downloader, governor, http_client, image_codec, log, metrics, output_files, polling, request_body, result_cache, retry, task_journal, task_poller
+import shutil
 import folder_paths
 
+logger = log.get_logger("seedance")
+
 class VolcengineDoubaoSeedance:
     @classmethod
     def INPUT_TYPES(s):
@@ -21,7 +13,7 @@ class VolcengineDoubaoSeedance:
                 "ark_api_key": ("STRING", {
                     "default": "", 
                     "multiline": False, 
-                    "tooltip": "火山方舟API密钥"
+                    "tooltip": "火山方舟API密钥，留空时使用凭证池"
                 }),
                 "model": (["doubao-seedance-1-0-pro-250528", "doubao-seedance-1-0-lite-i2v-250428"], {
                     "default": "doubao-seedance-1-0-pro-250528",
@@ -70,64 +62,55 @@ class VolcengineDoubaoSeedance:
                     "default": False,
                     "tooltip": "是否固定摄像头"
                 }),
+                "resize_input": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "上传前按视频分辨率和宽高比缩放/裁剪输入图片，减小上传体积"
+                }),
                 "filename_prefix": ("STRING", {
                     "default": "doubao_seedance",
                     "tooltip": "保存文件名前缀"
                 }),
+                "cache_mode": (result_cache.CACHE_MODES, {
+                    "default": "auto",
+                    "tooltip": "结果缓存：auto仅缓存指定了种子的请求，always种子为-1时也缓存，off不使用缓存"
+                }),
             }
         }
 
+    @classmethod
+    def IS_CHANGED(s, model, first_frame=None, last_frame=None, seed=-1, cache_mode="auto", **kwargs):
+        """确定性请求返回稳定的缓存键，输入不变时直接复用结果"""
+        return result_cache.is_changed(model, dict(kwargs, seed=seed), [first_frame, last_frame], seed=seed, mode=cache_mode)
+
     RETURN_TYPES = ("STRING",)
     RETURN_NAMES = ("video_path",)
-    FUNCTION = "generate_video"
+    FUNCTION = concurrency.node_function("generate_video")
     CATEGORY = "JM-Volcengine-API/Video"
     DESCRIPTION = "火山引擎豆包Seedance视频生成模型 - 支持文生视频和图生视频"
 
     def __init__(self):
-        self.base_url = "https://ark.cn-beijing.volces.com/api/v3/contents/generations/tasks"
+        self.base_url = f"{config.ARK_ENDPOINT}/api/v3/contents/generations/tasks"
+
+    def image_to_base64(self, image_tensor, resolution=None, ratio=None, model=""):
+        """
+        将ComfyUI图片张量转换为data URI请求体字段
+
+        提供 resolution 时先按输出分辨率和宽高比缩放/裁剪；编码结果配置了上传预算时超出部分自动降质或缩小。
+        model 为所选模型ID，用作编码耗时指标的标签
+        """
+        input_shape = tuple(image_tensor.shape)
+        with metrics.timer("encode", model):
+            if resolution:
+                image_tensor = image_codec.fit_to_target(image_tensor, image_codec.VIDEO_SHORT_SIDES.get(resolution), ratio)
+            image_data, fmt = image_codec.encode_within_budget(image_tensor, "PNG")
+        buffer_size = len(image_data)
+        logger.info("图片编码完成: %s -> %s %s %d bytes", input_shape, fmt, tuple(image_tensor.shape), buffer_size)
 
-    def image_to_base64(self, image_tensor):
-        """将ComfyUI图片张量转换为Base64"""
-        print(f"=== DEBUG: 图片转换开始 ===")
-        print(f"输入张量形状: {image_tensor.shape}")
-        print(f"输入张量数据类型: {image_tensor.dtype}")
-        print(f"输入张量值范围: {image_tensor.min().item()} ~ {image_tensor.max().item()}")
-        
-        # image_tensor shape: [1, H, W, 3]
-        if image_tensor.dim() == 4:
-            image_tensor = image_tensor.squeeze(0)  # 移除batch维度
-            print(f"移除batch维度后形状: {image_tensor.shape}")
-        
-        # 转换为numpy数组并确保数据类型正确
-        image_np = image_tensor.cpu().numpy()
-        print(f"转换为numpy后数据类型: {image_np.dtype}")
-        
-        if image_np.dtype != np.uint8:
-            image_np = (image_np * 255).astype(np.uint8)
-            print(f"转换为uint8后值范围: {image_np.min()} ~ {image_np.max()}")
-        
-        # 转换为PIL图像
-        pil_image = Image.fromarray(image_np)
-        print(f"PIL图像尺寸: {pil_image.size}")
-        print(f"PIL图像模式: {pil_image.mode}")
-        
-        # 转换为Base64
-        buffer = io.BytesIO()
-        pil_image.save(buffer, format='PNG')
-        buffer_size = len(buffer.getvalue())
-        print(f"PNG缓冲区大小: {buffer_size} bytes")
-        
-        image_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-        base64_length = len(image_base64)
-        print(f"Base64编码长度: {base64_length}")
-        
         # 检查图片大小是否超过限制（30MB）
         if buffer_size > 30 * 1024 * 1024:
-            print(f"警告：图片大小 {buffer_size / 1024 / 1024:.2f}MB 可能超过API限制(30MB)")
-        
-        print(f"=== DEBUG: 图片转换完成 ===")
-        
-        return f"data:image/png;base64,{image_base64}"
+            logger.warning("图片大小 %.2fMB 可能超过API限制(30MB)", buffer_size / 1024 / 1024)
+
+        return request_body.Base64Field(image_data, prefix=f"data:{image_codec.MIME_TYPES[fmt]};base64,")
 
     def build_text_command(self, prompt, resolution="720p", ratio="adaptive", duration=5, 
                           framepersecond=24, watermark=False, seed=-1, camerafixed=False):
@@ -165,300 +148,470 @@ class VolcengineDoubaoSeedance:
         
         return text_content
 
-    def create_task(self, ark_api_key, model, content_list):
-        """创建视频生成任务"""
+    def create_task(self, credential, model, content_list, reuse_finished=False):
+        """
+        创建视频生成任务，返回 (task_id, 查询该任务必须使用的凭证)，创建失败时 task_id 为 None
+
+        相同请求存在进行中的任务时直接返回其task_id；reuse_finished 为 True（指定了种子）时也复用已完成的任务
+        """
+        ark_api_key = credential.api_key
         headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {ark_api_key}"
         }
         
-        payload = {
+        # 请求体只序列化一次，指纹与发送使用同一份 bytes
+        payload = request_body.build({
             "model": model,
             "content": content_list
-        }
+        })
         
-        # 输出详细的请求信息用于调试
-        print(f"=== DEBUG: 创建任务请求信息 ===")
-        print(f"请求URL: {self.base_url}")
-        print(f"请求Headers: {headers}")
-        print(f"请求Payload: {json.dumps(payload, indent=2, ensure_ascii=False)}")
-        print(f"================================")
+        journal = task_journal.get_journal()
+        fingerprint = task_journal.fingerprint(model, credential.scope, payload)
+        # 同一请求的查找、提交与登记串行执行；种子为 -1 时不接上本进程中其他节点/帧正在查询的任务
+        with journal.submitting(fingerprint):
+            entry = journal.claim(fingerprint, include_finished=reuse_finished, shared=reuse_finished)
+            if entry:
+                # 任务只能用创建它的 API Key 查询
+                owner = credential.resume(entry["account"])
+                if owner is not None:
+                    logger.info("复用已创建的任务，任务ID: %s (状态: %s)", entry["task_id"], entry["status"])
+                    return entry["task_id"], owner
+                logger.warning("任务 %s 的创建凭证已不在凭证池中，重新创建", entry["task_id"])
         
-        try:
-            response = requests.post(self.base_url, headers=headers, json=payload, timeout=30)
-            
-            # 输出详细的响应信息用于调试
-            print(f"=== DEBUG: 响应信息 ===")
-            print(f"响应状态码: {response.status_code}")
-            print(f"响应Headers: {dict(response.headers)}")
-            
-            try:
-                response_json = response.json()
-                print(f"响应内容: {json.dumps(response_json, indent=2, ensure_ascii=False)}")
-            except:
-                print(f"响应内容(原始文本): {response.text}")
-            print(f"=====================")
+            # 请求信息只在DEBUG级别输出，凭证脱敏
+            logger.debug("创建任务请求: URL=%s Headers=%s 请求体大小=%d bytes",
+                         self.base_url, log.summarize(headers), len(payload))
+        
+            # 占用账号的任务并发名额并按提交速率限速，任务结束时释放名额
+            with governor.task_slot(ark_api_key) as slot:
+                try:
+                    # 连接失败按退避重试（5xx 时服务端可能已创建任务，不重试），服务持续故障时熔断直接失败
+                    with metrics.timer("submit", model):
+                        response = retry.call("ark", "submit", lambda: governor.request(
+                            ark_api_key, "submit", lambda: http_client.post(
+                                self.base_url, headers=headers, data=payload.data, read_timeout=30)))
+                    metrics.count_bytes(model, "upload", len(payload))
+                    logger.debug("创建任务响应: 状态码=%s 内容=%s", response.status_code, log.summarize(response))
             
-            response.raise_for_status()
+                    response.raise_for_status()
             
-            result = response.json()
-            if "id" in result:
-                print(f"任务创建成功，任务ID: {result['id']}")
-                return result["id"]
-            else:
-                print(f"创建任务失败，响应中没有任务ID: {result}")
-                return None
+                    result = response.json()
+                    if "id" in result:
+                        logger.info("任务创建成功，任务ID: %s", result["id"])
+                        journal.record(fingerprint, model, result["id"], credential.account)
+                        slot.bind(result["id"])
+                        credential.report(True)
+                        return result["id"], credential
+                    else:
+                        logger.error("创建任务失败，响应中没有任务ID: %s", log.summarize(result))
                 
-        except requests.exceptions.HTTPError as e:
-            print(f"HTTP错误: {e}")
-            try:
-                error_detail = response.json()
-                print(f"错误详情: {json.dumps(error_detail, indent=2, ensure_ascii=False)}")
-            except:
-                print(f"错误详情(原始文本): {response.text}")
-            return None
-        except Exception as e:
-            print(f"创建任务时发生其他错误: {str(e)}")
-            return None
+                except requests.exceptions.HTTPError as e:
+                    logger.error("HTTP错误: %s，错误详情: %s", e, log.summarize(response))
+                except retry.CircuitOpenError as e:
+                    # 熔断说明服务接口故障，请求未发出，不计为该凭证的失败
+                    logger.error("%s", e)
+                    return None, credential
+                except Exception as e:
+                    logger.error("创建任务时发生其他错误: %s", e)
+                credential.report(False)
+                return None, credential
 
-    def query_task(self, ark_api_key, task_id, max_retries=60, retry_interval=10):
-        """查询任务结果"""
+    def watch_task(self, ark_api_key, task_id, model="", poll_policy=None):
+        """将任务登记到后台轮询器，返回结果为状态字典的Future"""
+        poll_session = (poll_policy or polling.VIDEO_POLICY).session(model)
         headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {ark_api_key}"
         }
         
         query_url = f"{self.base_url}/{task_id}"
+        journal = task_journal.get_journal()
+        clock = metrics.TaskClock(model)
+        
+        last_error = None
         
-        for attempt in range(max_retries):
+        def check():
+            nonlocal last_error
+            attempt = poll_session.attempt
             try:
-                print(f"查询任务URL: {query_url}")
-                response = requests.get(query_url, headers=headers, timeout=30)
-                
-                # 输出查询响应的debug信息
-                print(f"=== DEBUG: 查询任务响应 (尝试 {attempt + 1}) ===")
-                print(f"响应状态码: {response.status_code}")
+                # 查询失败时不在此重试，由轮询器按策略再次查询；可选对冲请求降低慢响应的影响
+                response = retry.call("ark", "poll", lambda: governor.request(
+                    ark_api_key, "poll", lambda: http_client.get(query_url, headers=headers, read_timeout=30),
+                    retries=0, wait=False), retries=0, idempotent=True, hedge_after=retry.HEDGE_AFTER)
+                logger.debug("查询任务响应 (尝试 %d): 状态码=%s", attempt, response.status_code)
                 
+                if retry.classify(response) == retry.PERMANENT:
+                    # 鉴权失败、任务不存在等重试无意义，不再等到截止时间
+                    logger.error("查询任务失败（不可重试）: %s - %s", response.status_code, log.summarize(response))
+                    journal.update(task_id, task_journal.FAILED)
+                    return {"status": "error", "message": f"查询任务失败: HTTP {response.status_code}"}
                 response.raise_for_status()
                 
                 result = response.json()
-                print(f"查询响应内容: {json.dumps(result, indent=2, ensure_ascii=False)}")
-                print(f"=====================================")
+                last_error = None
+                logger.debug("查询响应内容: %s", log.summarize(result))
                 
                 status = result.get("status")
                 
-                print(f"查询任务 {task_id} 状态: {status} (尝试 {attempt + 1}/{max_retries})")
-                
                 if status == "succeeded":
                     content = result.get("content", {})
                     video_url = content.get("video_url")
                     if video_url:
-                        print(f"任务完成，视频URL: {video_url}")
+                        logger.info("任务 %s 完成，视频URL: %s", task_id, video_url)
+                        poll_session.done()
+                        journal.update(task_id, task_journal.DONE, result_url=video_url)
                         return {"status": "success", "video_url": video_url, "result": result}
                     else:
-                        print("任务成功但未找到视频URL")
-                        print(f"完整响应内容: {json.dumps(result, indent=2, ensure_ascii=False)}")
+                        logger.error("任务 %s 成功但未找到视频URL，完整响应: %s", task_id, log.summarize(result))
+                        journal.update(task_id, task_journal.FAILED)
                         return {"status": "error", "message": "未找到视频URL"}
                 
                 elif status == "failed":
                     error_info = result.get("error", {})
                     error_message = error_info.get("message", "任务失败")
-                    print(f"任务失败: {error_message}")
-                    print(f"错误详情: {json.dumps(error_info, indent=2, ensure_ascii=False)}")
+                    logger.error("任务 %s 失败: %s，错误详情: %s", task_id, error_message, log.summarize(error_info))
+                    journal.update(task_id, task_journal.FAILED)
                     return {"status": "error", "message": error_message}
                 
                 elif status == "cancelled":
-                    print("任务被取消")
+                    logger.warning("任务 %s 被取消", task_id)
+                    journal.update(task_id, task_journal.FAILED)
                     return {"status": "error", "message": "任务被取消"}
                 
                 elif status in ["queued", "running"]:
-                    print(f"任务进行中，状态: {status}，等待 {retry_interval} 秒后重试...")
-                    time.sleep(retry_interval)
-                    continue
+                    if status == "running":
+                        clock.running()
+                    logger.debug("任务 %s 进行中，状态: %s (尝试 %d)", task_id, status, attempt)
+                    return task_poller.PENDING
                 
                 else:
-                    print(f"未知状态: {status}")
-                    print(f"完整响应: {json.dumps(result, indent=2, ensure_ascii=False)}")
-                    time.sleep(retry_interval)
-                    continue
+                    logger.warning("任务 %s 未知状态: %s，完整响应: %s", task_id, status, log.summarize(result))
+                    return task_poller.PENDING
                     
             except requests.exceptions.HTTPError as e:
-                print(f"查询任务HTTP错误: {e}")
-                try:
-                    error_detail = response.json()
-                    print(f"查询错误详情: {json.dumps(error_detail, indent=2, ensure_ascii=False)}")
-                except:
-                    print(f"查询错误详情(原始文本): {response.text}")
-                if attempt < max_retries - 1:
-                    time.sleep(retry_interval)
-                    continue
-                else:
-                    return {"status": "error", "message": f"查询任务失败: {str(e)}"}
+                logger.warning("查询任务HTTP错误: %s，错误详情: %s", e, log.summarize(response))
+                last_error = e
+            except task_poller.Defer:
+                # 账号限速中，本次未发出查询，由轮询器稍后重新调度
+                raise
             except Exception as e:
-                print(f"查询任务时发生其他错误: {str(e)}")
-                if attempt < max_retries - 1:
-                    time.sleep(retry_interval)
-                    continue
-                else:
-                    return {"status": "error", "message": f"查询任务失败: {str(e)}"}
+                logger.warning("查询任务时发生其他错误: %s", e)
+                last_error = e
+            return task_poller.PENDING
+        
+        def on_timeout():
+            # 超过截止时间时根据最后一次查询是否出错给出对应的错误信息；相同请求再次运行时重新提交
+            journal.update(task_id, task_journal.EXPIRED)
+            clock.finish("timeout")
+            if last_error is not None:
+                return {"status": "error", "message": f"查询任务失败: {str(last_error)}"}
+            return {"status": "error", "message": "任务超时"}
         
-        return {"status": "error", "message": "任务超时"}
+        future = task_poller.get_poller().submit(check, poll_session, timeout_result=on_timeout)
+        cancellation.on_cancel(future, lambda: self.cancel_task(ark_api_key, task_id))
+        return governor.track_task(task_id, clock.track(future, succeeded=lambda result: result["status"] == "success"))
+
+    def cancel_task(self, ark_api_key, task_id):
+        """
+        执行被中断时调用：删除方舟上的任务，排队中的任务被取消，立即释放账号的并发配额
+
+        已开始生成的任务无法取消，在任务日志中标记为 abandoned，相同请求再次运行时可以接上
+        """
+        headers = {"Authorization": f"Bearer {ark_api_key}"}
+        url = f"{self.base_url}/{task_id}"
+        response = retry.call("ark", "cancel", lambda: governor.request(
+            ark_api_key, "cancel", lambda: http_client.request("DELETE", url, headers=headers, read_timeout=10)),
+            retries=1, idempotent=True)
+        journal = task_journal.get_journal()
+        if response.status_code < 300:
+            logger.info("已取消任务 %s", task_id)
+            journal.update(task_id, task_journal.CANCELLED)
+        else:
+            logger.warning("无法取消任务 %s，服务端会继续生成: %s - %s", task_id, response.status_code,
+                           log.summarize(response))
+            journal.update(task_id, task_journal.ABANDONED)
+
+    def save_task_video(self, task_id, video_url, filename_prefix, file_path=None, model=""):
+        """
+        下载任务结果并记录到任务日志；之前已保存且文件仍存在时直接复用
+
+        file_path 为调用方预先占用的输出文件（get_output_path），下载完成后替换到该路径；
+        没有用上时（复用已保存的文件或下载失败）删除这个空文件；model 为任务所用的模型ID，用作下载指标的标签
+        """
+        journal = task_journal.get_journal()
+        video_path = journal.saved_path(task_id)
+        if video_path:
+            logger.info("复用已保存的视频: %s", video_path)
+        else:
+            video_path = self.download_video(video_url, filename_prefix, file_path, model)
+            if video_path:
+                journal.update(task_id, task_journal.SAVED, result_path=video_path)
+        if file_path and video_path != file_path:
+            output_files.discard(file_path)
+        return video_path
 
-    def download_video(self, video_url, filename_prefix):
-        """下载视频到ComfyUI output目录"""
+    def get_output_path(self, filename_prefix):
+        """在ComfyUI output目录中分配唯一的视频文件路径（文件以空文件占位）"""
+        return output_files.allocate(folder_paths.get_output_directory(), filename_prefix, "mp4")
+
+    def copy_cached_video(self, cached_path, filename_prefix):
+        """把缓存中的视频复制到ComfyUI output目录"""
+        file_path = self.get_output_path(filename_prefix)
+        shutil.copyfile(cached_path, file_path)
+        logger.info("视频已从缓存复制到: %s", file_path)
+        return file_path
+
+    def download_video(self, video_url, filename_prefix, file_path=None, model=""):
+        """
+        下载视频到ComfyUI output目录（流式写入临时文件，中断时续传，完成后再重命名为最终文件名）
+
+        传入 file_path 时下载完成后替换到这个预先占用的文件，不再另行分配文件名
+        """
         try:
-            # 确保输出目录存在
-            output_dir = folder_paths.get_output_directory()
-            os.makedirs(output_dir, exist_ok=True)
-            
-            # 生成唯一文件名
-            counter = 1
-            while True:
-                filename = f"{filename_prefix}_{counter:04d}.mp4"
-                file_path = os.path.join(output_dir, filename)
-                if not os.path.exists(file_path):
-                    break
-                counter += 1
-            
-            print(f"开始下载视频到: {file_path}")
-            
-            # 下载视频
-            response = requests.get(video_url, stream=True, timeout=300)
-            response.raise_for_status()
-            
-            with open(file_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-            
-            print(f"视频下载成功: {file_path}")
-            return file_path
+            logger.info("开始下载视频: %s", video_url)
+            video_path = downloader.download(video_url, folder_paths.get_output_directory(),
+                                             lambda: file_path or self.get_output_path(filename_prefix),
+                                             model=model)
+            logger.info("视频下载成功: %s", video_path)
+            return video_path
             
         except Exception as e:
-            print(f"下载视频时发生错误: {str(e)}")
+            logger.error("下载视频时发生错误: %s", e)
             return None
 
+    def build_content_list(self, prompt, first_frame=None, last_frame=None, resolution="720p", ratio="adaptive",
+                           duration=5, framepersecond=24, watermark=False, seed=-1, camerafixed=False,
+                           resize_input=False, model=""):
+        """构建任务内容数组，返回 (content_list, 带参数命令的文本)；model 用作图片编码指标的标签"""
+        content_list = []
+        
+        # 构建文本命令
+        text_with_commands = self.build_text_command(
+            prompt, resolution, ratio, duration, framepersecond, 
+            watermark, seed, camerafixed
+        )
+        
+        # 添加文本内容
+        content_list.append({
+            "type": "text",
+            "text": text_with_commands
+        })
+        
+        # 处理图片输入（图生视频模式）
+        target_resolution = resolution if resize_input else None
+        if first_frame is not None or last_frame is not None:
+            if first_frame is not None and last_frame is not None:
+                logger.info("检测到首尾帧图片，使用首尾帧图生视频模式")
+                logger.debug("首帧图片形状: %s", tuple(first_frame.shape))
+                logger.debug("尾帧图片形状: %s", tuple(last_frame.shape))
+                
+                # 处理首帧图片
+                first_frame_base64 = self.image_to_base64(first_frame, target_resolution, ratio, model)
+                logger.debug("首帧图片Base64长度: %d", len(first_frame_base64))
+                first_frame_content = {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": first_frame_base64
+                    },
+                    "role": "first_frame"
+                }
+                content_list.append(first_frame_content)
+                
+                # 处理尾帧图片
+                last_frame_base64 = self.image_to_base64(last_frame, target_resolution, ratio, model)
+                logger.debug("尾帧图片Base64长度: %d", len(last_frame_base64))
+                last_frame_content = {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": last_frame_base64
+                    },
+                    "role": "last_frame"
+                }
+                content_list.append(last_frame_content)
+                
+            elif first_frame is not None:
+                logger.info("检测到首帧图片，使用图生视频模式")
+                logger.debug("首帧图片形状: %s", tuple(first_frame.shape))
+                
+                first_frame_base64 = self.image_to_base64(first_frame, target_resolution, ratio, model)
+                logger.debug("首帧图片Base64长度: %d", len(first_frame_base64))
+                first_frame_content = {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": first_frame_base64
+                    },
+                    "role": "first_frame"
+                }
+                content_list.append(first_frame_content)
+                
+            elif last_frame is not None:
+                logger.info("检测到尾帧图片，使用图生视频模式")
+                logger.debug("尾帧图片形状: %s", tuple(last_frame.shape))
+                
+                last_frame_base64 = self.image_to_base64(last_frame, target_resolution, ratio, model)
+                logger.debug("尾帧图片Base64长度: %d", len(last_frame_base64))
+                last_frame_content = {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": last_frame_base64
+                    },
+                    "role": "last_frame"
+                }
+                content_list.append(last_frame_content)
+        else:
+            logger.info("使用文生视频模式")
+        
+        return content_list, text_with_commands
+
     def generate_video(self, ark_api_key, model, prompt, first_frame=None, last_frame=None, 
                       resolution="720p", ratio="adaptive", duration=5, framepersecond=24, 
-                      watermark=False, seed=-1, camerafixed=False, filename_prefix="doubao_seedance"):
-        """主要的视频生成函数"""
+                      watermark=False, seed=-1, camerafixed=False, resize_input=False, filename_prefix="doubao_seedance",
+                      cache_mode="auto"):
+        """主要的视频生成函数，命中结果缓存时不再创建任务"""
         
         # 验证必需参数
-        if not ark_api_key:
-            return ("错误：请提供有效的ARK API密钥",)
+        if not credentials.available(credentials.ARK, ark_api_key):
+            return ("错误：请提供有效的ARK API密钥，或配置凭证池",)
         
         if not prompt.strip():
             return ("错误：请提供视频生成提示词",)
         
         try:
-            # 构建内容数组
-            content_list = []
+            # 查找结果缓存
+            cache_key = None
+            if result_cache.should_cache(seed, cache_mode):
+                params = {"prompt": prompt, "resolution": resolution, "ratio": ratio, "duration": duration,
+                          "framepersecond": framepersecond, "watermark": watermark, "seed": seed,
+                          "camerafixed": camerafixed, "resize_input": resize_input}
+                cache_key = result_cache.cache_key(model, params, [first_frame, last_frame])
+                hit = result_cache.get_cache().get(cache_key)
+                if hit:
+                    logger.info("命中结果缓存")
+                    return (self.copy_cached_video(hit[0], filename_prefix),)
             
-            # 构建文本命令
-            text_with_commands = self.build_text_command(
-                prompt, resolution, ratio, duration, framepersecond, 
-                watermark, seed, camerafixed
+            # 构建内容数组
+            content_list, text_with_commands = self.build_content_list(
+                prompt, first_frame, last_frame, resolution, ratio, duration,
+                framepersecond, watermark, seed, camerafixed, resize_input, model
             )
             
-            # 添加文本内容
-            content_list.append({
-                "type": "text",
-                "text": text_with_commands
-            })
-            
-            # 处理图片输入（图生视频模式）
-            if first_frame is not None or last_frame is not None:
-                if first_frame is not None and last_frame is not None:
-                    print("检测到首尾帧图片，使用首尾帧图生视频模式")
-                    print(f"首帧图片形状: {first_frame.shape}")
-                    print(f"尾帧图片形状: {last_frame.shape}")
-                    
-                    # 处理首帧图片
-                    first_frame_base64 = self.image_to_base64(first_frame)
-                    print(f"首帧图片Base64长度: {len(first_frame_base64)}")
-                    first_frame_content = {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": first_frame_base64
-                        },
-                        "role": "first_frame"
-                    }
-                    content_list.append(first_frame_content)
-                    
-                    # 处理尾帧图片
-                    last_frame_base64 = self.image_to_base64(last_frame)
-                    print(f"尾帧图片Base64长度: {len(last_frame_base64)}")
-                    last_frame_content = {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": last_frame_base64
-                        },
-                        "role": "last_frame"
-                    }
-                    content_list.append(last_frame_content)
-                    
-                elif first_frame is not None:
-                    print("检测到首帧图片，使用图生视频模式")
-                    print(f"首帧图片形状: {first_frame.shape}")
-                    
-                    first_frame_base64 = self.image_to_base64(first_frame)
-                    print(f"首帧图片Base64长度: {len(first_frame_base64)}")
-                    first_frame_content = {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": first_frame_base64
-                        },
-                        "role": "first_frame"
-                    }
-                    content_list.append(first_frame_content)
-                    
-                elif last_frame is not None:
-                    print("检测到尾帧图片，使用图生视频模式")
-                    print(f"尾帧图片形状: {last_frame.shape}")
-                    
-                    last_frame_base64 = self.image_to_base64(last_frame)
-                    print(f"尾帧图片Base64长度: {len(last_frame_base64)}")
-                    last_frame_content = {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": last_frame_base64
-                        },
-                        "role": "last_frame"
-                    }
-                    content_list.append(last_frame_content)
-            else:
-                print("使用文生视频模式")
-            
-            print(f"创建视频生成任务...")
-            print(f"模型: {model}")
-            print(f"提示词: {text_with_commands}")
+            logger.info("创建视频生成任务，模型: %s", model)
+            logger.debug("提示词: %s", log.summarize(text_with_commands))
             
-            # 创建任务
-            task_id = self.create_task(ark_api_key, model, content_list)
+            # 创建任务（API Key 留空时从凭证池中选择）
+            credential = credentials.acquire(credentials.ARK, ark_api_key)
+            try:
+                task_id, credential = self.create_task(credential, model, content_list, reuse_finished=seed != -1)
+            except cancellation.Interrupted:
+                # 等待账号的任务并发名额时被中断
+                credential.release()
+                raise
             
             if not task_id:
+                credential.release()
                 return ("错误：任务创建失败",)
             
-            print(f"任务创建成功，task_id: {task_id}")
-            print("开始查询任务状态...")
+            logger.info("任务创建成功，task_id: %s", task_id)
+            logger.info("开始查询任务状态...")
             
-            # 查询任务结果
-            result = self.query_task(ark_api_key, task_id)
+            # 查询任务结果（使用创建任务的凭证）；等待期间响应 ComfyUI 的中断，中断时取消任务
+            result = cancellation.result(credential.track(self.watch_task(credential.api_key, task_id, model)), key=model)
             
             if result["status"] != "success":
                 return (f"错误：{result['message']}",)
             
             video_url = result["video_url"]
-            print(f"获取到视频URL: {video_url}")
+            logger.info("获取到视频URL: %s", video_url)
             
             # 下载视频
-            video_path = self.download_video(video_url, filename_prefix)
+            video_path = self.save_task_video(task_id, video_url, filename_prefix, model=model)
             
             if not video_path:
                 return ("错误：视频下载失败",)
             
+            if cache_key:
+                result_cache.get_cache().put(cache_key, "mp4", src_path=video_path, meta={"video_url": video_url})
+            
             return (video_path,)
             
+        except cancellation.Interrupted:
+            raise
+        except Exception as e:
+            logger.error("生成视频时发生错误: %s", e)
+            return (f"错误：{str(e)}",) 
+
+    async def generate_video_async(self, **kwargs):
+        """协程版本：在工作线程中执行 generate_video，等待视频生成期间 ComfyUI 可以执行其他节点"""
+        return await concurrency.run_blocking(self.generate_video, **kwargs)
+
+class VolcengineDoubaoSeedanceSubmit(VolcengineDoubaoSeedance):
+    """只创建任务并立即返回任务句柄，由 Volcengine Task Collect 节点统一等待和下载"""
+
+    @classmethod
+    def INPUT_TYPES(s):
+        input_types = super().INPUT_TYPES()
+        input_types["optional"].pop("filename_prefix")
+        input_types["optional"].pop("cache_mode")
+        return input_types
+
+    @classmethod
+    def IS_CHANGED(s, **kwargs):
+        """
+        在生成节点的缓存键上加入中断取消次数：Collect 被中断时会取消句柄中的 Future，
+        ComfyUI 缓存的句柄随之失效，再次运行时重新提交（任务日志会接上未取消的任务）
+        """
+        key = super().IS_CHANGED(**kwargs)
+        return key if isinstance(key, float) else f"{key}:{cancellation.cancel_epoch()}"
+
+    RETURN_TYPES = ("VOLCENGINE_TASK",)
+    RETURN_NAMES = ("task",)
+    FUNCTION = "submit"
+    DESCRIPTION = "火山引擎豆包Seedance视频生成 - 提交任务并返回任务句柄"
+
+    def make_handle(self, task_id=None, result=None, error=None, model=""):
+        """
+        构造在提交/收集节点之间传递的任务句柄，result 为结果是 (video_url, 错误信息) 的Future，
+        model 为所选模型ID，Collect 下载时用作指标标签
+        """
+        return {"kind": "seedance", "task_id": task_id, "result": result, "error": error, "model": model}
+
+    def submit(self, ark_api_key, model, prompt, first_frame=None, last_frame=None,
+               resolution="720p", ratio="adaptive", duration=5, framepersecond=24,
+               watermark=False, seed=-1, camerafixed=False, resize_input=False):
+        """创建任务并登记到后台轮询器，不等待生成完成"""
+        if not credentials.available(credentials.ARK, ark_api_key):
+            return ([self.make_handle(error="错误：请提供有效的ARK API密钥，或配置凭证池")],)
+        
+        if not prompt.strip():
+            return ([self.make_handle(error="错误：请提供视频生成提示词")],)
+        
+        try:
+            content_list, text_with_commands = self.build_content_list(
+                prompt, first_frame, last_frame, resolution, ratio, duration,
+                framepersecond, watermark, seed, camerafixed, resize_input, model
+            )
+            
+            credential = credentials.acquire(credentials.ARK, ark_api_key)
+            try:
+                task_id, credential = self.create_task(credential, model, content_list, reuse_finished=seed != -1)
+            except cancellation.Interrupted:
+                # 等待账号的任务并发名额时被中断
+                credential.release()
+                raise
+            if not task_id:
+                credential.release()
+                return ([self.make_handle(error="错误：任务创建失败")],)
+            
+            logger.info("任务创建成功，task_id: %s", task_id)
+            result = task_poller.then(
+                credential.track(self.watch_task(credential.api_key, task_id, model)),
+                lambda r: (r["video_url"], None) if r["status"] == "success" else (None, f"错误：{r['message']}"),
+            )
+            return ([self.make_handle(task_id, result, model=model)],)
+            
+        except cancellation.Interrupted:
+            raise
         except Exception as e:
-            print(f"生成视频时发生错误: {str(e)}")
-            return (f"错误：{str(e)}",) 
\ No newline at end of file
+            logger.error("提交任务时发生错误: %s", e)
+            return ([self.make_handle(error=f"错误：{str(e)}")],)
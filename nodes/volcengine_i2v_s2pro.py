@@ -1,18 +1,9 @@
-import json
-import time
-import base64
-import hashlib
-import hmac
-import datetime
-from urllib.parse import quote, urlencode
-import requests
-import torch
-import numpy as np
-from PIL import Image
-import io
-import os
+from ..utils import cancellation, concurrency, credentials, downloader, image_codec, log, metrics, output_files, polling, request_body, result_cache, task_journal, task_poller, visual_task
+import shutil
 import folder_paths
 
+logger = log.get_logger("i2v")
+
 class VolcengineI2VS2Pro:
     @classmethod
     def INPUT_TYPES(s):
@@ -21,12 +12,12 @@ class VolcengineI2VS2Pro:
                 "access_key": ("STRING", {
                     "default": "",
                     "multiline": False,
-                    "tooltip": "火山引擎访问密钥AccessKey"
+                    "tooltip": "火山引擎访问密钥AccessKey，与SecretKey同时留空时使用凭证池"
                 }),
                 "secret_key": ("STRING", {
                     "default": "",
                     "multiline": False,
-                    "tooltip": "火山引擎访问密钥SecretKey"
+                    "tooltip": "火山引擎访问密钥SecretKey，与AccessKey同时留空时使用凭证池"
                 }),
                 "image": ("IMAGE", {
                     "tooltip": "输入图片"
@@ -48,104 +39,53 @@ class VolcengineI2VS2Pro:
                     "max": 2**32 - 1,
                     "tooltip": "随机种子，-1表示随机生成"
                 }),
+                "resize_input": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "上传前按视频宽高比和输出分辨率裁剪/缩放输入图片，减小上传体积"
+                }),
                 "filename_prefix": ("STRING", {
                     "default": "volcengine_i2v",
                     "tooltip": "保存文件名前缀"
                 }),
+                "cache_mode": (result_cache.CACHE_MODES, {
+                    "default": "auto",
+                    "tooltip": "结果缓存：auto仅缓存指定了种子的请求，always种子为-1时也缓存，off不使用缓存"
+                }),
             }
         }
 
+    @classmethod
+    def IS_CHANGED(s, image=None, seed=-1, cache_mode="auto", **kwargs):
+        """确定性请求返回稳定的缓存键，输入不变时直接复用结果"""
+        return result_cache.is_changed("jimeng_vgfm_i2v_l20", dict(kwargs, seed=seed), [image], seed=seed, mode=cache_mode)
+
     RETURN_TYPES = ("STRING", "STRING")
     RETURN_NAMES = ("video_url", "local_video_path")
-    FUNCTION = "generate_video"
+    # 输入批次的每一帧对应一个视频，两个输出都是按帧排列的列表
+    OUTPUT_IS_LIST = (True, True)
+    FUNCTION = concurrency.node_function("generate_video")
     CATEGORY = "JM-Volcengine-API/I2V"
     DESCRIPTION = "火山引擎即梦AI图生视频S2.0Pro - 从图片生成高质量视频"
 
     def __init__(self):
-        self.service = "cv"
-        self.region = "cn-north-1"
-        self.host = "visual.volcengineapi.com"
-        self.api_version = "2022-08-31"
         self.req_key = "jimeng_vgfm_i2v_l20"
+        # 模型输出视频的短边像素（720P），输入图片超出部分不会带来画质提升
+        self.output_short_side = 720
 
-    def get_sign_key(self, secret_key, date, region, service):
-        """生成签名密钥"""
-        def sign(key, msg):
-            return hmac.new(key, msg.encode('utf-8'), hashlib.sha256).digest()
-        
-        k_date = sign(secret_key.encode('utf-8'), date)
-        k_region = sign(k_date, region)
-        k_service = sign(k_region, service)
-        k_signing = sign(k_service, 'request')
-        return k_signing
+    def image_to_base64(self, image, aspect_ratio=None):
+        """
+        将ComfyUI单帧图片张量转换为base64字符串
 
-    def get_authorization(self, access_key, secret_key, method, uri, query_params, headers, payload, timestamp):
-        """生成Authorization头"""
-        # 时间格式
-        iso_timestamp = timestamp.strftime('%Y%m%dT%H%M%SZ')
-        date = timestamp.strftime('%Y%m%d')
-        
-        # 规范化请求字符串
-        canonical_headers = []
-        signed_headers = []
-        
-        # 排序并处理headers
-        sorted_headers = sorted(headers.items(), key=lambda x: x[0].lower())
-        for key, value in sorted_headers:
-            canonical_headers.append(f"{key.lower()}:{value}")
-            signed_headers.append(key.lower())
-        
-        canonical_headers_str = '\n'.join(canonical_headers)
-        signed_headers_str = ';'.join(signed_headers)
-        
-        # 规范化查询字符串
-        canonical_query_string = urlencode(sorted(query_params.items()))
-        
-        # payload哈希
-        payload_hash = hashlib.sha256(payload.encode('utf-8')).hexdigest()
-        
-        # 规范化请求
-        canonical_request = f"{method}\n{uri}\n{canonical_query_string}\n{canonical_headers_str}\n\n{signed_headers_str}\n{payload_hash}"
-        
-        # 构造待签名字符串
-        algorithm = 'HMAC-SHA256'
-        credential_scope = f"{date}/{self.region}/{self.service}/request"
-        string_to_sign = f"{algorithm}\n{iso_timestamp}\n{credential_scope}\n{hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()}"
-        
-        # 生成签名
-        signing_key = self.get_sign_key(secret_key, date, self.region, self.service)
-        signature = hmac.new(signing_key, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
-        
-        # 构造Authorization头
-        authorization = f"{algorithm} Credential={access_key}/{credential_scope}, SignedHeaders={signed_headers_str}, Signature={signature}"
-        
-        return authorization
+        提供 aspect_ratio 时先按视频宽高比居中裁剪并缩小到输出分辨率；配置了上传预算时超出部分自动降质或缩小
+        """
+        with metrics.timer("encode", self.req_key):
+            if aspect_ratio:
+                image = image_codec.fit_to_target(image, self.output_short_side, aspect_ratio)
+            image_data, _ = image_codec.encode_within_budget(image, "JPEG")
+            return request_body.Base64Field(image_data)
 
-    def image_to_base64(self, image):
-        """将ComfyUI图片张量转换为base64字符串"""
-        # 转换tensor到PIL Image
-        if len(image.shape) == 4:
-            image = image.squeeze(0)
-        
-        # 转换到numpy并调整到0-255范围
-        image_np = (image.cpu().numpy() * 255).astype(np.uint8)
-        pil_image = Image.fromarray(image_np)
-        
-        # 转换为base64
-        buffer = io.BytesIO()
-        pil_image.save(buffer, format="JPEG", quality=95)
-        image_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-        
-        return image_base64
-
-    def submit_task(self, access_key, secret_key, image_base64, aspect_ratio, prompt="", seed=-1):
-        """提交视频生成任务"""
-        # 构造请求参数
-        query_params = {
-            "Action": "CVSync2AsyncSubmitTask",
-            "Version": self.api_version
-        }
-        
+    def submit_task(self, credential, image_base64, aspect_ratio, prompt="", seed=-1):
+        """提交视频生成任务，返回 (task_id, 查询该任务必须使用的凭证)，提交失败时 task_id 为 None"""
         # 构造请求体
         body_data = {
             "req_key": self.req_key,
@@ -159,203 +99,266 @@ class VolcengineI2VS2Pro:
         if seed != -1:
             body_data["seed"] = seed
         
-        payload = json.dumps(body_data, separators=(',', ':'))
-        
-        # 构造headers
-        timestamp = datetime.datetime.utcnow()
-        headers = {
-            "Content-Type": "application/json",
-            "Host": self.host,
-            "X-Date": timestamp.strftime('%Y%m%dT%H%M%SZ')
-        }
-        
-        # 生成Authorization
-        authorization = self.get_authorization(
-            access_key, secret_key, "POST", "/", query_params, headers, payload, timestamp
-        )
-        headers["Authorization"] = authorization
-        
-        # 发送请求
-        url = f"https://{self.host}/" + "?" + urlencode(query_params)
+        return visual_task.submit(self.req_key, credential, body_data, seed)
+
+    def watch_result(self, access_key, secret_key, task_id, poll_policy=None):
+        """将任务登记到后台轮询器，返回结果为视频URL（失败或超时为None）的Future"""
+        def on_done(data):
+            video_url = data.get("video_url")
+            if video_url:
+                logger.info("视频生成完成: %s", video_url)
+            return video_url, video_url
         
+        return visual_task.watch(self.req_key, access_key, secret_key, task_id, on_done,
+                                 poll_policy or polling.VIDEO_POLICY)
+
+    def save_task_video(self, task_id, video_url, filename_prefix, filepath=None):
+        """
+        下载任务结果并记录到任务日志；之前已保存且文件仍存在时直接复用
+
+        filepath 为调用方预先占用的输出文件（get_output_path），下载完成后替换到该路径；
+        没有用上时（复用已保存的文件或下载失败）删除这个空文件
+        """
+        journal = task_journal.get_journal()
+        local_path = journal.saved_path(task_id)
+        if local_path:
+            logger.info("复用已保存的视频: %s", local_path)
+        else:
+            local_path = self.download_video(video_url, filename_prefix, filepath)
+            if local_path:
+                journal.update(task_id, task_journal.SAVED, result_path=local_path)
+        if filepath and local_path != filepath:
+            output_files.discard(filepath)
+        return local_path
+
+    def get_output_path(self, filename_prefix):
+        """在输出目录中分配唯一的视频文件路径（文件以空文件占位）"""
+        return output_files.allocate(folder_paths.output_directory, filename_prefix, "mp4")
+
+    def copy_cached_video(self, cached_path, filename_prefix, filepath=None):
+        """把缓存中的视频复制到输出目录（filepath 为预先占用的输出文件）"""
+        filepath = filepath or self.get_output_path(filename_prefix)
+        with open(filepath, 'wb') as f, open(cached_path, 'rb') as src:
+            shutil.copyfileobj(src, f, 1024 * 1024)
+        logger.info("视频已从缓存复制到: %s", filepath)
+        return filepath
+
+    def download_video(self, video_url, filename_prefix, filepath=None):
+        """
+        下载视频文件（流式写入临时文件，中断时续传，完成后再占用输出文件名）
+
+        传入 filepath 时下载完成后替换到这个预先占用的文件，不再另行分配文件名
+        """
+        def allocate():
+            return filepath or self.get_output_path(filename_prefix)
+
         try:
-            response = requests.post(url, headers=headers, data=payload, timeout=30)
-            print(f"提交任务响应状态码: {response.status_code}")
-            
-            if response.status_code == 200:
-                result = response.json()
-                print(f"提交任务响应: {result}")
-                
-                if result.get("code") == 10000:
-                    return result["data"]["task_id"]
-                else:
-                    error_msg = result.get("message", "未知错误")
-                    print(f"任务提交失败: {error_msg}")
-                    return None
-            else:
-                print(f"HTTP请求失败: {response.status_code} - {response.text}")
-                return None
-                
+            local_path = downloader.download(video_url, folder_paths.output_directory, allocate, model=self.req_key)
+            logger.info("视频已保存到: %s", local_path)
+            return local_path
         except Exception as e:
-            print(f"请求异常: {str(e)}")
+            logger.error("下载失败: %s", e)
             return None
 
-    def query_result(self, access_key, secret_key, task_id, max_retries=60, retry_interval=5):
-        """查询任务结果"""
-        # 构造请求参数
-        query_params = {
-            "Action": "CVSync2AsyncGetResult", 
-            "Version": self.api_version
-        }
-        
-        # 构造请求体
-        body_data = {
-            "req_key": self.req_key,
-            "task_id": task_id
-        }
-        
-        payload = json.dumps(body_data, separators=(',', ':'))
+    def split_frames(self, image):
+        """把输入批次拆分为单帧列表"""
+        return [image[i] for i in range(image.shape[0])] if len(image.shape) == 4 else [image]
+
+    def submit_frames(self, access_key, secret_key, frames, aspect_ratio, prompt="", seed=-1, resize_input=False):
+        """
+        每一帧各提交一个任务（并发提交），按输入顺序返回 (task_id, 结果为视频URL的Future)，失败项为 (None, None)
+
+        每个任务提交成功后立即登记到后台轮询器：任务并发名额在任务结束时才释放，
+        整批提交完再开始查询的话，超出名额的提交会一直等待
+        """
+        logger.info("开始处理图片，共 %s 帧...", len(frames))
         
-        for attempt in range(max_retries):
+        def submit_frame(frame):
+            # 转换图片为base64
+            image_base64 = self.image_to_base64(frame, aspect_ratio if resize_input else None)
+            logger.debug("图片转换完成，base64长度: %s", len(image_base64))
+            # 密钥留空时每个任务从凭证池中选择凭证
+            credential = credentials.acquire(credentials.VISUAL, access_key, secret_key)
             try:
-                # 构造headers
-                timestamp = datetime.datetime.utcnow()
-                headers = {
-                    "Content-Type": "application/json",
-                    "Host": self.host,
-                    "X-Date": timestamp.strftime('%Y%m%dT%H%M%SZ')
-                }
-                
-                # 生成Authorization
-                authorization = self.get_authorization(
-                    access_key, secret_key, "POST", "/", query_params, headers, payload, timestamp
-                )
-                headers["Authorization"] = authorization
-                
-                # 发送请求
-                url = f"https://{self.host}/" + "?" + urlencode(query_params)
-                response = requests.post(url, headers=headers, data=payload, timeout=30)
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    print(f"查询结果 (第{attempt+1}次): {result}")
-                    
-                    if result.get("code") == 10000:
-                        data = result.get("data", {})
-                        status = data.get("status", "")
-                        
-                        if status == "done":
-                            video_url = data.get("video_url")
-                            if video_url:
-                                print(f"视频生成完成: {video_url}")
-                                return video_url
-                            else:
-                                print("任务完成但未获取到视频URL")
-                                return None
-                        elif status == "failed":
-                            print("任务失败")
-                            return None
-                        else:
-                            print(f"任务进行中，状态: {status}")
-                    else:
-                        error_msg = result.get("message", "未知错误")
-                        print(f"查询失败: {error_msg}")
-                        return None
-                else:
-                    print(f"HTTP请求失败: {response.status_code} - {response.text}")
-                
-                # 等待后重试
-                if attempt < max_retries - 1:
-                    print(f"等待 {retry_interval} 秒后重试...")
-                    time.sleep(retry_interval)
-                    
-            except Exception as e:
-                print(f"查询异常: {str(e)}")
-                if attempt < max_retries - 1:
-                    time.sleep(retry_interval)
+                task_id, credential = self.submit_task(credential, image_base64, aspect_ratio, prompt, seed)
+            except cancellation.Interrupted:
+                # 等待账号的任务并发名额时被中断
+                credential.release()
+                raise
+            if not task_id:
+                credential.release()
+                return None, None
+            return task_id, credential.track(self.watch_result(credential.access_key, credential.secret_key, task_id))
         
-        print("查询超时，任务可能仍在处理中")
-        return None
+        logger.info("提交视频生成任务...")
+        results = concurrency.map_concurrent(submit_frame, frames)
+        for index, result in enumerate(results):
+            if isinstance(result, Exception):
+                logger.error("[%s] 提交任务时发生错误: %s", index, result)
+        return [(None, None) if isinstance(result, Exception) else result for result in results]
 
-    def download_video(self, video_url, filename_prefix):
-        """下载视频文件"""
-        try:
-            response = requests.get(video_url, timeout=60)
-            if response.status_code == 200:
-                # 创建输出目录
-                output_dir = os.path.join(folder_paths.output_directory)
-                os.makedirs(output_dir, exist_ok=True)
-                
-                # 生成文件名
-                counter = 1
-                while True:
-                    filename = f"{filename_prefix}_{counter:04d}.mp4"
-                    filepath = os.path.join(output_dir, filename)
-                    if not os.path.exists(filepath):
-                        break
-                    counter += 1
-                
-                # 保存文件
-                with open(filepath, 'wb') as f:
-                    f.write(response.content)
-                
-                print(f"视频已保存到: {filepath}")
-                return filepath
-            else:
-                print(f"下载失败: {response.status_code}")
-                return None
-        except Exception as e:
-            print(f"下载异常: {str(e)}")
-            return None
+    def generate_video(self, access_key, secret_key, image, aspect_ratio, prompt="", seed=-1, resize_input=False,
+                       filename_prefix="volcengine_i2v", cache_mode="auto"):
+        """
+        主要的视频生成函数
 
-    def generate_video(self, access_key, secret_key, image, aspect_ratio, prompt="", seed=-1, filename_prefix="volcengine_i2v"):
-        """主要的视频生成函数"""
+        输入批次中的每一帧各生成一个视频，所有任务并发提交、并发查询；命中结果缓存的帧不再提交。
+        video_url 与 local_video_path 为按帧排列的列表，失败的帧在 video_url 中给出错误信息
+        """
         
         # 验证必需参数
-        if not access_key or not secret_key:
-            return "错误：请提供有效的AccessKey和SecretKey", ""
+        if not credentials.available(credentials.VISUAL, access_key, secret_key):
+            return ["错误：请提供有效的AccessKey和SecretKey，或配置凭证池"], [""]
         
         try:
-            print("开始处理图片...")
-            # 转换图片为base64
-            image_base64 = self.image_to_base64(image)
-            print(f"图片转换完成，base64长度: {len(image_base64)}")
+            frames = self.split_frames(image)
+            batch_size = len(frames)
+            video_urls = [""] * batch_size
+            local_paths = [""] * batch_size
             
-            print("提交视频生成任务...")
-            # 提交任务
-            task_id = self.submit_task(access_key, secret_key, image_base64, aspect_ratio, prompt, seed)
+            # 查找结果缓存，命中的帧不再提交，稍后直接复制缓存的视频
+            cache_keys = [None] * batch_size
+            cache_hits = {}
+            if result_cache.should_cache(seed, cache_mode):
+                params = {"aspect_ratio": aspect_ratio, "prompt": prompt, "seed": seed, "resize_input": resize_input}
+                for index, frame in enumerate(frames):
+                    cache_keys[index] = result_cache.cache_key(self.req_key, dict(params, variant=index if seed == -1 else 0), [frame])
+                    hit = result_cache.get_cache().get(cache_keys[index])
+                    if hit:
+                        logger.info("[%s] 命中结果缓存", index)
+                        cache_hits[index] = hit
+            todo = [index for index in range(batch_size) if index not in cache_hits]
             
-            if not task_id:
-                return "错误：任务提交失败", ""
+            # 所有任务交由后台轮询器统一查询
+            task_ids = [None] * batch_size
+            futures = {}
+            for index, (task_id, future) in zip(todo, self.submit_frames(access_key, secret_key, [frames[i] for i in todo],
+                                                                         aspect_ratio, prompt, seed, resize_input)):
+                task_ids[index] = task_id
+                futures[index] = future
+            
+            pending = []
+            for index in todo:
+                if not task_ids[index]:
+                    video_urls[index] = "错误：任务提交失败"
+                else:
+                    logger.info("[%s] 任务提交成功，task_id: %s", index, task_ids[index])
+                    pending.append(index)
             
-            print(f"任务提交成功，task_id: {task_id}")
-            print("等待视频生成完成...")
+            # 下载按完成先后进行，输出文件名先按帧顺序占好，文件序号与列表顺序一致
+            reserved = {index: self.get_output_path(filename_prefix)
+                        for index in range(batch_size) if index in cache_hits or task_ids[index]}
+            for index, hit in cache_hits.items():
+                video_urls[index] = hit[1].get("video_url", "")
+                local_paths[index] = self.copy_cached_video(hit[0], filename_prefix, reserved[index])
             
-            # 查询结果
-            video_url = self.query_result(access_key, secret_key, task_id)
+            logger.info("等待 %s 个视频生成完成...", len(pending))
             
-            if not video_url:
-                return "错误：视频生成失败或超时", ""
+            def collect(index):
+                # 等待查询结果
+                try:
+                    video_url = futures[index].result()
+                except Exception:
+                    output_files.discard(reserved[index])
+                    raise
+                if not video_url:
+                    output_files.discard(reserved[index])
+                    return "错误：视频生成失败或超时", ""
+                
+                logger.info("[%s] 开始下载视频...", index)
+                # 下载视频到预先占用的文件
+                local_path = self.save_task_video(task_ids[index], video_url, filename_prefix, reserved[index])
+                if local_path and cache_keys[index]:
+                    result_cache.get_cache().put(cache_keys[index], "mp4", src_path=local_path,
+                                                 meta={"video_url": video_url})
+                return video_url, local_path or "下载失败，但可通过URL访问"
             
-            print("开始下载视频...")
-            # 下载视频
-            local_path = self.download_video(video_url, filename_prefix)
+            # 按完成情况并发下载；等待期间响应 ComfyUI 的中断并报告进度，中断时取消所有未完成的任务
+            results = cancellation.run(lambda: concurrency.map_concurrent(collect, pending),
+                                       tasks=[futures[index] for index in pending], key=self.req_key)
+            for index, result in zip(pending, results):
+                if isinstance(result, Exception):
+                    video_urls[index] = f"生成视频时发生错误: {str(result)}"
+                else:
+                    video_urls[index], local_paths[index] = result
             
-            if local_path:
-                return video_url, local_path
-            else:
-                return video_url, "下载失败，但可通过URL访问"
+            return video_urls, local_paths
                 
+        except cancellation.Interrupted:
+            raise
         except Exception as e:
             error_msg = f"生成视频时发生错误: {str(e)}"
-            print(error_msg)
-            return error_msg, ""
+            logger.error(error_msg)
+            return [error_msg], [""]
+
+    async def generate_video_async(self, **kwargs):
+        """协程版本：在工作线程中执行 generate_video，等待视频生成期间 ComfyUI 可以执行其他节点"""
+        return await concurrency.run_blocking(self.generate_video, **kwargs)
+
+class VolcengineI2VS2ProSubmit(VolcengineI2VS2Pro):
+    """只提交任务并立即返回任务句柄，由 Volcengine Task Collect 节点统一等待和下载"""
+
+    @classmethod
+    def INPUT_TYPES(s):
+        input_types = super().INPUT_TYPES()
+        input_types["optional"].pop("filename_prefix")
+        input_types["optional"].pop("cache_mode")
+        return input_types
+
+    @classmethod
+    def IS_CHANGED(s, **kwargs):
+        """
+        在生成节点的缓存键上加入中断取消次数：Collect 被中断时会取消句柄中的 Future，
+        ComfyUI 缓存的句柄随之失效，再次运行时重新提交（任务日志会接上未取消的任务）
+        """
+        key = super().IS_CHANGED(**kwargs)
+        return key if isinstance(key, float) else f"{key}:{cancellation.cancel_epoch()}"
+
+    RETURN_TYPES = ("VOLCENGINE_TASK",)
+    RETURN_NAMES = ("task",)
+    # 句柄列表作为一个值传给 Collect 节点
+    OUTPUT_IS_LIST = (False,)
+    FUNCTION = "submit"
+    DESCRIPTION = "火山引擎即梦AI图生视频S2.0Pro - 提交任务并返回任务句柄，批量输入每帧一个任务"
+
+    def make_handle(self, task_id=None, result=None, error=None):
+        """构造在提交/收集节点之间传递的任务句柄，result 为结果是 (video_url, 错误信息) 的Future"""
+        return {"kind": "i2v", "task_id": task_id, "result": result, "error": error}
+
+    def submit(self, access_key, secret_key, image, aspect_ratio, prompt="", seed=-1, resize_input=False):
+        """提交任务并登记到后台轮询器，不等待生成完成"""
+        if not credentials.available(credentials.VISUAL, access_key, secret_key):
+            return ([self.make_handle(error="错误：请提供有效的AccessKey和SecretKey，或配置凭证池")],)
+        
+        try:
+            handles = []
+            frames = self.split_frames(image)
+            for index, (task_id, future) in enumerate(self.submit_frames(access_key, secret_key, frames, aspect_ratio,
+                                                                               prompt, seed, resize_input)):
+                if not task_id:
+                    handles.append(self.make_handle(error="错误：任务提交失败"))
+                    continue
+                logger.info("[%s] 任务提交成功，task_id: %s", index, task_id)
+                result = task_poller.then(
+                    future,
+                    lambda video_url: (video_url, None) if video_url else (None, "错误：视频生成失败或超时"),
+                )
+                handles.append(self.make_handle(task_id, result))
+            return (handles,)
+            
+        except cancellation.Interrupted:
+            raise
+        except Exception as e:
+            logger.error("提交任务时发生错误: %s", e)
+            return ([self.make_handle(error=f"生成视频时发生错误: {str(e)}")],)
 
 # 节点映射
 NODE_CLASS_MAPPINGS = {
-    "VolcengineI2VS2Pro": VolcengineI2VS2Pro
+    "VolcengineI2VS2Pro": VolcengineI2VS2Pro,
+    "VolcengineI2VS2ProSubmit": VolcengineI2VS2ProSubmit
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
-    "VolcengineI2VS2Pro": "Volcengine I2V S2.0Pro"
+    "VolcengineI2VS2Pro": "Volcengine I2V S2.0Pro",
+    "VolcengineI2VS2ProSubmit": "Volcengine I2V S2.0Pro Submit"
 } 
\ No newline at end of file
@@ -1,18 +1,15 @@
 import json
-import time
 import base64
-import hashlib
-import hmac
-import datetime
-from urllib.parse import urlencode
-import requests
+from ..utils import cancellation, concurrency, credentials, http_client, image_codec, log, metrics, polling, request_body, result_cache, task_journal, visual_task, writer
 import torch
 import numpy as np
 from PIL import Image
-import io
 import os
+import time
 import folder_paths
 
+logger = log.get_logger("img_edit")
+
 class VolcengineImgEditV3:
     @classmethod
     def INPUT_TYPES(s):
@@ -21,12 +18,12 @@ class VolcengineImgEditV3:
                 "access_key": ("STRING", {
                     "default": "",
                     "multiline": False,
-                    "tooltip": "火山引擎访问密钥AccessKey"
+                    "tooltip": "火山引擎访问密钥AccessKey，与SecretKey同时留空时使用凭证池"
                 }),
                 "secret_key": ("STRING", {
                     "default": "",
                     "multiline": False,
-                    "tooltip": "火山引擎访问密钥SecretKey"
+                    "tooltip": "火山引擎访问密钥SecretKey，与AccessKey同时留空时使用凭证池"
                 }),
                 "image": ("IMAGE", {
                     "tooltip": "输入图片"
@@ -59,177 +56,73 @@ class VolcengineImgEditV3:
                     "default": True,
                     "tooltip": "是否返回图片URL链接（24小时有效）"
                 }),
+                "cache_mode": (result_cache.CACHE_MODES, {
+                    "default": "auto",
+                    "tooltip": "结果缓存：auto仅缓存指定了种子的请求，always种子为-1时也缓存，off不使用缓存"
+                }),
             }
         }
 
+    @classmethod
+    def IS_CHANGED(s, image=None, seed=-1, cache_mode="auto", **kwargs):
+        """确定性请求返回稳定的缓存键，输入不变时直接复用结果"""
+        return result_cache.is_changed("seededit_v3.0", dict(kwargs, seed=seed), [image], seed=seed, mode=cache_mode)
+
     RETURN_TYPES = ("IMAGE", "STRING", "STRING")
     RETURN_NAMES = ("image", "image_url", "local_image_path")
-    FUNCTION = "edit_image"
+    FUNCTION = concurrency.node_function("edit_image")
     CATEGORY = "JM-Volcengine-API/ImgEdit"
     DESCRIPTION = "火山引擎图生图3.0指令编辑SeedEdit3.0模型 - 根据文字指令编辑图片"
 
     def __init__(self):
-        self.service = "cv"
-        self.region = "cn-north-1"
-        self.host = "visual.volcengineapi.com"
-        self.endpoint = "https://visual.volcengineapi.com"
         self.req_key = "seededit_v3.0"
 
-    def sign(self, key, msg):
-        """HMAC-SHA256签名"""
-        return hmac.new(key, msg.encode('utf-8'), hashlib.sha256).digest()
-
-    def get_signature_key(self, key, date_stamp, region_name, service_name):
-        """生成签名密钥"""
-        k_date = self.sign(key.encode('utf-8'), date_stamp)
-        k_region = self.sign(k_date, region_name)
-        k_service = self.sign(k_region, service_name)
-        k_signing = self.sign(k_service, 'request')
-        return k_signing
-
-    def format_query(self, parameters):
-        """格式化查询参数"""
-        request_parameters_init = ''
-        for key in sorted(parameters):
-            request_parameters_init += key + '=' + parameters[key] + '&'
-        request_parameters = request_parameters_init[:-1]
-        return request_parameters
-
-    def sign_v4_request(self, access_key, secret_key, req_query, req_body):
-        """AWS V4签名"""
-        if access_key is None or secret_key is None:
-            raise ValueError('No access key is available.')
-
-        t = datetime.datetime.utcnow()
-        current_date = t.strftime('%Y%m%dT%H%M%SZ')
-        datestamp = t.strftime('%Y%m%d')
-        
-        canonical_uri = '/'
-        canonical_querystring = req_query
-        signed_headers = 'content-type;host;x-content-sha256;x-date'
-        payload_hash = hashlib.sha256(req_body.encode('utf-8')).hexdigest()
-        content_type = 'application/json'
-        
-        canonical_headers = 'content-type:' + content_type + '\n' + \
-                          'host:' + self.host + '\n' + \
-                          'x-content-sha256:' + payload_hash + '\n' + \
-                          'x-date:' + current_date + '\n'
-        
-        canonical_request = 'POST' + '\n' + canonical_uri + '\n' + \
-                          canonical_querystring + '\n' + canonical_headers + \
-                          '\n' + signed_headers + '\n' + payload_hash
-        
-        algorithm = 'HMAC-SHA256'
-        credential_scope = datestamp + '/' + self.region + '/' + self.service + '/' + 'request'
-        string_to_sign = algorithm + '\n' + current_date + '\n' + \
-                        credential_scope + '\n' + \
-                        hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()
-        
-        signing_key = self.get_signature_key(secret_key, datestamp, self.region, self.service)
-        signature = hmac.new(signing_key, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
-        
-        authorization_header = algorithm + ' ' + 'Credential=' + access_key + '/' + \
-                             credential_scope + ', ' + 'SignedHeaders=' + \
-                             signed_headers + ', ' + 'Signature=' + signature
-        
-        headers = {
-            'X-Date': current_date,
-            'Authorization': authorization_header,
-            'X-Content-Sha256': payload_hash,
-            'Content-Type': content_type
-        }
-        
-        return headers
-
     def image_to_base64(self, image):
-        """将ComfyUI图片张量转换为base64字符串"""
-        # 转换tensor到PIL Image
-        if len(image.shape) == 4:
-            image = image.squeeze(0)
-        
-        # 转换到numpy并调整到0-255范围
-        image_np = (image.cpu().numpy() * 255).astype(np.uint8)
-        pil_image = Image.fromarray(image_np)
-        
-        # 转换为base64
-        buffer = io.BytesIO()
-        pil_image.save(buffer, format="JPEG", quality=95)
-        image_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-        
-        return image_base64
+        """将ComfyUI单帧图片张量转换为base64字符串，配置了上传预算时超出部分自动降质或缩小"""
+        with metrics.timer("encode", self.req_key):
+            image_data, _ = image_codec.encode_within_budget(image, "JPEG")
+            return request_body.Base64Field(image_data)
 
     def download_image(self, image_url):
-        """下载图片并转换为ComfyUI格式"""
+        """下载图片，返回服务端的原始字节"""
         try:
-            response = requests.get(image_url, timeout=30)
+            start = time.perf_counter()
+            response = http_client.get(image_url, read_timeout=30)
             if response.status_code == 200:
-                # 转换为PIL Image
-                pil_image = Image.open(io.BytesIO(response.content))
-                
-                # 确保是RGB格式
-                if pil_image.mode != 'RGB':
-                    pil_image = pil_image.convert('RGB')
-                
-                # 转换为numpy数组
-                image_np = np.array(pil_image).astype(np.float32) / 255.0
-                
-                # 转换为PyTorch张量
-                image_tensor = torch.from_numpy(image_np)[None,]
-                
-                return image_tensor
+                metrics.observe_phase("download", self.req_key, time.perf_counter() - start)
+                metrics.count_bytes(self.req_key, "download", len(response.content))
+                return response.content
             else:
-                print(f"下载图片失败: HTTP {response.status_code}")
+                logger.error("下载图片失败: HTTP %s", response.status_code)
                 return None
         except Exception as e:
-            print(f"下载图片异常: {str(e)}")
+            logger.error("下载图片异常: %s", e)
             return None
 
-    def decode_base64_image(self, base64_str):
-        """解码base64图片为ComfyUI格式"""
+    def decode_image(self, image_data):
+        """解码图片字节为ComfyUI格式，返回 (图片张量, 图片格式)，失败时返回 (None, None)"""
         try:
-            # 解码base64
-            image_data = base64.b64decode(base64_str)
-            
-            # 转换为PIL Image
-            pil_image = Image.open(io.BytesIO(image_data))
-            
-            # 确保是RGB格式
-            if pil_image.mode != 'RGB':
-                pil_image = pil_image.convert('RGB')
-            
-            # 转换为numpy数组
-            image_np = np.array(pil_image).astype(np.float32) / 255.0
-            
-            # 转换为PyTorch张量
-            image_tensor = torch.from_numpy(image_np)[None,]
-            
-            return image_tensor
+            with metrics.timer("decode", self.req_key):
+                return image_codec.decode_image(image_data)
         except Exception as e:
-            print(f"解码base64图片异常: {str(e)}")
-            return None
+            logger.error("解码图片异常: %s", e)
+            return None, None
 
-    def save_image(self, pil_image, filename_prefix):
-        """保存图片到本地"""
+    def save_image(self, image_data, image_format, filename_prefix, on_saved=None):
+        """
+        把图片字节原样保存到本地（或按 JM_VOLCENGINE_OUTPUT_FORMAT 转换一次），不重新编码张量
+
+        启用 JM_VOLCENGINE_ASYNC_WRITES 时立即返回预留的路径（返回给下游之前须 writer.wait），
+        on_saved(路径) 在文件写完后调用
+        """
         try:
-            # 创建输出目录
-            output_dir = os.path.join(folder_paths.output_directory)
-            os.makedirs(output_dir, exist_ok=True)
-            
-            # 生成文件名
-            counter = 1
-            while True:
-                filename = f"{filename_prefix}_{counter:04d}.png"
-                filepath = os.path.join(output_dir, filename)
-                if not os.path.exists(filepath):
-                    break
-                counter += 1
-            
-            # 保存文件
-            pil_image.save(filepath, "PNG")
-            print(f"图片已保存到: {filepath}")
+            with metrics.timer("save", self.req_key):
+                data, extension = image_codec.output_data(image_data, image_format)
+                filepath = writer.save(folder_paths.output_directory, filename_prefix, extension, data, on_saved)
+            logger.info("图片已保存到: %s", filepath)
             return filepath
         except Exception as e:
-            print(f"保存图片异常: {str(e)}")
+            logger.error("保存图片异常: %s", e)
             return None
 
     def create_blank_image(self):
@@ -239,15 +132,8 @@ class VolcengineImgEditV3:
         image_tensor = torch.from_numpy(image_np)[None,]
         return image_tensor
 
-    def submit_task(self, access_key, secret_key, image_base64, prompt, scale=0.5, seed=-1):
-        """提交图片编辑任务"""
-        # 构造请求参数
-        query_params = {
-            'Action': 'CVSync2AsyncSubmitTask',
-            'Version': '2022-08-31'
-        }
-        formatted_query = self.format_query(query_params)
-        
+    def submit_task(self, credential, image_base64, prompt, scale=0.5, seed=-1):
+        """提交图片编辑任务，返回 (task_id, 查询该任务必须使用的凭证)，提交失败时 task_id 为 None"""
         # 构造请求体
         body_params = {
             "req_key": self.req_key,
@@ -260,48 +146,12 @@ class VolcengineImgEditV3:
         if seed != -1:
             body_params["seed"] = seed
         
-        formatted_body = json.dumps(body_params)
-        
-        try:
-            print("生成请求签名...")
-            # 生成签名
-            headers = self.sign_v4_request(access_key, secret_key, formatted_query, formatted_body)
-            
-            # 发送请求
-            request_url = self.endpoint + '?' + formatted_query
-            print("提交编辑任务...")
-            
-            response = requests.post(request_url, headers=headers, data=formatted_body, timeout=30)
-            print(f"提交任务响应状态码: {response.status_code}")
-            
-            if response.status_code == 200:
-                result = response.json()
-                print(f"提交任务响应: {result}")
-                
-                if result.get("code") == 10000:
-                    return result["data"]["task_id"]
-                else:
-                    error_msg = result.get("message", "未知错误")
-                    print(f"任务提交失败: {error_msg}")
-                    return None
-            else:
-                print(f"HTTP请求失败: {response.status_code} - {response.text}")
-                return None
-                
-        except Exception as e:
-            print(f"请求异常: {str(e)}")
-            return None
+        logger.info("提交编辑任务...")
+        return visual_task.submit(self.req_key, credential, body_params, seed)
 
-    def query_result(self, access_key, secret_key, task_id, return_url=True, max_retries=60, retry_interval=5):
-        """查询任务结果"""
-        # 构造请求参数
-        query_params = {
-            'Action': 'CVSync2AsyncGetResult',
-            'Version': '2022-08-31'
-        }
-        formatted_query = self.format_query(query_params)
-        
-        # 构造请求体，添加req_json参数来控制返回格式
+    def watch_result(self, access_key, secret_key, task_id, return_url=True, poll_policy=None):
+        """将任务登记到后台轮询器，返回结果为图片数据字典（失败或超时为None）的Future"""
+        # 查询请求体中添加req_json参数来控制返回格式
         req_json_config = {
             "return_url": return_url,
             "add_logo": False,
@@ -310,140 +160,208 @@ class VolcengineImgEditV3:
             "opacity": 0.3
         }
         
-        body_params = {
-            "req_key": self.req_key,
-            "task_id": task_id,
-            "req_json": json.dumps(req_json_config)
-        }
+        def on_done(data):
+            image_urls = data.get("image_urls")
+            binary_data_base64 = data.get("binary_data_base64")
+            if image_urls and len(image_urls) > 0:
+                logger.info("获取到图片URL: %s", image_urls[0])
+                return {"type": "url", "data": image_urls[0]}, image_urls[0]
+            if binary_data_base64 and len(binary_data_base64) > 0:
+                logger.info("获取到base64图片数据")
+                return {"type": "base64", "data": binary_data_base64[0]}, None
+            return None, None
         
-        formatted_body = json.dumps(body_params)
-        
-        for attempt in range(max_retries):
-            try:
-                print(f"查询任务结果 (第{attempt+1}次)...")
-                # 生成签名
-                headers = self.sign_v4_request(access_key, secret_key, formatted_query, formatted_body)
-                
-                # 发送请求
-                request_url = self.endpoint + '?' + formatted_query
-                response = requests.post(request_url, headers=headers, data=formatted_body, timeout=30)
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    print(f"查询结果响应: {result}")
-                    
-                    if result.get("code") == 10000:
-                        data = result.get("data", {})
-                        status = data.get("status", "")
-                        
-                        if status == "done":
-                            # 任务完成，获取结果
-                            image_urls = data.get("image_urls")
-                            binary_data_base64 = data.get("binary_data_base64")
-                            
-                            if image_urls and len(image_urls) > 0:
-                                print(f"获取到图片URL: {image_urls[0]}")
-                                return {"type": "url", "data": image_urls[0]}
-                            elif binary_data_base64 and len(binary_data_base64) > 0:
-                                print("获取到base64图片数据")
-                                return {"type": "base64", "data": binary_data_base64[0]}
-                            else:
-                                print("任务完成但未获取到图片数据")
-                                return None
-                        elif status in ["in_queue", "generating"]:
-                            print(f"任务进行中，状态: {status}")
-                        elif status == "not_found":
-                            print("任务未找到")
-                            return None
-                        elif status == "expired":
-                            print("任务已过期")
-                            return None
-                        else:
-                            print(f"未知状态: {status}")
-                    else:
-                        error_msg = result.get("message", "未知错误")
-                        print(f"查询失败: {error_msg}")
-                        return None
-                else:
-                    print(f"HTTP请求失败: {response.status_code} - {response.text}")
-                
-                # 等待后重试
-                if attempt < max_retries - 1:
-                    print(f"等待 {retry_interval} 秒后重试...")
-                    time.sleep(retry_interval)
-                    
-            except Exception as e:
-                print(f"查询异常: {str(e)}")
-                if attempt < max_retries - 1:
-                    time.sleep(retry_interval)
+        return visual_task.watch(self.req_key, access_key, secret_key, task_id, on_done,
+                                 poll_policy or polling.IMAGE_POLICY,
+                                 extra_body={"req_json": json.dumps(req_json_config)})
+
+    def stack_results(self, tensors):
+        """按输入顺序拼接结果，失败项用黑图占位，尺寸不一致时缩放到第一张成功结果的尺寸"""
+        reference = next((t for t in tensors if t is not None), None)
+        if reference is None:
+            return self.create_blank_image()
         
-        print("查询超时，任务可能仍在处理中")
-        return None
+        height, width = reference.shape[1], reference.shape[2]
+        frames = []
+        for tensor in tensors:
+            if tensor is None:
+                tensor = torch.zeros((1, height, width, 3), dtype=torch.float32)
+            elif tensor.shape[1] != height or tensor.shape[2] != width:
+                tensor = torch.nn.functional.interpolate(
+                    tensor.permute(0, 3, 1, 2), size=(height, width), mode="bilinear", align_corners=False
+                ).permute(0, 2, 3, 1)
+            frames.append(tensor)
+        return torch.cat(frames, dim=0)
+
+    def edit_image(self, access_key, secret_key, image, prompt, scale=0.5, seed=-1, filename_prefix="seededit_v3", return_url=True,
+                   cache_mode="auto"):
+        """
+        主要的图片编辑函数
 
-    def edit_image(self, access_key, secret_key, image, prompt, scale=0.5, seed=-1, filename_prefix="seededit_v3", return_url=True):
-        """主要的图片编辑函数"""
+        输入批次中的每一帧各提交一个任务，并发提交、并发查询，按输入顺序返回结果；
+        命中结果缓存的帧不再提交。image_url 与 local_image_path 按行对应每一帧，失败帧标注错误信息
+        """
         
         # 验证必需参数
-        if not access_key or not secret_key:
-            return self.create_blank_image(), "错误：请提供有效的AccessKey和SecretKey", ""
+        if not credentials.available(credentials.VISUAL, access_key, secret_key):
+            return self.create_blank_image(), "错误：请提供有效的AccessKey和SecretKey，或配置凭证池", ""
         
         if not prompt.strip():
             return self.create_blank_image(), "错误：请提供编辑指令", ""
         
         try:
-            print("开始处理图片...")
-            # 转换图片为base64
-            image_base64 = self.image_to_base64(image)
-            print(f"图片转换完成，base64长度: {len(image_base64)}")
+            frames = [image[i] for i in range(image.shape[0])] if len(image.shape) == 4 else [image]
+            batch_size = len(frames)
+            logger.info("开始处理图片，共 %s 帧...", batch_size)
             
-            # 提交任务
-            task_id = self.submit_task(access_key, secret_key, image_base64, prompt, scale, seed)
+            def submit_frame(frame):
+                # 转换图片为base64
+                image_base64 = self.image_to_base64(frame)
+                logger.debug("图片转换完成，base64长度: %s", len(image_base64))
+                # 密钥留空时每个任务从凭证池中选择凭证
+                credential = credentials.acquire(credentials.VISUAL, access_key, secret_key)
+                try:
+                    task_id, credential = self.submit_task(credential, image_base64, prompt, scale, seed)
+                except cancellation.Interrupted:
+                    # 等待账号的任务并发名额时被中断
+                    credential.release()
+                    raise
+                if not task_id:
+                    credential.release()
+                    return None, None
+                # 提交成功后立即登记查询：任务并发名额在任务结束时才释放，整批提交完再查询会使超出名额的提交一直等待
+                return task_id, credential.track(
+                    self.watch_result(credential.access_key, credential.secret_key, task_id, return_url))
             
-            if not task_id:
-                return self.create_blank_image(), "错误：任务提交失败", ""
+            # 查找结果缓存，命中的帧不再提交
+            cache_keys = [None] * batch_size
+            cache_hits = {}
+            if result_cache.should_cache(seed, cache_mode):
+                params = {"prompt": prompt, "scale": scale, "seed": seed, "return_url": return_url}
+                for index, frame in enumerate(frames):
+                    cache_keys[index] = result_cache.cache_key(self.req_key, dict(params, variant=index if seed == -1 else 0), [frame])
+                    hit = result_cache.get_cache().get(cache_keys[index])
+                    if hit:
+                        logger.info("[%s] 命中结果缓存", index)
+                        cache_hits[index] = hit
+            todo = [index for index in range(batch_size) if index not in cache_hits]
             
-            print(f"任务提交成功，task_id: {task_id}")
-            print("等待任务完成...")
+            # 并发提交所有任务
+            task_ids = [None] * batch_size
+            watches = [None] * batch_size
+            for index, result in zip(todo, concurrency.map_concurrent(submit_frame, [frames[i] for i in todo])):
+                if isinstance(result, Exception):
+                    logger.error("[%s] 提交任务时发生错误: %s", index, result)
+                else:
+                    task_ids[index], watches[index] = result
             
-            # 查询结果
-            result = self.query_result(access_key, secret_key, task_id, return_url)
+            errors = [None] * batch_size
+            for index in todo:
+                if not task_ids[index]:
+                    errors[index] = "错误：任务提交失败"
+                else:
+                    logger.info("[%s] 任务提交成功，task_id: %s", index, task_ids[index])
             
-            if not result:
-                return self.create_blank_image(), "错误：任务执行失败或超时", ""
+            pending = [index for index in todo if errors[index] is None]
+            logger.info("等待 %s 个任务完成...", len(pending))
             
-            # 处理结果
-            if result["type"] == "url":
-                image_url = result["data"]
-                # 下载图片
-                image_tensor = self.download_image(image_url)
-                if image_tensor is not None:
-                    # 保存图片
-                    pil_image = Image.fromarray((image_tensor.squeeze(0).cpu().numpy() * 255).astype(np.uint8))
-                    local_path = self.save_image(pil_image, filename_prefix)
-                    return image_tensor, image_url, local_path or "保存失败"
-                else:
-                    return self.create_blank_image(), f"错误：下载图片失败 - {image_url}", ""
-            elif result["type"] == "base64":
-                base64_str = result["data"]
-                # 解码base64图片
-                image_tensor = self.decode_base64_image(base64_str)
-                if image_tensor is not None:
-                    # 保存图片
-                    pil_image = Image.fromarray((image_tensor.squeeze(0).cpu().numpy() * 255).astype(np.uint8))
-                    local_path = self.save_image(pil_image, filename_prefix)
+            def load_cached(index):
+                """读取命中缓存的图片并解码、保存，返回 (图片张量, image_url, 本地路径) 或错误信息"""
+                cached_path, meta = cache_hits[index]
+                with open(cached_path, 'rb') as f:
+                    image_data = f.read()
+                image_tensor, image_format = self.decode_image(image_data)
+                if image_tensor is None:
+                    return "错误：解码图片失败"
+                local_path = self.save_image(image_data, image_format, filename_prefix)
+                return image_tensor, meta.get("image_url", ""), local_path
+            
+            def collect(index):
+                """等待单帧任务完成后下载（或解码base64）、解码并保存，返回 (图片张量, image_url, 本地路径) 或错误信息"""
+                try:
+                    result = watches[index].result()
+                except Exception:
+                    result = None
+                if not result:
+                    return "错误：任务执行失败或超时"
+                
+                # 处理结果
+                if result["type"] == "url":
+                    image_url = result["data"]
+                    # 下载图片
+                    image_data = self.download_image(image_url)
+                    if image_data is None:
+                        return f"错误：下载图片失败 - {image_url}"
+                elif result["type"] == "base64":
+                    base64_str = result["data"]
+                    # 解码base64图片
+                    try:
+                        image_data = base64.b64decode(base64_str)
+                    except ValueError:
+                        return "错误：解码base64图片失败"
                     # 返回base64数据类型说明，而不是简单的"base64数据"
-                    image_url_info = f"Base64编码数据 (长度: {len(base64_str)} 字符)"
-                    return image_tensor, image_url_info, local_path or "保存失败"
+                    image_url = f"Base64编码数据 (长度: {len(base64_str)} 字符)"
                 else:
-                    return self.create_blank_image(), "错误：解码base64图片失败", ""
+                    return "错误：未知的返回格式"
+                
+                image_tensor, image_format = self.decode_image(image_data)
+                if image_tensor is None:
+                    return "错误：解码图片失败"
+                
+                def on_saved(path):
+                    # 文件写完后才记录到任务日志和结果缓存
+                    task_journal.get_journal().update(task_ids[index], task_journal.SAVED, result_path=path)
+                    if cache_keys[index]:
+                        result_cache.get_cache().put(cache_keys[index], os.path.splitext(path)[1][1:], src_path=path,
+                                                     meta={"image_url": image_url})
+                
+                # 保存服务端返回的原始图片字节
+                local_path = self.save_image(image_data, image_format, filename_prefix, on_saved)
+                return image_tensor, image_url, local_path
             
-            return self.create_blank_image(), "错误：未知的返回格式", ""
+            # 所有任务已在提交时交由后台轮询器统一查询；各帧完成后的下载、解码与保存也并发进行。
+            # 等待期间响应 ComfyUI 的中断并报告进度，中断时取消所有未完成的任务
+            ready = [index for index in range(batch_size) if index in cache_hits or index in pending]
+            results = cancellation.run(
+                lambda: concurrency.map_concurrent(lambda i: load_cached(i) if i in cache_hits else collect(i), ready),
+                tasks=[watches[index] for index in pending], key=self.req_key)
+            
+            tensors = [None] * batch_size
+            image_urls = [""] * batch_size
+            local_paths = [""] * batch_size
+            for index, result in zip(ready, results):
+                if isinstance(result, Exception):
+                    errors[index] = f"错误：处理结果时发生错误 - {result}"
+                elif isinstance(result, str):
+                    errors[index] = result
+                else:
+                    tensors[index], image_urls[index], local_path = result
+                    # 后台写盘时路径在写完之前是空的占位文件，交给下游节点之前等待写完
+                    local_paths[index] = local_path if local_path and writer.wait(local_path) else "保存失败"
+            
+            for index, error in enumerate(errors):
+                if error:
+                    logger.error("[%s] %s", index, error)
+            
+            if batch_size == 1:
+                if errors[0]:
+                    return self.create_blank_image(), errors[0], ""
+                return tensors[0], image_urls[0], local_paths[0]
+            
+            url_lines = [errors[i] or image_urls[i] for i in range(batch_size)]
+            return self.stack_results(tensors), "\n".join(url_lines), "\n".join(local_paths)
                 
+        except cancellation.Interrupted:
+            raise
         except Exception as e:
             error_msg = f"编辑图片时发生错误: {str(e)}"
-            print(error_msg)
+            logger.error(error_msg)
             return self.create_blank_image(), error_msg, ""
 
+    async def edit_image_async(self, **kwargs):
+        """协程版本：在工作线程中执行 edit_image，等待编辑结果期间 ComfyUI 可以执行其他节点"""
+        return await concurrency.run_blocking(self.edit_image, **kwargs)
+
 # 节点映射
 NODE_CLASS_MAPPINGS = {
     "VolcengineImgEditV3": VolcengineImgEditV3
@@ -1,14 +1,8 @@
-import json
 import base64
-import datetime
-import hashlib
-import hmac
-import requests
+from ..utils import cancellation, concurrency, config, credentials, governor, http_client, image_codec, log, metrics, request_body, result_cache, retry, signer, writer
 import torch
-import numpy as np
-from PIL import Image
-import io
-import os
+
+logger = log.get_logger("seedream")
 
 
 class VolcengineSeeDreamV3Node:
@@ -20,8 +14,9 @@ class VolcengineSeeDreamV3Node:
         self.method = 'POST'
         self.host = 'visual.volcengineapi.com'
         self.region = 'cn-north-1'
-        self.endpoint = 'https://visual.volcengineapi.com'
+        self.endpoint = config.VISUAL_ENDPOINT
         self.service = 'cv'
+        self.req_key = 'high_aes_general_v30l_zt2i'
     
     @classmethod
     def INPUT_TYPES(cls):
@@ -38,133 +33,47 @@ class VolcengineSeeDreamV3Node:
                 "aspect_ratio": (["1:1", "4:3", "3:2", "16:9", "9:16", "21:9"], {"default": "1:1"}),
                 "return_url": ("BOOLEAN", {"default": True}),
                 "filename_prefix": ("STRING", {"default": "seedream", "multiline": False}),
+                "batch_size": ("INT", {"default": 1, "min": 1, "max": 16}),
+                "cache_mode": (result_cache.CACHE_MODES, {"default": "auto"}),
             }
         }
     
-    RETURN_TYPES = ("IMAGE", "STRING")
-    RETURN_NAMES = ("image", "image_url")
-    FUNCTION = "generate_image"
-    CATEGORY = "JM-Volcengine-API/Seedream"
-    
-    def sign(self, key, msg):
-        """Generate HMAC signature"""
-        return hmac.new(key, msg.encode('utf-8'), hashlib.sha256).digest()
-    
-    def get_signature_key(self, key, date_stamp, region_name, service_name):
-        """Generate signature key"""
-        k_date = self.sign(key.encode('utf-8'), date_stamp)
-        k_region = self.sign(k_date, region_name)
-        k_service = self.sign(k_region, service_name)
-        k_signing = self.sign(k_service, 'request')
-        return k_signing
+    @classmethod
+    def IS_CHANGED(cls, seed=-1, cache_mode="auto", **kwargs):
+        """Deterministic requests keep a stable key so ComfyUI and the disk cache can reuse results"""
+        return result_cache.is_changed("high_aes_general_v30l_zt2i", dict(kwargs, seed=seed), seed=seed, mode=cache_mode)
     
-    def format_query(self, parameters):
-        """Format query parameters"""
-        request_parameters_init = ''
-        for key in sorted(parameters):
-            request_parameters_init += key + '=' + parameters[key] + '&'
-        request_parameters = request_parameters_init[:-1]
-        return request_parameters
+    RETURN_TYPES = ("IMAGE", "STRING", "STRING")
+    RETURN_NAMES = ("image", "image_url", "image_urls")
+    FUNCTION = concurrency.node_function("generate_image")
+    CATEGORY = "JM-Volcengine-API/Seedream"
     
-    def sign_v4_request(self, access_key, secret_key, service, req_query, req_body):
-        """Sign request using AWS V4 signature"""
-        if access_key is None or secret_key is None:
-            raise ValueError('Access key and secret key are required.')
-        
-        t = datetime.datetime.utcnow()
-        current_date = t.strftime('%Y%m%dT%H%M%SZ')
-        datestamp = t.strftime('%Y%m%d')
-        
-        canonical_uri = '/'
-        canonical_querystring = req_query
-        signed_headers = 'content-type;host;x-content-sha256;x-date'
-        payload_hash = hashlib.sha256(req_body.encode('utf-8')).hexdigest()
-        content_type = 'application/json'
-        
-        canonical_headers = (
-            f'content-type:{content_type}\n'
-            f'host:{self.host}\n'
-            f'x-content-sha256:{payload_hash}\n'
-            f'x-date:{current_date}\n'
-        )
-        
-        canonical_request = (
-            f'{self.method}\n{canonical_uri}\n{canonical_querystring}\n'
-            f'{canonical_headers}\n{signed_headers}\n{payload_hash}'
-        )
-        
-        algorithm = 'HMAC-SHA256'
-        credential_scope = f'{datestamp}/{self.region}/{service}/request'
-        string_to_sign = (
-            f'{algorithm}\n{current_date}\n{credential_scope}\n'
-            f'{hashlib.sha256(canonical_request.encode("utf-8")).hexdigest()}'
-        )
-        
-        signing_key = self.get_signature_key(secret_key, datestamp, self.region, service)
-        signature = hmac.new(signing_key, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
-        
-        authorization_header = (
-            f'{algorithm} Credential={access_key}/{credential_scope}, '
-            f'SignedHeaders={signed_headers}, Signature={signature}'
-        )
-        
-        headers = {
-            'X-Date': current_date,
-            'Authorization': authorization_header,
-            'X-Content-Sha256': payload_hash,
-            'Content-Type': content_type
-        }
-        
-        return headers
+    def bytes_to_tensor(self, image_data):
+        """Decode encoded image bytes to tensor, returning (tensor, image format)"""
+        with metrics.timer("decode", self.req_key):
+            return image_codec.decode_image(image_data)
     
-    def download_image_from_url(self, url):
-        """Download image from URL and convert to tensor"""
+    def download_image_bytes(self, url):
+        """Download encoded image bytes from URL"""
         try:
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
-            
-            # Convert to PIL Image
-            image = Image.open(io.BytesIO(response.content))
-            
-            # Convert to RGB if necessary
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Convert to numpy array
-            image_array = np.array(image).astype(np.float32) / 255.0
-            
-            # Convert to tensor with batch dimension
-            image_tensor = torch.from_numpy(image_array)[None,]
-            
-            return image_tensor
+            with metrics.timer("download", self.req_key):
+                response = http_client.get(url, read_timeout=30)
+                response.raise_for_status()
+            metrics.count_bytes(self.req_key, "download", len(response.content))
+            return response.content
             
         except Exception as e:
             raise Exception(f"Failed to download image from URL: {str(e)}")
     
-    def decode_base64_image(self, base64_string):
-        """Decode base64 image string to tensor"""
+    def decode_base64_bytes(self, base64_string):
+        """Decode base64 image string to encoded image bytes"""
         try:
             # Remove data URL prefix if present
             if base64_string.startswith('data:image'):
                 base64_string = base64_string.split(',')[1]
             
             # Decode base64
-            image_data = base64.b64decode(base64_string)
-            
-            # Convert to PIL Image
-            image = Image.open(io.BytesIO(image_data))
-            
-            # Convert to RGB if necessary
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Convert to numpy array
-            image_array = np.array(image).astype(np.float32) / 255.0
-            
-            # Convert to tensor with batch dimension
-            image_tensor = torch.from_numpy(image_array)[None,]
-            
-            return image_tensor
+            return base64.b64decode(base64_string)
             
         except Exception as e:
             raise Exception(f"Failed to decode base64 image: {str(e)}")
@@ -181,134 +90,201 @@ class VolcengineSeeDreamV3Node:
         }
         return resolution_map.get(aspect_ratio, (1536, 1536))
     
-    def get_unique_filename(self, prefix, output_dir="output", extension="png"):
-        """Generate unique filename with auto-incrementing number"""
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-        
-        counter = 1
-        while True:
-            filename = f"{prefix}_{counter:04d}.{extension}"
-            filepath = os.path.join(output_dir, filename)
-            if not os.path.exists(filepath):
-                return filepath, filename
-            counter += 1
-    
-    def save_image_from_tensor(self, image_tensor, filename_prefix):
-        """Save image tensor to local file and return filepath"""
+    def save_image_bytes(self, image_data, image_format, filename_prefix, output_dir="output"):
+        """
+        Write the API's image bytes to a new local file as-is (or converted once to JM_VOLCENGINE_OUTPUT_FORMAT)
+
+        With JM_VOLCENGINE_ASYNC_WRITES the path is reserved and returned at once; the write finishes in the background
+        """
         try:
-            # Convert tensor back to PIL Image
-            image_array = image_tensor.squeeze(0).cpu().numpy()
-            image_array = (image_array * 255).astype(np.uint8)
-            image = Image.fromarray(image_array)
-            
-            # Get unique filename
-            filepath, filename = self.get_unique_filename(filename_prefix)
-            
-            # Save image
-            image.save(filepath)
-            print(f"Image saved to: {filepath}")
+            with metrics.timer("save", self.req_key):
+                data, extension = image_codec.output_data(image_data, image_format)
+                filepath = writer.save(output_dir, filename_prefix, extension, data)
+            logger.info("Image saved to: %s", filepath)
             
             return filepath
             
         except Exception as e:
-            print(f"Failed to save image: {str(e)}")
+            logger.error("Failed to save image: %s", e)
             return ""
     
+    def get_variant_seeds(self, seed, batch_size):
+        """Derive per-variant seeds from the base seed (-1 keeps every variant random)"""
+        if seed == -1:
+            return [-1] * batch_size
+        return [(seed + i) % 2147483648 for i in range(batch_size)]
+    
+    def request_image(self, credential, body_params):
+        """Send one CVProcess request with the given credential and return (encoded image bytes, image_url)"""
+        access_key, secret_key = credential.access_key, credential.secret_key
+        query_params = {
+            'Action': 'CVProcess',
+            'Version': '2022-08-31',
+        }
+        formatted_query = signer.canonical_query(query_params)
+        formatted_body = request_body.build(body_params)
+        
+        # Sign the request
+        with metrics.timer("sign", self.req_key):
+            headers = signer.sign_request(access_key, secret_key, self.host, query_params, formatted_body.data,
+                                          region=self.region, service=self.service,
+                                          payload_hash=formatted_body.hexdigest)
+        
+        # Make the request (CVProcess is synchronous, so the whole call is recorded as the run phase).
+        # The call holds one of the account's concurrent-task slots and is paced by the submit rate limiter;
+        # transient failures are retried with backoff and a tripped circuit breaker fails fast
+        request_url = f"{self.endpoint}?{formatted_query}"
+        with metrics.timer("run", self.req_key), governor.task_slot(access_key) as slot:
+            response = retry.call("visual", "process", lambda: governor.request(
+                access_key, "submit", lambda: http_client.post(
+                    request_url, headers=headers, data=formatted_body.data, read_timeout=60)))
+            # Only a completed request relaxes the account's concurrency limit; failures leave it unchanged
+            if retry.classify(response) == retry.OK:
+                slot.done()
+        metrics.count_bytes(self.req_key, "upload", len(formatted_body))
+        
+        if response.status_code != 200:
+            metrics.count_task(self.req_key, "failed")
+            credential.report(False)
+            raise Exception(f"API request failed with status {response.status_code}: {response.text}")
+        
+        # Parse response
+        result = response.json()
+        logger.debug("API Response (seed %s): %s", body_params['seed'], log.summarize(result))
+        
+        # Check for API errors
+        if result.get('code') != 10000:
+            metrics.count_task(self.req_key, "failed")
+            credential.report(False)
+            error_message = result.get('message', 'Unknown error')
+            raise Exception(f"API Error (code: {result.get('code')}): {error_message}")
+        
+        # Extract image data
+        if 'data' not in result:
+            raise Exception("No data field in API response")
+        
+        data = result['data']
+        metrics.count_task(self.req_key, "success")
+        credential.report(True)
+        
+        # Handle URL or base64 response
+        if body_params['return_url'] and 'image_urls' in data and data['image_urls']:
+            # Download image from URL
+            image_url = data['image_urls'][0]  # Get first image URL
+            logger.debug("Downloading image from URL: %s", image_url)
+            return self.download_image_bytes(image_url), image_url
+        
+        if 'binary_data_base64' in data and data['binary_data_base64']:
+            # Decode base64 image
+            logger.debug("Decoding base64 image data...")
+            base64_data = data['binary_data_base64'][0] if isinstance(data['binary_data_base64'], list) else data['binary_data_base64']
+            return self.decode_base64_bytes(base64_data), "base64_image"  # Indicate this is from base64 data
+        
+        raise Exception("No valid image data found in API response")
+    
     def generate_image(self, access_key, secret_key, prompt, use_pre_llm=False, 
-                      seed=-1, guidance_scale=2.5, aspect_ratio="1:1", return_url=True, filename_prefix="seedream"):
+                      seed=-1, guidance_scale=2.5, aspect_ratio="1:1", return_url=True, filename_prefix="seedream",
+                      batch_size=1, cache_mode="auto"):
         """
         Generate image using Volcengine SeeDream V3 API
+        
+        batch_size variants are requested concurrently (bounded by JM_VOLCENGINE_MAX_CONCURRENCY)
+        and returned stacked in seed order; cacheable variants are served from the disk result cache
         """
+        # Get resolution from aspect ratio
+        width, height = self.get_resolution_from_aspect_ratio(aspect_ratio)
+        
         try:
             # Validate inputs
-            if not access_key or not secret_key:
-                raise ValueError("Access key and secret key are required")
+            if not credentials.available(credentials.VISUAL, access_key, secret_key):
+                raise ValueError("Access key and secret key are required (or configure a credential pool)")
             
             if not prompt.strip():
                 raise ValueError("Prompt cannot be empty")
             
-            # Get resolution from aspect ratio
-            width, height = self.get_resolution_from_aspect_ratio(aspect_ratio)
-            
-            # Prepare query parameters
-            query_params = {
-                'Action': 'CVProcess',
-                'Version': '2022-08-31',
-            }
-            formatted_query = self.format_query(query_params)
-            
-            # Prepare body parameters
-            body_params = {
-                "req_key": "high_aes_general_v30l_zt2i",
-                "prompt": prompt,
-                "use_pre_llm": use_pre_llm,
-                "seed": seed,
-                "scale": guidance_scale,
-                "width": width,
-                "height": height,
-                "return_url": return_url
-            }
-            formatted_body = json.dumps(body_params)
-            
-            # Sign the request
-            headers = self.sign_v4_request(access_key, secret_key, self.service, 
-                                         formatted_query, formatted_body)
-            
-            # Make the request
-            request_url = f"{self.endpoint}?{formatted_query}"
-            
-            print(f"Making request to Volcengine SeeDream V3 API...")
-            print(f"Resolution: {aspect_ratio} ({width}x{height})")
-            print(f"Prompt: {prompt[:100]}...")
-            
-            response = requests.post(request_url, headers=headers, data=formatted_body, timeout=60)
-            
-            if response.status_code != 200:
-                raise Exception(f"API request failed with status {response.status_code}: {response.text}")
-            
-            # Parse response
-            result = response.json()
-            print(f"API Response: {result}")
-            
-            # Check for API errors
-            if result.get('code') != 10000:
-                error_message = result.get('message', 'Unknown error')
-                raise Exception(f"API Error (code: {result.get('code')}): {error_message}")
-            
-            # Extract image data
-            if 'data' not in result:
-                raise Exception("No data field in API response")
-            
-            data = result['data']
-            
-            # Handle URL or base64 response
-            image_url = ""
-            if return_url and 'image_urls' in data and data['image_urls']:
-                # Download image from URL
-                image_url = data['image_urls'][0]  # Get first image URL
-                print(f"Downloading image from URL: {image_url}")
-                image_tensor = self.download_image_from_url(image_url)
+            seeds = self.get_variant_seeds(seed, batch_size)
+            
+            logger.info("Making request to Volcengine SeeDream V3 API...")
+            logger.info("Resolution: %s (%sx%s), batch size: %s", aspect_ratio, width, height, batch_size)
+            logger.debug("Prompt: %s...", prompt[:100])
+            
+            def run_variant(index):
+                # Variants that have not started yet are skipped once the user interrupts
+                cancellation.check()
+                variant_seed = seeds[index]
+                body_params = {
+                    "req_key": self.req_key,
+                    "prompt": prompt,
+                    "use_pre_llm": use_pre_llm,
+                    "seed": variant_seed,
+                    "scale": guidance_scale,
+                    "width": width,
+                    "height": height,
+                    "return_url": return_url
+                }
+                use_cache = result_cache.should_cache(variant_seed, cache_mode)
+                if use_cache:
+                    # Random-seed variants are told apart by their position in the batch
+                    key = result_cache.cache_key(body_params["req_key"], dict(body_params, variant=index if variant_seed == -1 else 0))
+                    hit = result_cache.get_cache().get(key)
+                    if hit:
+                        logger.info("Result cache hit for seed %s", variant_seed)
+                        with open(hit[0], 'rb') as f:
+                            return f.read(), hit[1].get("image_url", "")
                 
-            elif 'binary_data_base64' in data and data['binary_data_base64']:
-                # Decode base64 image
-                print("Decoding base64 image data...")
-                base64_data = data['binary_data_base64'][0] if isinstance(data['binary_data_base64'], list) else data['binary_data_base64']
-                image_tensor = self.decode_base64_image(base64_data)
-                image_url = "base64_image"  # Indicate this is from base64 data
+                # Blank keys draw a credential from the pool for each variant
+                credential = credentials.acquire(credentials.VISUAL, access_key, secret_key)
+                try:
+                    image_data, image_url = self.request_image(credential, body_params)
+                finally:
+                    credential.release()
+                if use_cache:
+                    # Cache entries keep the extension of the returned image format
+                    result_cache.get_cache().put(key, image_codec.image_extension(image_data), data=image_data,
+                                                 meta={"image_url": image_url})
+                return image_data, image_url
+            
+            # Waits in the background so an interrupt returns control to ComfyUI right away
+            results = cancellation.run(lambda: concurrency.map_concurrent(run_variant, range(batch_size)))
+            
+            # Every slot lines up with seeds; a failed variant keeps its place as a black frame and an empty URL line
+            image_tensors = [None] * batch_size
+            image_urls = [""] * batch_size
+            for index, result in enumerate(results):
+                if isinstance(result, Exception):
+                    logger.error("Variant %s (seed %s) failed: %s", index, seeds[index], result)
+                    continue
+                image_data, image_url = result
+                try:
+                    image_tensor, image_format = self.bytes_to_tensor(image_data)
+                except Exception as e:
+                    logger.error("Variant %s (seed %s) could not be decoded: %s", index, seeds[index], e)
+                    continue
                 
-            else:
-                raise Exception("No valid image data found in API response")
+                # Save the original bytes to local file (no re-encode)
+                saved_filepath = self.save_image_bytes(image_data, image_format, filename_prefix)
+                logger.info("Image saved as: %s", saved_filepath)
+                
+                image_tensors[index] = image_tensor
+                image_urls[index] = image_url
             
-            # Save image to local file
-            saved_filepath = self.save_image_from_tensor(image_tensor, filename_prefix)
+            succeeded = [tensor for tensor in image_tensors if tensor is not None]
+            if not succeeded:
+                raise Exception(f"All {batch_size} variant(s) failed")
             
-            print("Image generated successfully!")
-            print(f"Image saved as: {saved_filepath}")
-            return (image_tensor, image_url)
+            logger.info("Generated %s/%s image(s) successfully!", len(succeeded), batch_size)
+            placeholder = torch.zeros_like(succeeded[0])
+            images = torch.cat([placeholder if tensor is None else tensor for tensor in image_tensors], dim=0)
+            return (images, image_urls[0], "\n".join(image_urls))
             
+        except cancellation.Interrupted:
+            raise
         except Exception as e:
-            print(f"Error generating image: {str(e)}")
+            logger.error("Error generating image: %s", e)
             # Return a blank image in case of error
             blank_image = torch.zeros((1, height, width, 3), dtype=torch.float32)
-            return (blank_image, "") 
\ No newline at end of file
+            return (blank_image, "", "")
+
+    async def generate_image_async(self, **kwargs):
+        """Coroutine entry point: runs generate_image on a worker thread so ComfyUI can execute other nodes meanwhile"""
+        return await concurrency.run_blocking(self.generate_image, **kwargs)
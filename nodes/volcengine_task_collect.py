@@ -0,0 +1,102 @@
+from ..utils import cancellation, concurrency, log, output_files
+from .volcengine_doubao_seedance import VolcengineDoubaoSeedance
+from .volcengine_i2v_s2pro import VolcengineI2VS2Pro
+
+logger = log.get_logger("task_collect")
+
+# 任务句柄类型与负责下载结果的节点
+DOWNLOADERS = {
+    "seedance": VolcengineDoubaoSeedance,
+    "i2v": VolcengineI2VS2Pro,
+}
+
+
+class VolcengineTaskCollect:
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "tasks": ("VOLCENGINE_TASK", {
+                    "tooltip": "Submit节点返回的任务句柄"
+                }),
+            },
+            "optional": {
+                "tasks_2": ("VOLCENGINE_TASK", {
+                    "tooltip": "更多任务句柄"
+                }),
+                "tasks_3": ("VOLCENGINE_TASK", {
+                    "tooltip": "更多任务句柄"
+                }),
+                "tasks_4": ("VOLCENGINE_TASK", {
+                    "tooltip": "更多任务句柄"
+                }),
+                "filename_prefix": ("STRING", {
+                    "default": "volcengine_video",
+                    "tooltip": "保存文件名前缀"
+                }),
+            }
+        }
+
+    RETURN_TYPES = ("STRING", "STRING")
+    RETURN_NAMES = ("video_url", "local_video_path")
+    # 与 I2V 节点一致，两个输出都是按任务排列的列表
+    OUTPUT_IS_LIST = (True, True)
+    FUNCTION = concurrency.node_function("collect")
+    CATEGORY = "JM-Volcengine-API/Video"
+    DESCRIPTION = "等待Submit节点提交的所有视频任务完成并下载，结果为按任务排列的列表"
+
+    def collect_one(self, task, filename_prefix, file_path):
+        """等待单个任务完成并下载到预先占用的 file_path，返回 (video_url 或错误信息, 本地路径)"""
+        try:
+            if task["result"].cancelled():
+                output_files.discard(file_path)
+                return "错误：任务已被中断取消，请重新运行Submit节点", ""
+            video_url, error = task["result"].result()
+        except Exception:
+            output_files.discard(file_path)
+            raise
+        if not video_url:
+            output_files.discard(file_path)
+            return error, ""
+
+        logger.info("任务 %s 完成，开始下载视频...", task['task_id'])
+        # Seedance 句柄带有所选模型ID，下载指标按模型标注
+        options = {"model": task["model"]} if task.get("model") else {}
+        local_path = DOWNLOADERS[task["kind"]]().save_task_video(task["task_id"], video_url, filename_prefix, file_path,
+                                                                 **options)
+        return video_url, local_path or "下载失败，但可通过URL访问"
+
+    def collect(self, tasks, tasks_2=None, tasks_3=None, tasks_4=None, filename_prefix="volcengine_video"):
+        """所有任务已在后台轮询器中并行查询，这里按完成情况并发下载"""
+        all_tasks = [task for group in (tasks, tasks_2, tasks_3, tasks_4) if group for task in group]
+        logger.info("等待 %s 个视频任务完成...", len(all_tasks))
+
+        # 下载按完成先后进行，输出文件名先按任务顺序占好，文件序号与列表顺序一致
+        pending = [(task, DOWNLOADERS[task["kind"]]().get_output_path(filename_prefix))
+                   for task in all_tasks if not task["error"]]
+
+        # 等待期间响应 ComfyUI 的中断并报告进度，中断时取消所有未完成的任务（Seedance 任务在服务端取消）
+        results = iter(cancellation.run(
+            lambda: concurrency.map_concurrent(lambda item: self.collect_one(item[0], filename_prefix, item[1]), pending),
+            tasks=[task["result"] for task, _ in pending]))
+
+        video_urls = []
+        local_paths = []
+        for task in all_tasks:
+            if task["error"]:
+                video_urls.append(task["error"])
+                local_paths.append("")
+                continue
+            result = next(results)
+            if isinstance(result, Exception):
+                video_urls.append(f"收集任务时发生错误: {str(result)}")
+                local_paths.append("")
+            else:
+                video_urls.append(result[0])
+                local_paths.append(result[1])
+
+        return video_urls, local_paths
+
+    async def collect_async(self, **kwargs):
+        """协程版本：在工作线程中等待任务并下载，期间 ComfyUI 可以执行其他节点"""
+        return await concurrency.run_blocking(self.collect, **kwargs)
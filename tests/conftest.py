@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 插件根目录的 __init__.py 会导入依赖 ComfyUI 的节点，测试直接以顶层包 utils 导入工具模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,93 @@
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from utils import credentials
+
+
+def make_pool(*specs, strategy="least_outstanding"):
+    return credentials.CredentialPool(credentials.VISUAL, [
+        credentials.Credential(access_key=f"ak-{name}", secret_key="sk", name=name, **options)
+        for name, options in specs
+    ], strategy=strategy)
+
+
+def test_least_outstanding_spreads_by_weight():
+    pool = make_pool(("a", {"weight": 2}), ("b", {}))
+    chosen = [pool.acquire().name for _ in range(6)]
+    assert chosen.count("a") == 4 and chosen.count("b") == 2
+
+
+def test_release_and_track_return_outstanding():
+    pool = make_pool(("a", {}))
+    credential = pool.acquire()
+    credential.release()
+    assert credential.outstanding == 0
+
+    credential = pool.acquire()
+    future = credential.track(Future())
+    assert credential.outstanding == 1
+    future.set_result("url")
+    assert credential.outstanding == 0
+
+
+def test_max_tasks_skips_full_credentials():
+    pool = make_pool(("a", {"weight": 10, "max_tasks": 1}), ("b", {}))
+    assert [pool.acquire().name for _ in range(3)] == ["a", "b", "b"]
+
+
+def test_weighted_round_robin_interleaves():
+    pool = make_pool(("a", {"weight": 2}), ("b", {}), strategy="weighted")
+    assert [pool.acquire().name for _ in range(6)] == ["a", "b", "a", "a", "b", "a"]
+
+
+def test_consecutive_failures_pause_credential(monkeypatch):
+    monkeypatch.setattr(credentials, "UNHEALTHY_AFTER", 2)
+    pool = make_pool(("a", {"weight": 10}), ("b", {}))
+    a = pool.credentials[0]
+    a.report(False)
+    assert a.healthy(time.monotonic())
+    a.report(False)
+    assert not a.healthy(time.monotonic())
+    assert all(pool.acquire().name == "b" for _ in range(3))
+    assert a.failed == 2 and a.submitted == 2
+
+
+def test_all_unhealthy_picks_first_to_recover():
+    pool = make_pool(("a", {}), ("b", {}))
+    a, b = pool.credentials
+    a.unhealthy_until = float("inf")
+    b.unhealthy_until = 1e18
+    assert pool.acquire() is b
+
+
+def test_resume_moves_outstanding_to_submitting_account():
+    pool = make_pool(("a", {}), ("b", {}))
+    a, b = pool.credentials
+    chosen = pool.acquire()
+    assert chosen is a
+    assert chosen.resume(b.account) is b
+    assert (a.outstanding, b.outstanding) == (0, 1)
+    assert chosen.resume("unknown") is None
+
+
+def test_node_keys_bypass_pool():
+    credential = credentials.acquire(credentials.VISUAL, "ak", "sk")
+    assert credential.pool is None and credential.scope == "ak"
+    credential.report(False)
+    credential.release()
+
+
+def test_pool_config_skips_incomplete_entries(monkeypatch):
+    monkeypatch.setattr(credentials, "CREDENTIALS_FILE", "")
+    monkeypatch.setattr(credentials, "CREDENTIALS_JSON",
+                        '{"visual": [{"name": "a", "access_key": "ak"}, {"access_key": "ak2", "secret_key": "sk2"}]}')
+    monkeypatch.setattr(credentials, "_pools", None)
+    pool = credentials.get_pool(credentials.VISUAL)
+    assert [c.name for c in pool.credentials] == ["visual-2"]
+    assert credentials.get_pool(credentials.ARK) is None
+    assert credentials.available(credentials.VISUAL, "", "")
+    assert not credentials.available(credentials.ARK, "")
+    with pytest.raises(ValueError):
+        credentials.acquire(credentials.ARK, "")
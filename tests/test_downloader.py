@@ -0,0 +1,147 @@
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils import downloader
+
+DATA = os.urandom(256 * 1024 + 123)
+
+
+class FileServer:
+    """本地文件服务：支持 Range，可让前几个响应在发送一半后断开连接"""
+
+    def __init__(self, data=DATA, ranges=True, drops=0, status=200):
+        self.data = data
+        self.ranges = ranges
+        self.drops = drops
+        self.status = status
+        self.requests = []
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.handle(self)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/video.mp4"
+
+    def handle(self, request):
+        range_header = request.headers.get("Range")
+        with self._lock:
+            self.requests.append(range_header)
+            drop = self.drops > 0
+            self.drops -= drop
+        if self.status != 200:
+            request.send_response(self.status)
+            request.send_header("Content-Length", "0")
+            request.end_headers()
+            return
+        start, end = 0, len(self.data)
+        match = re.match(r"bytes=(\d+)-(\d*)", range_header or "")
+        if self.ranges and match:
+            start = int(match.group(1))
+            end = int(match.group(2)) + 1 if match.group(2) else len(self.data)
+            request.send_response(206)
+            request.send_header("Content-Range", f"bytes {start}-{end - 1}/{len(self.data)}")
+        else:
+            request.send_response(200)
+        if self.ranges:
+            request.send_header("Accept-Ranges", "bytes")
+        body = self.data[start:end]
+        request.send_header("Content-Length", str(len(body)))
+        request.end_headers()
+        if drop:
+            request.wfile.write(body[:len(body) // 2])
+            request.wfile.flush()
+            request.close_connection = True
+            request.connection.shutdown(2)
+            return
+        request.wfile.write(body)
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(**kwargs):
+        servers.append(FileServer(**kwargs))
+        return servers[-1]
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(downloader, "CHUNK_SIZE", 16 * 1024)
+    monkeypatch.setattr(downloader, "PARALLEL", 1)
+
+
+def fetch(tmp_path, url):
+    target = str(tmp_path / "out.mp4")
+    return downloader.download(url, str(tmp_path), lambda: target)
+
+
+def test_download_writes_complete_file(serve, tmp_path):
+    server = serve()
+    path = fetch(tmp_path, server.url)
+    assert open(path, "rb").read() == DATA
+    assert server.requests == [None]
+    assert os.listdir(tmp_path) == ["out.mp4"]
+
+
+def test_dropped_connection_resumes_from_written_offset(serve, tmp_path):
+    server = serve(drops=1)
+    path = fetch(tmp_path, server.url)
+    assert open(path, "rb").read() == DATA
+    assert len(server.requests) == 2
+    resumed_at = int(re.match(r"bytes=(\d+)-$", server.requests[1]).group(1))
+    assert 0 < resumed_at < len(DATA)
+
+
+def test_restarts_when_server_ignores_range(serve, tmp_path):
+    server = serve(ranges=False, drops=1)
+    path = fetch(tmp_path, server.url)
+    assert open(path, "rb").read() == DATA
+    assert len(server.requests) == 2
+
+
+def test_parallel_ranges_reassemble_file(serve, tmp_path, monkeypatch):
+    monkeypatch.setattr(downloader, "PARALLEL", 4)
+    monkeypatch.setattr(downloader, "PARALLEL_MIN_BYTES", 1)
+    server = serve(drops=2)
+    path = fetch(tmp_path, server.url)
+    assert open(path, "rb").read() == DATA
+    assert sum(1 for r in server.requests if r and not r.endswith("-")) >= 4
+
+
+def test_expired_url_fails_without_leaving_files(serve, tmp_path):
+    server = serve(status=403)
+    with pytest.raises(downloader.DownloadError):
+        fetch(tmp_path, server.url)
+    assert os.listdir(tmp_path) == []
+    assert len(server.requests) == 1
+
+
+def test_gives_up_after_max_retries(serve, tmp_path, monkeypatch):
+    monkeypatch.setattr(downloader, "MAX_RETRIES", 1)
+    # 不支持 Range 时每次都从头下载，写入的位置没有前进，连续失败计数不会重置
+    server = serve(ranges=False, drops=10)
+    with pytest.raises(downloader.DownloadError):
+        fetch(tmp_path, server.url)
+    assert os.listdir(tmp_path) == []
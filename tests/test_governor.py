@@ -0,0 +1,195 @@
+import json
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+import requests
+
+from utils import cancellation, governor, task_poller
+
+
+def response(status=200, body=None, headers=None):
+    r = requests.Response()
+    r.status_code = status
+    r._content = json.dumps(body if body is not None else {}).encode("utf-8")
+    r.headers.update(headers or {})
+    return r
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(governor.time, "monotonic", clock)
+    return clock
+
+
+def test_classify_throttling():
+    assert governor.classify(response(200, {"code": 10000})) == (False, False, None)
+    assert governor.classify(response(429, headers={"Retry-After": "3"})) == (True, False, 3.0)
+    assert governor.classify(response(429, {"code": 50430})) == (True, True, None)
+    assert governor.classify(response(429, {"error": {"code": "RateLimitExceeded"}}))[0]
+    assert not governor.classify(response(400, {"error": {"code": "InvalidParameter"}}))[0]
+
+
+def test_token_bucket_halves_rate_and_pauses_on_throttle(clock):
+    bucket = governor.TokenBucket(4.0)
+    assert bucket.try_acquire() == 0.0
+
+    assert bucket.on_throttle() == 2.0
+    # 无 Retry-After 时暂停 1/rate 秒
+    assert bucket.try_acquire() == pytest.approx(0.5)
+    clock.now += 0.5
+    assert bucket.try_acquire() == 0.0
+    assert bucket.try_acquire() == pytest.approx(0.5)
+
+    assert bucket.on_throttle(retry_after=10) == 1.0
+    clock.now += 9
+    assert bucket.try_acquire() == pytest.approx(1.0)
+
+
+def test_token_bucket_rate_floor_and_additive_recovery(clock):
+    bucket = governor.TokenBucket(2.0)
+    for _ in range(10):
+        bucket.on_throttle()
+    assert bucket.rate == governor.MIN_QPS
+
+    bucket.on_success()
+    assert bucket.rate == pytest.approx(governor.MIN_QPS + 2.0 * governor.INCREASE_FRACTION)
+    for _ in range(100):
+        bucket.on_success()
+    assert bucket.rate == 2.0
+
+
+def test_token_bucket_limits_burst_to_rate(clock):
+    bucket = governor.TokenBucket(2.0)
+    assert bucket.try_acquire() == 0.0
+    assert bucket.try_acquire() == 0.0
+    assert bucket.try_acquire() == pytest.approx(0.5)
+
+
+def test_request_retries_throttled_response_and_lowers_rate(monkeypatch):
+    monkeypatch.setattr(governor.TokenBucket, "acquire", lambda self: None)
+    gov = governor.Governor()
+    responses = iter([response(429), response(200, {"code": 10000})])
+    assert gov.request("ak", "submit", lambda: next(responses)).status_code == 200
+    assert gov.bucket("ak", "submit").rate < governor.SUBMIT_QPS
+
+
+def test_request_without_wait_defers_instead_of_sleeping(clock):
+    gov = governor.Governor()
+    bucket = gov.bucket("ak", "poll")
+    bucket.on_throttle(retry_after=5)
+    sent = []
+    with pytest.raises(task_poller.Defer) as e:
+        gov.request("ak", "poll", lambda: sent.append(1), wait=False)
+    assert e.value.delay == pytest.approx(5)
+    assert not sent
+
+
+def test_throttling_one_account_does_not_slow_another(clock):
+    gov = governor.Governor()
+    gov.bucket("a", "poll").on_throttle(retry_after=5)
+    assert gov.request("b", "poll", lambda: response(200), wait=False).status_code == 200
+
+
+def test_limiter_tightens_on_concurrency_limit_and_relaxes_on_completion():
+    limiter = governor.TaskLimiter(ceiling=None)
+    for _ in range(4):
+        limiter.acquire()
+    # 第 4 个任务被拒绝：服务端接受了 3 个
+    assert limiter.on_throttle() == 3
+    limiter.release(completed=False)
+    limiter.release()
+    assert limiter.limit == 4
+
+
+def test_limiter_never_relaxes_past_ceiling():
+    limiter = governor.TaskLimiter(ceiling=2)
+    limiter.acquire()
+    limiter.release()
+    assert limiter.limit == 2
+
+
+def test_limiter_blocks_until_a_slot_is_released():
+    limiter = governor.TaskLimiter(ceiling=1)
+    limiter.acquire()
+    acquired = threading.Event()
+    threading.Thread(target=lambda: (limiter.acquire(), acquired.set()), daemon=True).start()
+    assert not acquired.wait(0.2)
+    limiter.release()
+    assert acquired.wait(2)
+
+
+def test_limiter_wait_honours_interrupts(monkeypatch):
+    monkeypatch.setattr(cancellation, "CHECK_INTERVAL", 0.01)
+    interrupted = {"value": False}
+    monkeypatch.setattr(cancellation, "processing_interrupted", lambda: interrupted["value"])
+    limiter = governor.TaskLimiter(ceiling=1)
+    limiter.acquire()
+    errors = []
+
+    def waiter():
+        try:
+            limiter.acquire()
+        except cancellation.Interrupted as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=waiter, daemon=True)
+    thread.start()
+    time.sleep(0.05)
+    interrupted["value"] = True
+    thread.join(2)
+    assert errors and limiter.running == 1
+
+
+def tightened(gov, account, limit):
+    limiter = gov.limiter(account)
+    limiter.limit = limit
+    return limiter
+
+
+def test_failed_submit_releases_slot_without_relaxing_limit(monkeypatch):
+    gov = governor.Governor()
+    monkeypatch.setattr(governor, "get_governor", lambda: gov)
+    limiter = tightened(gov, "ak", 2)
+    with governor.task_slot("ak"):
+        pass
+    assert (limiter.running, limiter.limit) == (0, 2)
+
+
+def test_completed_work_relaxes_limit(monkeypatch):
+    gov = governor.Governor()
+    monkeypatch.setattr(governor, "get_governor", lambda: gov)
+    limiter = tightened(gov, "ak", 2)
+
+    # 同步接口成功
+    with governor.task_slot("ak") as slot:
+        slot.done()
+    assert limiter.limit == 3
+
+    # 异步任务在结果 Future 完成时释放
+    with governor.task_slot("ak") as slot:
+        slot.bind("t1")
+    assert limiter.running == 1
+    future = governor.track_task("t1", Future())
+    future.set_result("url")
+    assert (limiter.running, limiter.limit) == (0, 4)
+
+
+def test_cancelled_task_releases_slot_without_relaxing_limit(monkeypatch):
+    gov = governor.Governor()
+    monkeypatch.setattr(governor, "get_governor", lambda: gov)
+    limiter = tightened(gov, "ak", 2)
+    with governor.task_slot("ak") as slot:
+        slot.bind("t1")
+    governor.track_task("t1", Future()).cancel()
+    assert (limiter.running, limiter.limit) == (0, 2)
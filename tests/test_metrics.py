@@ -0,0 +1,25 @@
+from utils import metrics
+
+
+def test_gauges_are_read_from_collectors_at_render_time():
+    registry = metrics.MetricsRegistry()
+    outstanding = {"value": 2}
+    registry.add_collector(lambda: [
+        (metrics.CREDENTIAL_OUTSTANDING, outstanding["value"], {"kind": "visual", "credential": "a"}),
+        (metrics.CREDENTIAL_HEALTHY, 1, {"kind": "visual", "credential": "a"}),
+    ])
+
+    text = registry.render_prometheus()
+    assert f"# TYPE {metrics.CREDENTIAL_OUTSTANDING} gauge" in text
+    assert f'{metrics.CREDENTIAL_OUTSTANDING}{{credential="a",kind="visual"}} 2' in text
+
+    outstanding["value"] = 0
+    gauges = {g["name"]: g["value"] for g in registry.snapshot()["gauges"]}
+    assert gauges == {metrics.CREDENTIAL_OUTSTANDING: 0, metrics.CREDENTIAL_HEALTHY: 1}
+
+
+def test_failing_collector_does_not_break_export():
+    registry = metrics.MetricsRegistry()
+    registry.add_collector(lambda: 1 / 0)
+    registry.inc(metrics.TASKS_TOTAL, model="m", status="success")
+    assert f'{metrics.TASKS_TOTAL}{{model="m",status="success"}} 1' in registry.render_prometheus()
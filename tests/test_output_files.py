@@ -0,0 +1,64 @@
+import os
+import threading
+
+import pytest
+
+from utils import output_files
+
+
+@pytest.mark.parametrize("sharding", ["none", "date", "hash"])
+def test_concurrent_allocations_are_unique(tmp_path, sharding):
+    allocator = output_files.FilenameAllocator(sharding=sharding)
+    paths = []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(25):
+            path, fd = allocator.create(str(tmp_path), "video", "mp4")
+            os.close(fd)
+            with lock:
+                paths.append(path)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(paths) == len(set(paths)) == 200
+    assert all(os.path.exists(path) for path in paths)
+
+
+def test_continues_after_existing_files(tmp_path):
+    (tmp_path / "image_0007.png").write_bytes(b"")
+    path, fd = output_files.FilenameAllocator(sharding="none").create(str(tmp_path), "image", "png")
+    os.close(fd)
+    assert os.path.basename(path) == "image_0008.png"
+
+
+def test_skips_names_taken_by_other_processes(tmp_path):
+    allocator = output_files.FilenameAllocator(sharding="none")
+    first, fd = allocator.create(str(tmp_path), "image", "png")
+    os.close(fd)
+    # 扫描之后其他进程创建了下一个序号的文件
+    (tmp_path / "image_0002.png").write_bytes(b"other")
+    second, fd = allocator.create(str(tmp_path), "image", "png")
+    os.close(fd)
+    assert os.path.basename(first) == "image_0001.png"
+    assert os.path.basename(second) == "image_0003.png"
+    assert (tmp_path / "image_0002.png").read_bytes() == b"other"
+
+
+def test_prefix_subdirectory(tmp_path):
+    path, fd = output_files.FilenameAllocator(sharding="none").create(str(tmp_path), "videos/seedance", "mp4")
+    os.close(fd)
+    assert path == os.path.join(str(tmp_path), "videos", "seedance_0001.mp4")
+
+
+def test_discard_removes_only_empty_placeholders(tmp_path):
+    unused = output_files.allocate(str(tmp_path), "video", "mp4")
+    written = output_files.write_new(str(tmp_path), "video", "mp4", b"data")
+    output_files.discard(unused)
+    output_files.discard(written)
+    output_files.discard(str(tmp_path / "missing.mp4"))
+    assert not os.path.exists(unused)
+    assert open(written, "rb").read() == b"data"
@@ -0,0 +1,66 @@
+import pytest
+
+from utils import polling
+
+
+@pytest.fixture(autouse=True)
+def empty_history(monkeypatch):
+    monkeypatch.setattr(polling, "_history", {})
+
+
+def policy(**kwargs):
+    options = dict(first_delay=1.0, interval=0.5, max_interval=4.0, multiplier=2.0, jitter=0.0, deadline=60.0)
+    options.update(kwargs)
+    return polling.PollingPolicy(**options)
+
+
+def delays(session, count):
+    result = []
+    for _ in range(count):
+        result.append(session.delay())
+        session.attempt += 1
+    return result
+
+
+def test_first_delay_then_capped_exponential_backoff():
+    session = policy().session("model")
+    assert delays(session, 6) == [1.0, 0.5, 1.0, 2.0, 4.0, 4.0]
+
+
+def test_deadline_caps_delay_and_ends_session():
+    session = policy(deadline=10.0).session("model", started_at=polling.time.monotonic() - 9.5)
+    assert session.delay() == pytest.approx(0.5, abs=0.05)
+    expired = policy(deadline=10.0).session("model", started_at=polling.time.monotonic() - 11)
+    assert expired.delay() is None
+    assert expired.wait() is False
+
+
+def test_adaptive_waits_until_expected_completion():
+    for duration in (20, 22, 24, 26, 28, 30):
+        polling.record_completion("model", duration)
+    assert polling.completion_window("model") == (20, 28)
+
+    p = policy()
+    # 预计完成之前直接等到低分位点，区间内按最小间隔查询，超过高分位后退避
+    assert p.next_delay("model", 5.0, 0) == (15.0, False)
+    assert p.next_delay("model", 25.0, 3) == (0.5, False)
+    assert p.next_delay("model", 40.0, 2) == (2.0, True)
+
+
+def test_adaptive_needs_enough_samples():
+    for _ in range(polling.MIN_SAMPLES - 1):
+        polling.record_completion("model", 30)
+    assert polling.completion_window("model") is None
+    assert policy().next_delay("model", 5.0, 0) == (0.5, True)
+
+
+def test_non_adaptive_policy_ignores_history():
+    for _ in range(polling.MIN_SAMPLES):
+        polling.record_completion("model", 30)
+    assert policy(adaptive=False).next_delay("model", 5.0, 1) == (1.0, True)
+
+
+def test_jitter_stays_within_bounds():
+    session = policy(jitter=0.1).session("model")
+    for _ in range(50):
+        assert 0.9 <= session.delay() <= 1.1
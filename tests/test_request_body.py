@@ -0,0 +1,61 @@
+import base64
+import hashlib
+import json
+
+import pytest
+
+from utils import request_body
+
+
+def reference(obj):
+    """把 Base64Field 展开成普通字符串后用 json.dumps 序列化，作为 build() 的参照"""
+    def expand(value):
+        if isinstance(value, request_body.Base64Field):
+            return (value.prefix + value.data).decode("ascii")
+        if isinstance(value, dict):
+            return {key: expand(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [expand(item) for item in value]
+        return value
+    return json.dumps(expand(obj), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+@pytest.fixture(autouse=True, params=["orjson", "json"])
+def serializer(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(request_body, "orjson", None)
+    elif request_body.orjson is None:
+        pytest.skip("orjson 未安装")
+
+
+def test_matches_json_dumps_with_fields():
+    body = {
+        "req_key": "seededit_v3.0",
+        "binary_data_base64": [request_body.Base64Field(b"\x00\x01image"), request_body.Base64Field(b"second")],
+        "prompt": "把天空换成\"晚霞\"\n",
+        "scale": 0.5,
+        "content": [{"type": "image_url", "image_url": {
+            "url": request_body.Base64Field(b"png", prefix="data:image/png;base64,")}}],
+    }
+    payload = request_body.build(body)
+    assert json.loads(payload.data) == json.loads(reference(body))
+    assert payload.data == reference(body)
+
+
+def test_matches_json_dumps_without_fields():
+    body = {"req_key": "jimeng_vgfm_i2v_l20", "task_id": "123", "seed": 42}
+    assert request_body.build(body).data == reference(body)
+
+
+def test_digest_and_length():
+    field = request_body.Base64Field(b"image-bytes")
+    payload = request_body.build({"binary_data_base64": [field]})
+    assert payload.hexdigest == hashlib.sha256(payload.data).hexdigest()
+    assert len(payload) == len(payload.data)
+    assert len(field) == len(base64.b64encode(b"image-bytes"))
+
+
+def test_placeholder_collision_is_rejected():
+    body = {"prompt": request_body._PLACEHOLDER, "image": request_body.Base64Field(b"x")}
+    with pytest.raises(ValueError):
+        request_body.build(body)
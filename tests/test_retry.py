@@ -0,0 +1,200 @@
+import json
+import threading
+import time
+
+import pytest
+import requests
+from urllib3.exceptions import NewConnectionError
+
+from utils import retry
+
+
+def response(status=200, body=None, headers=None):
+    r = requests.Response()
+    r.status_code = status
+    r._content = json.dumps(body if body is not None else {}).encode("utf-8")
+    r.headers.update(headers or {})
+    return r
+
+
+def connection_refused():
+    reason = NewConnectionError(None, "Connection refused")
+    return requests.ConnectionError(type("MaxRetryError", (), {"reason": reason})())
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(retry, "backoff", lambda attempt: 0.0)
+    retry._breakers.clear()
+
+
+@pytest.mark.parametrize("status, body, outcome", [
+    (200, {"code": 10000, "data": {}}, retry.OK),
+    (200, {"id": "cgt-1"}, retry.OK),
+    (200, {"code": 50500, "message": "internal error"}, retry.TRANSIENT),
+    (200, {"code": 50413, "message": "risk not pass"}, retry.PERMANENT),
+    (502, {}, retry.TRANSIENT),
+    (408, {}, retry.TRANSIENT),
+    (400, {"error": {"code": "InvalidParameter"}}, retry.PERMANENT),
+    (401, {}, retry.PERMANENT),
+    (500, {"error": {"code": "InternalServiceError"}}, retry.TRANSIENT),
+    (429, {}, retry.THROTTLED),
+    (429, {"code": 50429}, retry.THROTTLED),
+    (429, {"error": {"code": "RateLimitExceeded.EndpointRPM"}}, retry.THROTTLED),
+])
+def test_classify_response(status, body, outcome):
+    assert retry.classify(response(status, body)) == outcome
+
+
+def test_classify_error():
+    assert retry.classify(error=requests.ConnectionError()) == retry.TRANSIENT
+    assert retry.classify(error=requests.ReadTimeout()) == retry.TRANSIENT
+    assert retry.classify(error=ValueError("bad json")) == retry.PERMANENT
+
+
+def test_connect_failed_only_when_request_never_left():
+    assert retry.connect_failed(requests.ConnectTimeout())
+    assert retry.connect_failed(connection_refused())
+    assert not retry.connect_failed(requests.ReadTimeout())
+    assert not retry.connect_failed(requests.ConnectionError("Connection reset by peer"))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_half_opens_and_closes(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(retry.time, "monotonic", clock)
+    breaker = retry.CircuitBreaker("test", failures=3, reset_seconds=10)
+
+    for _ in range(3):
+        breaker.before()
+        breaker.record(retry.TRANSIENT)
+    with pytest.raises(retry.CircuitOpenError):
+        breaker.before()
+
+    # 到期后只放行一个探测请求
+    clock.now = 10.0
+    breaker.before()
+    with pytest.raises(retry.CircuitOpenError):
+        breaker.before()
+
+    breaker.record(retry.OK)
+    breaker.before()
+    assert breaker.opened_at is None and breaker.failures == 0
+
+
+def test_failed_probe_reopens_breaker(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(retry.time, "monotonic", clock)
+    breaker = retry.CircuitBreaker("test", failures=1, reset_seconds=10)
+    breaker.record(retry.TRANSIENT)
+
+    clock.now = 10.0
+    breaker.before()
+    breaker.record(retry.TRANSIENT)
+    clock.now = 15.0
+    with pytest.raises(retry.CircuitOpenError):
+        breaker.before()
+
+
+def test_permanent_errors_do_not_open_breaker():
+    breaker = retry.CircuitBreaker("test", failures=2, reset_seconds=10)
+    for _ in range(5):
+        breaker.record(retry.PERMANENT)
+    breaker.before()
+
+
+def test_skipped_probe_lets_next_request_probe(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(retry.time, "monotonic", clock)
+    breaker = retry.CircuitBreaker("test", failures=1, reset_seconds=10)
+    breaker.record(retry.TRANSIENT)
+    clock.now = 10.0
+    breaker.before()
+    breaker.skip()
+    breaker.before()
+
+
+def counting(results):
+    calls = []
+
+    def send():
+        calls.append(1)
+        result = results[min(len(calls), len(results)) - 1]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return send, calls
+
+
+def test_submit_is_not_retried_on_5xx():
+    send, calls = counting([response(502), response(200, {"code": 10000})])
+    assert retry.call("test", "submit", send).status_code == 502
+    assert len(calls) == 1
+
+
+def test_submit_is_not_retried_after_ambiguous_connection_error():
+    send, calls = counting([requests.ConnectionError("Connection reset by peer")])
+    with pytest.raises(requests.ConnectionError):
+        retry.call("test", "submit", send)
+    assert len(calls) == 1
+
+
+def test_submit_is_retried_when_connection_was_refused():
+    send, calls = counting([connection_refused(), response(200, {"code": 10000})])
+    assert retry.call("test", "submit", send).status_code == 200
+    assert len(calls) == 2
+
+
+def test_idempotent_request_is_retried_until_exhausted():
+    send, calls = counting([response(503)])
+    assert retry.call("test", "poll", send, retries=2, idempotent=True).status_code == 503
+    assert len(calls) == 3
+
+
+def test_permanent_response_is_returned_immediately():
+    send, calls = counting([response(400, {"error": {"code": "InvalidParameter"}})])
+    assert retry.call("test", "poll", send, idempotent=True).status_code == 400
+    assert len(calls) == 1
+
+
+def test_open_breaker_rejects_without_sending():
+    send, calls = counting([response(503)])
+    breaker = retry.get_breaker("test", "poll")
+    breaker.failure_threshold = 1
+    retry.call("test", "poll", send, retries=0, idempotent=True)
+    with pytest.raises(retry.CircuitOpenError):
+        retry.call("test", "poll", send, retries=0, idempotent=True)
+    assert len(calls) == 1
+
+
+def test_hedged_request_returns_the_faster_response():
+    release = threading.Event()
+    calls = []
+
+    def send():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(5)
+            return response(200, {"code": 10000, "data": {"slow": True}})
+        return response(200, {"code": 10000, "data": {"slow": False}})
+
+    start = time.monotonic()
+    result = retry.call("test", "poll", send, retries=0, idempotent=True, hedge_after=0.05)
+    release.set()
+    assert result.json()["data"]["slow"] is False
+    assert time.monotonic() - start < 2
+    assert len(calls) == 2
+
+
+def test_hedge_is_not_sent_for_fast_responses():
+    send, calls = counting([response(200, {"code": 10000})])
+    retry.call("test", "poll", send, retries=0, idempotent=True, hedge_after=1.0)
+    assert len(calls) == 1
@@ -0,0 +1,45 @@
+import datetime
+import hashlib
+import json
+
+from utils import signer
+
+ACCESS_KEY = "AKLTexampleaccesskey"
+SECRET_KEY = "exampleSecretKey=="
+HOST = "visual.volcengineapi.com"
+QUERY = {"Action": "CVSync2AsyncGetResult", "Version": "2022-08-31"}
+BODY = json.dumps({"req_key": "seededit_v3.0", "task_id": "1234567890"}).encode("utf-8")
+TIMESTAMP = datetime.datetime(2025, 1, 2, 3, 4, 5)
+
+# 由旧版节点内联签名实现（未缓存的四步密钥派生）在同一输入下计算得到
+KNOWN_AUTHORIZATION = (
+    "HMAC-SHA256 Credential=AKLTexampleaccesskey/20250102/cn-north-1/cv/request, "
+    "SignedHeaders=content-type;host;x-content-sha256;x-date, "
+    "Signature=59f3231bc5c3811fd678b0aaaa176a007c32f3b08d276f642818552e8851c3e1"
+)
+
+
+def test_known_answer():
+    headers = signer.sign_request(ACCESS_KEY, SECRET_KEY, HOST, QUERY, BODY, timestamp=TIMESTAMP)
+    assert headers["Authorization"] == KNOWN_AUTHORIZATION
+    assert headers["X-Date"] == "20250102T030405Z"
+    assert headers["X-Content-Sha256"] == hashlib.sha256(BODY).hexdigest()
+
+
+def test_str_body_and_precomputed_hash_match():
+    headers = signer.sign_request(ACCESS_KEY, SECRET_KEY, HOST, QUERY, BODY, timestamp=TIMESTAMP)
+    assert signer.sign_request(ACCESS_KEY, SECRET_KEY, HOST, QUERY, BODY.decode("utf-8"),
+                               timestamp=TIMESTAMP) == headers
+    assert signer.sign_request(ACCESS_KEY, SECRET_KEY, HOST, QUERY, BODY, timestamp=TIMESTAMP,
+                               payload_hash=hashlib.sha256(BODY).hexdigest()) == headers
+
+
+def test_signing_key_is_cached_per_day():
+    signer.get_signing_key.cache_clear()
+    signer.sign_request(ACCESS_KEY, SECRET_KEY, HOST, QUERY, BODY, timestamp=TIMESTAMP)
+    signer.sign_request(ACCESS_KEY, SECRET_KEY, HOST, QUERY, BODY, timestamp=TIMESTAMP + datetime.timedelta(hours=1))
+    assert signer.get_signing_key.cache_info().hits == 1
+
+
+def test_canonical_query_sorts_parameters():
+    assert signer.canonical_query({"Version": "2022-08-31", "Action": "CVProcess"}) == "Action=CVProcess&Version=2022-08-31"
@@ -0,0 +1,122 @@
+import threading
+
+import pytest
+
+from utils import task_journal
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return task_journal.TaskJournal(str(tmp_path / "journal.sqlite3"))
+
+
+def submit(journal, fp, task_id, seed):
+    """按节点的方式查找可复用任务，没有时“提交”并登记 task_id"""
+    with journal.submitting(fp):
+        entry = journal.claim(fp, include_finished=seed != -1, shared=seed != -1)
+        if entry:
+            return entry["task_id"]
+        journal.record(fp, "node", task_id, "account")
+        return task_id
+
+
+def test_fingerprint_depends_on_credential_and_body():
+    fp = task_journal.fingerprint("node", "ak", {"prompt": "a", "seed": 1})
+    assert fp == task_journal.fingerprint("node", "ak", b'{"prompt":"a","seed":1}')
+    assert fp != task_journal.fingerprint("node", "other", {"prompt": "a", "seed": 1})
+    assert fp != task_journal.fingerprint("node", "ak", {"prompt": "b", "seed": 1})
+
+
+def test_fixed_seed_shares_in_flight_and_finished_tasks(journal):
+    assert submit(journal, "fp", "t1", seed=7) == "t1"
+    assert submit(journal, "fp", "t2", seed=7) == "t1"
+    journal.update("t1", task_journal.DONE, result_url="https://example/video.mp4")
+    entry = journal.claim("fp")
+    assert entry["task_id"] == "t1" and entry["result_url"] == "https://example/video.mp4"
+
+
+def test_random_seed_submissions_stay_independent(journal):
+    # 同一进程中相同的 seed -1 请求（两个节点或同一批次中相同的帧）各自得到一个任务
+    assert submit(journal, "fp", "t1", seed=-1) == "t1"
+    assert submit(journal, "fp", "t2", seed=-1) == "t2"
+    # 已完成的随机任务不被复用
+    journal.update("t1", task_journal.DONE)
+    journal.update("t2", task_journal.DONE)
+    assert submit(journal, "fp", "t3", seed=-1) == "t3"
+
+
+def test_random_seed_reattaches_abandoned_task_once(journal):
+    assert submit(journal, "fp", "t1", seed=-1) == "t1"
+    # 执行被中断：任务在服务端继续生成，再次运行时接上
+    journal.update("t1", task_journal.ABANDONED)
+    assert submit(journal, "fp", "t2", seed=-1) == "t1"
+    assert submit(journal, "fp", "t3", seed=-1) == "t3"
+
+
+def test_random_seed_reattaches_tasks_from_previous_process(tmp_path):
+    path = str(tmp_path / "journal.sqlite3")
+    assert submit(task_journal.TaskJournal(path), "fp", "t1", seed=-1) == "t1"
+    restarted = task_journal.TaskJournal(path)
+    assert submit(restarted, "fp", "t2", seed=-1) == "t1"
+    assert submit(restarted, "fp", "t3", seed=-1) == "t3"
+
+
+def test_concurrent_random_seed_submissions_get_distinct_tasks(journal):
+    results = []
+    barrier = threading.Barrier(8)
+
+    def worker(index):
+        barrier.wait()
+        results.append(submit(journal, "fp", f"t{index}", seed=-1))
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(results) == sorted(f"t{index}" for index in range(8))
+
+
+def test_concurrent_fixed_seed_submissions_share_one_task(journal):
+    results = []
+    barrier = threading.Barrier(8)
+
+    def worker(index):
+        barrier.wait()
+        results.append(submit(journal, "fp", f"t{index}", seed=7))
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(results)) == 1
+
+
+def test_saved_path_requires_existing_file(journal, tmp_path):
+    journal.record("fp", "node", "t1")
+    video = tmp_path / "video.mp4"
+    journal.update("t1", task_journal.SAVED, result_path=str(video))
+    assert journal.saved_path("t1") is None
+    video.write_bytes(b"mp4")
+    assert journal.saved_path("t1") == str(video)
+
+
+def test_expired_task_is_released_and_resubmitted(journal):
+    assert submit(journal, "fp", "t1", seed=7) == "t1"
+    journal.update("t1", task_journal.EXPIRED)
+    assert "t1" not in journal._claimed
+    assert submit(journal, "fp", "t2", seed=7) == "t2"
+
+
+def test_prune_removes_rows_older_than_max_age(tmp_path):
+    path = str(tmp_path / "journal.sqlite3")
+    journal = task_journal.TaskJournal(path)
+    journal.record("old", "node", "t-old")
+    journal.record("new", "node", "t-new")
+    journal._conn.execute("UPDATE tasks SET created_at = created_at - 25 * 3600 WHERE task_id = 't-old'")
+
+    reopened = task_journal.TaskJournal(path)
+    rows = reopened._conn.execute("SELECT task_id FROM tasks").fetchall()
+    assert rows == [("t-new",)]
+    assert reopened.prune() == 0
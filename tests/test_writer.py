@@ -0,0 +1,64 @@
+import os
+import threading
+
+import pytest
+
+from utils import writer
+
+
+class GatedWriter(writer.BackgroundWriter):
+    """写盘前等待 gate，便于观察写入完成之前的状态"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.gate = threading.Event()
+
+    def _write(self, path, data, on_saved):
+        self.gate.wait(5)
+        return super()._write(path, data, on_saved)
+
+
+def test_sync_save_writes_before_returning(tmp_path, monkeypatch):
+    monkeypatch.setattr(writer, "ASYNC_WRITES", False)
+    saved = []
+    path = writer.save(str(tmp_path), "img", "png", b"data", on_saved=saved.append)
+    assert open(path, "rb").read() == b"data"
+    assert saved == [path]
+
+
+def test_async_save_reserves_name_and_wait_blocks_until_written(tmp_path, monkeypatch):
+    monkeypatch.setattr(writer, "ASYNC_WRITES", True)
+    gated = GatedWriter(workers=1)
+    monkeypatch.setattr(writer, "_writer", gated)
+    saved = []
+
+    path = writer.save(str(tmp_path), "img", "png", b"data", on_saved=saved.append)
+    assert os.path.getsize(path) == 0
+
+    threading.Timer(0.1, gated.gate.set).start()
+    assert writer.wait(path)
+    assert open(path, "rb").read() == b"data"
+    assert saved == [path]
+    assert writer.flush()
+
+
+def test_pending_bytes_apply_backpressure(tmp_path):
+    gated = GatedWriter(workers=1, max_pending_bytes=10)
+    gated.submit(str(tmp_path / "a"), b"x" * 8)
+    submitted = threading.Event()
+    threading.Thread(target=lambda: (gated.submit(str(tmp_path / "b"), b"y" * 8), submitted.set()),
+                     daemon=True).start()
+    assert not submitted.wait(0.2)
+    gated.gate.set()
+    assert submitted.wait(2)
+    assert gated.flush(2)
+    assert open(tmp_path / "b", "rb").read() == b"y" * 8
+
+
+def test_failed_write_removes_placeholder(tmp_path):
+    background = writer.BackgroundWriter(workers=1)
+    path = str(tmp_path / "missing" / "img.png")
+    with pytest.raises(OSError):
+        background.submit(path, b"data").result(2)
+    assert not os.path.exists(path)
+    assert background.wait(path) is False
@@ -0,0 +1,126 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, wait as wait_futures
+
+from . import polling
+from .config import env_float
+from .log import get_logger
+
+logger = get_logger("cancellation")
+
+try:
+    from comfy.model_management import InterruptProcessingException as Interrupted, processing_interrupted
+except ImportError:
+    class Interrupted(Exception):
+        """执行被中断（不在 ComfyUI 中运行时使用，不会被抛出）"""
+
+    def processing_interrupted():
+        return False
+
+# 等待任务时检查 ComfyUI 中断、刷新进度条的间隔（秒）
+CHECK_INTERVAL = env_float("INTERRUPT_CHECK_SECONDS", 0.5)
+
+# 进度条中每个任务占的格数；未完成的任务按该模型历史完成耗时估算进度，最多到 95%
+PROGRESS_STEPS = 100
+MAX_ESTIMATE = 0.95
+
+# 中断时取消过任务的次数；Submit 节点把它加入 IS_CHANGED，ComfyUI 缓存的任务句柄可能已被取消时重新执行
+_cancel_epoch = 0
+
+
+def check():
+    """用户在 ComfyUI 中点击了 Interrupt 时抛出 Interrupted"""
+    if processing_interrupted():
+        raise Interrupted()
+
+
+def cancel_epoch():
+    """中断时取消过任务的次数，每次取消了未完成任务的中断加 1"""
+    return _cancel_epoch
+
+
+def _progress_bar(total):
+    try:
+        from comfy.utils import ProgressBar
+    except ImportError:
+        return None
+    return ProgressBar(total)
+
+
+def _estimate(key, elapsed):
+    window = polling.completion_window(key) if key else None
+    if window is None:
+        return 0.0
+    return min(MAX_ESTIMATE, elapsed / max(window[1], 1e-3))
+
+
+def wait(futures, tasks=None, key=None):
+    """
+    等待 futures 全部完成，期间检查 ComfyUI 中断并在进度条上报告 tasks 的进度
+
+    tasks 为远程任务的结果 Future（默认即 futures），key 为估算进度用的模型/req_key。
+    中断时取消所有未完成的 tasks（触发远程取消，见 on_cancel）并抛出 Interrupted
+    """
+    futures = list(futures)
+    tasks = futures if tasks is None else list(tasks)
+    bar = _progress_bar(len(tasks) * PROGRESS_STEPS) if tasks else None
+    started = time.monotonic()
+    pending = set(futures)
+    while pending:
+        _, pending = wait_futures(pending, timeout=CHECK_INTERVAL)
+        if processing_interrupted():
+            global _cancel_epoch
+            cancelled = sum(task.cancel() for task in tasks)
+            if cancelled:
+                _cancel_epoch += 1
+            logger.warning("执行被中断，已取消 %s 个未完成的任务", cancelled)
+            raise Interrupted()
+        if bar is not None:
+            estimate = _estimate(key, time.monotonic() - started)
+            bar.update_absolute(sum(PROGRESS_STEPS if task.done() else int(estimate * PROGRESS_STEPS)
+                                    for task in tasks))
+
+
+def result(future, key=None):
+    """可被 ComfyUI 中断的 future.result()，等待期间报告进度"""
+    wait([future], key=key)
+    return future.result()
+
+
+def run(fn, tasks=(), key=None):
+    """
+    在后台线程中执行阻塞的 fn() 并等待其结果，期间检查中断并报告 tasks 的进度
+
+    中断时取消 tasks 并立即抛出 Interrupted，fn 在后台自行结束（等待被取消任务的调用会很快返回）
+    """
+    future = Future()
+    context = contextvars.copy_context()
+
+    def target():
+        try:
+            future.set_result(context.run(fn))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=target, name="jm-volcengine-wait", daemon=True).start()
+    wait([future], list(tasks), key)
+    return future.result()
+
+
+def on_cancel(future, fn):
+    """future 被取消时在后台线程中调用 fn()（远程取消请求不阻塞中断的处理），返回原 Future"""
+    def on_done(f):
+        if not f.cancelled():
+            return
+
+        def target():
+            try:
+                fn()
+            except Exception as e:
+                logger.warning("取消远程任务失败: %s", e)
+
+        threading.Thread(target=target, name="jm-volcengine-cancel", daemon=True).start()
+
+    future.add_done_callback(on_done)
+    return future
@@ -0,0 +1,87 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import cancellation
+from .config import env_int, env_str
+
+# 单个节点内并发请求的上限，避免一次批量请求触发账号并发配额
+MAX_CONCURRENCY = env_int("MAX_CONCURRENCY", 4)
+
+# 节点执行方式：auto 在 ComfyUI 支持协程节点时使用协程 FUNCTION，on 强制使用，off 始终同步执行
+ASYNC_NODES = env_str("ASYNC_NODES", "auto").strip().lower()
+
+# 协程节点执行阻塞流程的工作线程数，线程大部分时间在等待后台轮询器的结果
+ASYNC_WORKERS = env_int("ASYNC_WORKERS", 32)
+
+
+def map_concurrent(fn, items, max_workers=None):
+    """
+    在受限线程池中并发执行 fn(item)，按输入顺序返回结果
+
+    单个任务抛出的异常会被捕获并作为该位置的结果返回，调用方可逐项判断；
+    用户中断执行（cancellation.Interrupted）不作为结果返回，而是直接抛出
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    def call(item):
+        try:
+            return fn(item)
+        except cancellation.Interrupted:
+            raise
+        except Exception as e:
+            return e
+
+    workers = max(1, min(max_workers or MAX_CONCURRENCY, len(items)))
+    if workers == 1:
+        return [call(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(call, items))
+
+
+def _comfy_supports_async():
+    """支持协程节点的 ComfyUI 版本以 _async_map_node_over_list 执行节点函数"""
+    try:
+        import execution
+    except Exception:
+        return False
+    return hasattr(execution, "_async_map_node_over_list")
+
+
+ASYNC_ENABLED = ASYNC_NODES == "on" or (ASYNC_NODES == "auto" and _comfy_supports_async())
+
+
+def node_function(name):
+    """节点类的 FUNCTION：启用协程节点时为 name + "_async"，否则为同步的 name"""
+    return f"{name}_async" if ASYNC_ENABLED else name
+
+
+_node_executor = None
+_node_executor_lock = threading.Lock()
+
+
+def get_node_executor():
+    """获取协程节点共用的工作线程池"""
+    global _node_executor
+    if _node_executor is None:
+        with _node_executor_lock:
+            if _node_executor is None:
+                _node_executor = ThreadPoolExecutor(max_workers=ASYNC_WORKERS, thread_name_prefix="jm-volcengine-node")
+    return _node_executor
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """
+    在工作线程中执行阻塞的节点流程并等待结果
+
+    等待期间 ComfyUI 的执行线程与事件循环都不被占用，可以继续执行队列中的其他节点；
+    当前上下文（ComfyUI 记录正在执行节点的 contextvars）会带到工作线程中
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_node_executor(), context.run, functools.partial(fn, *args, **kwargs))
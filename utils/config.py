@@ -0,0 +1,38 @@
+import os
+
+# 所有插件级配置均通过带此前缀的环境变量设置
+ENV_PREFIX = "JM_VOLCENGINE_"
+
+
+def env_str(name, default=""):
+    """读取字符串类型的环境变量"""
+    return os.environ.get(ENV_PREFIX + name, default)
+
+
+def env_int(name, default):
+    """读取整数类型的环境变量，无法解析时使用默认值"""
+    try:
+        return int(os.environ[ENV_PREFIX + name])
+    except (KeyError, ValueError):
+        return default
+
+
+def env_float(name, default):
+    """读取浮点类型的环境变量，无法解析时使用默认值"""
+    try:
+        return float(os.environ[ENV_PREFIX + name])
+    except (KeyError, ValueError):
+        return default
+
+
+def env_bool(name, default=False):
+    """读取布尔类型的环境变量（1/true/yes/on 视为真）"""
+    value = os.environ.get(ENV_PREFIX + name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# 服务地址，可指向本地模拟服务（benchmarks/mock_server.py）进行离线测试和压测
+VISUAL_ENDPOINT = env_str("VISUAL_ENDPOINT", "https://visual.volcengineapi.com").rstrip("/")
+ARK_ENDPOINT = env_str("ARK_ENDPOINT", "https://ark.cn-beijing.volces.com").rstrip("/")
@@ -0,0 +1,260 @@
+import json
+import threading
+import time
+
+from . import metrics
+from .config import env_float, env_int, env_str
+from .governor import account_id
+from .log import get_logger
+
+logger = get_logger("credentials")
+
+# 凭证池：JSON 文件路径，或直接以 JSON 字符串配置（两者都设置时合并）
+#   {"visual": [{"name": "a", "access_key": "...", "secret_key": "...", "weight": 2, "max_tasks": 10}],
+#    "ark": [{"name": "x", "api_key": "..."}]}
+CREDENTIALS_FILE = env_str("CREDENTIALS_FILE", "")
+CREDENTIALS_JSON = env_str("CREDENTIALS", "")
+
+# 选择策略：least_outstanding 选进行中任务数 / 权重最小的凭证；weighted 按权重平滑轮询
+STRATEGY = env_str("CREDENTIAL_STRATEGY", "least_outstanding").strip().lower()
+
+# 连续提交失败达到该次数后暂停使用该凭证，暂停时长随连续失败次数翻倍
+UNHEALTHY_AFTER = env_int("CREDENTIAL_UNHEALTHY_AFTER", 3)
+COOLDOWN_SECONDS = env_float("CREDENTIAL_COOLDOWN_SECONDS", 60.0)
+MAX_COOLDOWN_SECONDS = 900.0
+
+# 凭证种类：视觉服务（AccessKey/SecretKey）与方舟（API Key）
+VISUAL = "visual"
+ARK = "ark"
+_REQUIRED_FIELDS = {VISUAL: ("access_key", "secret_key"), ARK: ("api_key",)}
+
+
+class Credential:
+    """
+    一个账号的凭证及其使用情况
+
+    节点直接填写的密钥也包装为 Credential（pool 为 None），此时不记录使用情况
+    """
+
+    def __init__(self, access_key="", secret_key="", api_key="", name="", weight=1.0, max_tasks=0, pool=None):
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.api_key = api_key
+        self.name = name
+        self.weight = max(float(weight), 0.01)
+        self.max_tasks = max(int(max_tasks), 0)
+        self.pool = pool
+        self.outstanding = 0
+        self.submitted = 0
+        self.failed = 0
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+        self.current_weight = 0.0
+
+    @property
+    def key(self):
+        """调度器与任务日志使用的账号凭证（AccessKey 或 API Key）"""
+        return self.access_key or self.api_key
+
+    @property
+    def account(self):
+        return account_id(self.key)
+
+    @property
+    def scope(self):
+        """
+        任务指纹中的凭证部分：直接填写的密钥为密钥本身；凭证池为池标识，
+        相同请求无论由池中哪个凭证提交都能复用已有任务
+        """
+        return self.pool.scope if self.pool is not None else self.key
+
+    def healthy(self, now):
+        return now >= self.unhealthy_until
+
+    def resume(self, account):
+        """
+        接上任务日志中由 account 提交的任务：返回查询该任务必须使用的凭证，并把进行中任务计数转到该凭证上；
+        提交该任务的凭证已不在池中时返回 None。旧版本记录的任务没有账号信息，视为当前凭证提交
+        """
+        if account is None or account == self.account:
+            return self
+        owner = self.pool.get(account) if self.pool is not None else None
+        if owner is not None:
+            self.pool.release(self)
+            self.pool.reserve(owner)
+        return owner
+
+    def report(self, ok):
+        """记录一次提交结果，更新健康状态"""
+        if self.pool is not None:
+            self.pool.report(self, ok)
+
+    def release(self):
+        """释放选择凭证时占用的进行中任务计数"""
+        if self.pool is not None:
+            self.pool.release(self)
+
+    def track(self, future):
+        """任务结果 Future 完成时释放进行中任务计数，返回原 Future"""
+        if self.pool is not None:
+            future.add_done_callback(lambda f: self.pool.release(self))
+        return future
+
+
+class CredentialPool:
+    """多个账号的凭证池，按策略为每次提交选择凭证，同时跟踪各凭证的健康状态与用量"""
+
+    def __init__(self, kind, credentials, strategy=STRATEGY):
+        self.kind = kind
+        self.scope = f"pool:{kind}"
+        self.strategy = strategy
+        self.credentials = credentials
+        self._lock = threading.Lock()
+        for credential in credentials:
+            credential.pool = self
+
+    def _choose(self, candidates):
+        if self.strategy == "weighted":
+            # 平滑加权轮询：权重高的凭证更常被选中，且不会连续集中在同一个凭证上
+            total = sum(c.weight for c in candidates)
+            for c in candidates:
+                c.current_weight += c.weight
+            best = max(candidates, key=lambda c: c.current_weight)
+            best.current_weight -= total
+            return best
+        return min(candidates, key=lambda c: (c.outstanding / c.weight, c.submitted / c.weight))
+
+    def acquire(self):
+        """选择一个凭证并占用一个进行中任务计数，调用方必须在之后 release() 或 track(future)"""
+        now = time.monotonic()
+        with self._lock:
+            healthy = [c for c in self.credentials if c.healthy(now)]
+            if not healthy:
+                # 全部凭证都在暂停期内时选最先恢复的，不让节点直接失败
+                healthy = [min(self.credentials, key=lambda c: c.unhealthy_until)]
+            candidates = [c for c in healthy if not c.max_tasks or c.outstanding < c.max_tasks] or healthy
+            credential = self._choose(candidates)
+            credential.outstanding += 1
+        return credential
+
+    def reserve(self, credential):
+        """为从任务日志中接上的任务占用其所属凭证的进行中任务计数"""
+        with self._lock:
+            credential.outstanding += 1
+
+    def release(self, credential):
+        with self._lock:
+            credential.outstanding = max(0, credential.outstanding - 1)
+
+    def report(self, credential, ok):
+        with self._lock:
+            credential.submitted += 1
+            if ok:
+                credential.consecutive_failures = 0
+            else:
+                credential.failed += 1
+                credential.consecutive_failures += 1
+                excess = credential.consecutive_failures - UNHEALTHY_AFTER
+                if excess >= 0:
+                    cooldown = min(COOLDOWN_SECONDS * 2 ** excess, MAX_COOLDOWN_SECONDS)
+                    credential.unhealthy_until = time.monotonic() + cooldown
+                    logger.warning("凭证 %s 连续 %s 次提交失败，暂停使用 %.0f 秒",
+                                   credential.name, credential.consecutive_failures, cooldown)
+        metrics.count_credential_submit(credential.name, "ok" if ok else "failed")
+
+    def get(self, account):
+        """按账号标识查找凭证"""
+        for credential in self.credentials:
+            if credential.account == account:
+                return credential
+        return None
+
+    def gauges(self):
+        """导出各凭证进行中任务数与健康状态的指标（只含凭证名称，不含密钥）"""
+        now = time.monotonic()
+        with self._lock:
+            samples = [(c.name, c.outstanding, c.healthy(now)) for c in self.credentials]
+        return [sample for name, outstanding, healthy in samples for sample in (
+            (metrics.CREDENTIAL_OUTSTANDING, outstanding, {"kind": self.kind, "credential": name}),
+            (metrics.CREDENTIAL_HEALTHY, int(healthy), {"kind": self.kind, "credential": name}),
+        )]
+
+
+def _load_config():
+    """读取凭证池配置，返回 {种类: [条目]}"""
+    sources = []
+    if CREDENTIALS_FILE:
+        try:
+            with open(CREDENTIALS_FILE, encoding="utf-8") as f:
+                sources.append(json.load(f))
+        except (OSError, ValueError) as e:
+            logger.error("无法读取凭证池文件 %s: %s", CREDENTIALS_FILE, e)
+    if CREDENTIALS_JSON:
+        try:
+            sources.append(json.loads(CREDENTIALS_JSON))
+        except ValueError as e:
+            logger.error("凭证池配置不是有效的 JSON: %s", e)
+    entries = {VISUAL: [], ARK: []}
+    for source in sources:
+        if not isinstance(source, dict):
+            logger.error("凭证池配置应为 {\"visual\": [...], \"ark\": [...]} 形式")
+            continue
+        for kind in entries:
+            entries[kind].extend(source.get(kind) or [])
+    return entries
+
+
+def _build_pool(kind, entries):
+    credentials = []
+    for index, entry in enumerate(entries):
+        name = str(entry.get("name") or f"{kind}-{index + 1}") if isinstance(entry, dict) else f"{kind}-{index + 1}"
+        if not isinstance(entry, dict) or not all(entry.get(field) for field in _REQUIRED_FIELDS[kind]):
+            logger.error("凭证池条目 %s 缺少 %s，已忽略", name, "/".join(_REQUIRED_FIELDS[kind]))
+            continue
+        try:
+            credentials.append(Credential(**{field: entry[field] for field in _REQUIRED_FIELDS[kind]}, name=name,
+                                          weight=entry.get("weight", 1), max_tasks=entry.get("max_tasks", 0)))
+        except (TypeError, ValueError):
+            logger.error("凭证池条目 %s 的 weight/max_tasks 无效，已忽略", name)
+    if not credentials:
+        return None
+    logger.info("凭证池 %s 已加载 %s 个凭证（策略: %s）", kind, len(credentials), STRATEGY)
+    pool = CredentialPool(kind, credentials)
+    metrics.register_gauges(pool.gauges)
+    return pool
+
+
+_pools = None
+_pools_lock = threading.Lock()
+
+
+def get_pool(kind):
+    """获取某种凭证的进程级凭证池，未配置时返回 None"""
+    global _pools
+    if _pools is None:
+        with _pools_lock:
+            if _pools is None:
+                _pools = {kind_: _build_pool(kind_, entries) for kind_, entries in _load_config().items()}
+    return _pools.get(kind)
+
+
+def available(kind, *keys):
+    """节点填写了完整的密钥，或者留空且配置了对应的凭证池"""
+    if all(keys):
+        return True
+    return not any(keys) and get_pool(kind) is not None
+
+
+def acquire(kind, *keys):
+    """
+    为一次提交选择凭证：节点填写了密钥时直接使用，留空时从凭证池中选择
+
+    返回的凭证用完后调用 release()，或在提交成功后用 track(future) 在任务结束时释放
+    """
+    if all(keys):
+        fields = _REQUIRED_FIELDS[kind]
+        return Credential(**dict(zip(fields, keys)), name="node")
+    pool = get_pool(kind)
+    if pool is None:
+        raise ValueError("未填写密钥且未配置凭证池")
+    return pool.acquire()
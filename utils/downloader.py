@@ -0,0 +1,151 @@
+import os
+import re
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from . import http_client, metrics
+from .config import env_float, env_int
+from .log import get_logger
+
+logger = get_logger("downloader")
+
+# 每次从连接读取并写盘的块大小
+CHUNK_SIZE = env_int("DOWNLOAD_CHUNK_KB", 1024) * 1024
+
+# 连接中断后续传的最大连续失败次数（有新数据写入时重新计数）
+MAX_RETRIES = env_int("DOWNLOAD_RETRIES", 5)
+
+# 单次读取的超时（秒），大文件总耗时不受限制
+READ_TIMEOUT = env_float("DOWNLOAD_READ_TIMEOUT", 60.0)
+
+# 文件不小于该大小且服务器支持 Range 时，分成 DOWNLOAD_PARALLEL 段并发下载；设为 1 关闭分段
+PARALLEL = env_int("DOWNLOAD_PARALLEL", 4)
+PARALLEL_MIN_BYTES = env_int("DOWNLOAD_PARALLEL_MIN_MB", 16) * 1024 * 1024
+
+_CONTENT_RANGE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+)")
+
+
+class DownloadError(Exception):
+    """下载无法继续（URL 失效、服务器不支持续传或重试用尽）"""
+
+
+class _Interrupted(Exception):
+    """响应体在预期长度之前结束"""
+
+
+def _open(url, offset=0, end=None):
+    """发起（可能带 Range 的）流式 GET，请求 [offset, end) 字节；end 为 None 表示到文件末尾"""
+    headers = {}
+    if offset or end is not None:
+        headers["Range"] = f"bytes={offset}-{'' if end is None else end - 1}"
+    response = http_client.get(url, stream=True, read_timeout=READ_TIMEOUT, headers=headers)
+    status = response.status_code
+    if 400 <= status < 500 and status not in (408, 429):
+        # 链接过期或无权限，重试没有意义
+        response.close()
+        raise DownloadError(f"HTTP {status}")
+    response.raise_for_status()
+    return response
+
+
+def _total_size(response, offset):
+    """从响应头推算完整文件大小，未知时返回 None"""
+    match = _CONTENT_RANGE.match(response.headers.get("Content-Range", ""))
+    if match:
+        return int(match.group(3))
+    length = response.headers.get("Content-Length")
+    if length is None:
+        return None
+    return int(length) if response.status_code == 200 else offset + int(length)
+
+
+def _fetch_part(url, path, start, end, response=None):
+    """
+    把 [start, end) 字节写入 path 的对应位置，返回写完后的位置
+
+    end 为 None 时写到文件末尾并截断多余内容。连接中断或内容不完整时用 Range 请求从已写入处续传；
+    response 为已经打开、从 start 开始的响应，可省去一次请求
+    """
+    offset = start
+    failures = 0
+    with open(path, "r+b") as f:
+        while True:
+            resumed_from = offset
+            try:
+                if response is None:
+                    response = _open(url, offset, end)
+                with response:
+                    if response.status_code != 206 and offset > 0:
+                        if end is not None or start > 0:
+                            raise DownloadError("服务器不支持 Range 请求")
+                        logger.warning("服务器不支持断点续传，从头重新下载")
+                        offset = 0
+                    expected = end if end is not None else _total_size(response, offset)
+                    f.seek(offset)
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        f.write(chunk)
+                        offset += len(chunk)
+                if expected is not None and offset < expected:
+                    raise _Interrupted(f"已接收 {offset}/{expected} 字节")
+                if end is None:
+                    f.truncate()
+                return offset
+            except (requests.RequestException, _Interrupted) as e:
+                response = None
+                failures = 1 if offset > resumed_from else failures + 1
+                if failures > MAX_RETRIES:
+                    raise DownloadError(f"下载中断且重试次数已用尽: {e}") from e
+                logger.warning("下载中断（%s），%s 字节处续传", e, offset)
+                time.sleep(min(0.5 * 2 ** (failures - 1), 8.0))
+
+
+def _fetch_parallel(url, path, total):
+    """预分配文件后按 PARALLEL 段并发下载，各段独立续传"""
+    with open(path, "r+b") as f:
+        f.truncate(total)
+    part_size = -(-total // PARALLEL)
+    ranges = [(start, min(start + part_size, total)) for start in range(0, total, part_size)]
+    logger.debug("分 %s 段并发下载 %s 字节", len(ranges), total)
+    with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix="jm-volcengine-download") as executor:
+        for _ in executor.map(lambda r: _fetch_part(url, path, *r), ranges):
+            pass
+    return total
+
+
+def _fetch(url, path):
+    response = _open(url)
+    total = _total_size(response, 0)
+    if (PARALLEL > 1 and total is not None and total >= PARALLEL_MIN_BYTES and response.status_code == 200
+            and response.headers.get("Accept-Ranges", "").lower() == "bytes"):
+        response.close()
+        return _fetch_parallel(url, path, total)
+    return _fetch_part(url, path, 0, None, response)
+
+
+def download(url, directory, allocate, model=""):
+    """
+    下载 url 并保存到 directory 中，返回最终文件路径
+
+    先写入同目录下的临时文件，完成后才调用 allocate() 取得最终文件路径并原子重命名，
+    失败时删除临时文件，不会留下不完整的输出。model 用于 download 阶段的指标标签
+    """
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f".jm_volcengine_{uuid.uuid4().hex}.part")
+    open(tmp_path, "xb").close()
+    try:
+        start = time.perf_counter()
+        size = _fetch(url, tmp_path)
+        metrics.observe_phase("download", model, time.perf_counter() - start)
+        metrics.count_bytes(model, "download", size)
+        path = allocate()
+        os.replace(tmp_path, path)
+        return path
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,315 @@
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+
+from . import cancellation
+from .config import env_bool, env_float, env_int
+from .log import get_logger
+from .task_poller import Defer
+
+logger = get_logger("governor")
+
+GOVERNOR_ENABLED = env_bool("GOVERNOR_ENABLED", True)
+
+# 每个账号（AccessKey / ARK API Key）各接口的请求速率上限（次/秒），即 AIMD 调整的天花板
+SUBMIT_QPS = env_float("GOVERNOR_SUBMIT_QPS", 2.0)
+POLL_QPS = env_float("GOVERNOR_POLL_QPS", 10.0)
+ENDPOINT_QPS = {"submit": SUBMIT_QPS, "poll": POLL_QPS}
+
+# 每个账号同时进行的任务数上限，0 表示不预设上限（收到并发限流后仍会自适应收紧）
+MAX_TASKS = env_int("GOVERNOR_MAX_TASKS", 0)
+
+# 提交请求被限流后的最大重试次数
+MAX_RETRIES = env_int("GOVERNOR_MAX_RETRIES", 3)
+
+# 乘性减、加性增：限流时速率减半，每次成功恢复天花板的 5%
+MIN_QPS = 0.1
+DECREASE_FACTOR = 0.5
+INCREASE_FRACTION = 0.05
+
+# 视觉服务的限流错误码：50429 QPS 超限，50430 并发超限
+RATE_LIMIT_CODES = {50429}
+CONCURRENCY_LIMIT_CODES = {50430}
+# 方舟的限流错误码前缀
+ARK_THROTTLE_PREFIXES = ("RateLimitExceeded", "ServerOverloaded")
+
+
+def account_id(key):
+    """账号标识只保留凭证的摘要，不在内存表和日志中保存原文"""
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:12]
+
+
+def _retry_after(response):
+    try:
+        return max(0.0, float(response.headers.get("Retry-After", "")))
+    except ValueError:
+        return None
+
+
+def classify(response):
+    """判断响应是否为限流，返回 (是否限流, 是否并发超限, Retry-After 秒数或 None)"""
+    status = response.status_code
+    if status < 400:
+        return False, False, None
+    code = None
+    try:
+        result = response.json()
+        error = result.get("error")
+        code = error.get("code") if isinstance(error, dict) else result.get("code")
+    except (ValueError, AttributeError):
+        pass
+    if code in CONCURRENCY_LIMIT_CODES:
+        return True, True, _retry_after(response)
+    if status == 429 or code in RATE_LIMIT_CODES or (
+            isinstance(code, str) and code.startswith(ARK_THROTTLE_PREFIXES)):
+        return True, False, _retry_after(response)
+    return False, False, None
+
+
+class TokenBucket:
+    """令牌桶：速率在 [MIN_QPS, ceiling] 之间按 AIMD 调整，限流后整体暂停到 Retry-After 到期"""
+
+    def __init__(self, ceiling):
+        self.ceiling = ceiling
+        self.rate = ceiling
+        self.tokens = max(1.0, ceiling)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(max(1.0, self.rate), self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self):
+        """取得一个令牌时返回 0，否则返回还需等待的秒数（不阻塞）"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self.paused_until:
+                return self.paused_until - now
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return 0.0
+            return (1.0 - self.tokens) / self.rate
+
+    def acquire(self):
+        """阻塞直到取得一个令牌"""
+        while True:
+            delay = self.try_acquire()
+            if not delay:
+                return
+            time.sleep(delay)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.ceiling, self.rate + self.ceiling * INCREASE_FRACTION)
+
+    def on_throttle(self, retry_after=None):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(MIN_QPS, self.rate * DECREASE_FACTOR)
+            self.tokens = 0.0
+            pause = retry_after if retry_after is not None else 1.0 / self.rate
+            self.paused_until = max(self.paused_until, now + pause)
+            return self.rate
+
+
+class TaskLimiter:
+    """
+    同一账号同时进行的任务数限制
+
+    limit 为 None 表示不限制；提交时收到并发超限后收紧到当前已被接受的任务数，之后服务端每完成一个任务放宽 1，
+    不超过配置的上限。只有并发超限会收紧，参数错误等其他失败释放名额时不改变 limit
+    """
+
+    def __init__(self, ceiling=None):
+        self.ceiling = ceiling
+        self.limit = ceiling
+        self.running = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """等待空闲名额；等待期间用户中断执行时抛出 cancellation.Interrupted"""
+        with self._cond:
+            while self.limit is not None and self.running >= self.limit:
+                self._cond.wait(cancellation.CHECK_INTERVAL)
+                cancellation.check()
+            self.running += 1
+
+    def release(self, completed=True):
+        """释放名额；completed 为 True 表示服务端接受的任务已经结束，此时放宽 limit"""
+        with self._cond:
+            self.running -= 1
+            if completed and self.limit is not None and (self.ceiling is None or self.limit < self.ceiling):
+                self.limit += 1
+            self._cond.notify_all()
+
+    def on_throttle(self):
+        with self._cond:
+            # 发起本次提交的任务也计在 running 中，服务端实际接受的是其余任务
+            accepted = max(1, self.running - 1)
+            self.limit = accepted if self.limit is None else max(1, min(self.limit, accepted))
+            return self.limit
+
+
+class TaskSlot:
+    """
+    一次任务提交占用的并发名额；提交成功后绑定 task_id，任务结束时释放
+
+    同步接口请求成功后调用 done()，块结束时按任务完成释放；未绑定也未 done() 的名额（提交失败）释放时不放宽 limit
+    """
+
+    def __init__(self, governor, limiter):
+        self._governor = governor
+        self._limiter = limiter
+        self.task_id = None
+        self.completed = False
+
+    def bind(self, task_id):
+        self.task_id = task_id
+        self._governor._bind(task_id, self)
+
+    def done(self):
+        self.completed = True
+
+    def release(self, completed=True):
+        limiter, self._limiter = self._limiter, None
+        if limiter is not None:
+            limiter.release(completed)
+
+
+class Governor:
+    """进程级请求调度：按 (账号, 接口) 的令牌桶限速，按账号限制同时进行的任务数"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._limiters = {}
+        self._slots = {}
+
+    def bucket(self, account, endpoint):
+        key = (account_id(account), endpoint)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(ENDPOINT_QPS.get(endpoint, SUBMIT_QPS))
+        return bucket
+
+    def limiter(self, account):
+        key = account_id(account)
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limiter = self._limiters[key] = TaskLimiter(MAX_TASKS or None)
+        return limiter
+
+    def request(self, account, endpoint, send, retries=MAX_RETRIES, wait=True):
+        """
+        按账号与接口限速后调用 send() 发送请求，返回最后一次的响应
+
+        响应为限流时降低该桶的速率、按 Retry-After 暂停，并在 retries 次以内重试；
+        send 抛出的异常原样传给调用方。wait 为 False 时（后台轮询器中的查询）不在当前线程等待令牌，
+        而是抛出 task_poller.Defer，由轮询器到期后重新调度，一个账号被限流不会占住共享的查询线程
+        """
+        bucket = self.bucket(account, endpoint)
+        for attempt in range(retries + 1):
+            if wait:
+                bucket.acquire()
+            else:
+                delay = bucket.try_acquire()
+                if delay:
+                    raise Defer(delay)
+            response = send()
+            throttled, concurrency_limited, retry_after = classify(response)
+            if not throttled:
+                bucket.on_success()
+                return response
+            if concurrency_limited:
+                limit = self.limiter(account).on_throttle()
+                logger.warning("账号 %s 任务并发超限，同时进行的任务数收紧到 %s", account_id(account), limit)
+            rate = bucket.on_throttle(retry_after)
+            logger.warning("账号 %s 的 %s 请求被限流 (HTTP %s)，速率降到 %.2f 次/秒 (第%s次)",
+                           account_id(account), endpoint, response.status_code, rate, attempt + 1)
+        return response
+
+    def begin_task(self, account):
+        limiter = self.limiter(account)
+        limiter.acquire()
+        return TaskSlot(self, limiter)
+
+    def _bind(self, task_id, slot):
+        with self._lock:
+            self._slots[task_id] = slot
+
+    def track_task(self, task_id, future):
+        """
+        任务结果 Future 完成时释放该任务占用的并发名额（非本进程提交的任务没有名额，忽略）
+
+        被中断取消的任务在服务端可能仍在生成，释放名额但不放宽 limit
+        """
+        def on_done(f):
+            with self._lock:
+                slot = self._slots.pop(task_id, None)
+            if slot is not None:
+                slot.release(completed=not f.cancelled())
+
+        future.add_done_callback(on_done)
+        return future
+
+
+class _Passthrough:
+    """关闭调度时使用：直接发送，不限速也不限制并发"""
+
+    def request(self, account, endpoint, send, retries=MAX_RETRIES, wait=True):
+        return send()
+
+    def begin_task(self, account):
+        return TaskSlot(self, None)
+
+    def _bind(self, task_id, slot):
+        pass
+
+    def track_task(self, task_id, future):
+        return future
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def get_governor():
+    """获取进程级共享的请求调度器"""
+    global _governor
+    if _governor is None:
+        with _governor_lock:
+            if _governor is None:
+                _governor = Governor() if GOVERNOR_ENABLED else _Passthrough()
+    return _governor
+
+
+def request(account, endpoint, send, retries=MAX_RETRIES, wait=True):
+    """governor.request(access_key, "submit", lambda: http_client.post(...))"""
+    return get_governor().request(account, endpoint, send, retries, wait)
+
+
+@contextmanager
+def task_slot(account):
+    """
+    占用一个任务并发名额：with governor.task_slot(access_key) as slot: ... slot.bind(task_id)
+
+    块内绑定了 task_id 的名额在 track_task 登记的 Future 完成时释放，否则（提交失败、同步接口）在块结束时释放；
+    提交失败不是拥塞信号，释放时不放宽也不收紧并发限制，同步接口成功时调用 slot.done()
+    """
+    slot = get_governor().begin_task(account)
+    try:
+        yield slot
+    finally:
+        if slot.task_id is None:
+            slot.release(completed=slot.completed)
+
+
+def track_task(task_id, future):
+    return get_governor().track_task(task_id, future)
@@ -0,0 +1,53 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config import env_float, env_int
+
+# 连接池配置：pool_connections 为缓存的主机连接池数量，pool_maxsize 为每个主机保持的长连接数
+POOL_CONNECTIONS = env_int("HTTP_POOL_CONNECTIONS", 8)
+POOL_MAXSIZE = env_int("HTTP_POOL_MAXSIZE", 32)
+
+# 连接超时与读取超时分开配置（秒）
+CONNECT_TIMEOUT = env_float("HTTP_CONNECT_TIMEOUT", 5.0)
+READ_TIMEOUT = env_float("HTTP_READ_TIMEOUT", 30.0)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """获取进程级共享的 requests.Session，按主机复用 keep-alive 连接"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=POOL_CONNECTIONS,
+                    pool_maxsize=POOL_MAXSIZE,
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def timeout(read_timeout=None):
+    """构造 (connect, read) 超时元组"""
+    return (CONNECT_TIMEOUT, READ_TIMEOUT if read_timeout is None else read_timeout)
+
+
+def request(method, url, read_timeout=None, **kwargs):
+    """通过共享连接池发送请求"""
+    kwargs.setdefault("timeout", timeout(read_timeout))
+    return get_session().request(method, url, **kwargs)
+
+
+def get(url, read_timeout=None, **kwargs):
+    return request("GET", url, read_timeout=read_timeout, **kwargs)
+
+
+def post(url, read_timeout=None, **kwargs):
+    return request("POST", url, read_timeout=read_timeout, **kwargs)
@@ -0,0 +1,193 @@
+import base64
+import io
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from PIL import Image
+
+from .config import env_int, env_str
+from .log import get_logger
+
+logger = get_logger("image_codec")
+
+# PNG 压缩级别（0-9）：级别越高体积越小但编码越慢，默认偏向编码速度
+PNG_COMPRESS_LEVEL = env_int("PNG_COMPRESS_LEVEL", 1)
+JPEG_QUALITY = env_int("JPEG_QUALITY", 95)
+
+# 单张上传图片的体积预算（KB），超出时降低 JPEG 质量或缩小尺寸；默认 0 不限制，按原格式原尺寸上传
+UPLOAD_BUDGET_KB = env_int("UPLOAD_BUDGET_KB", 0)
+
+# 为满足体积预算缩小图片时，短边不低于该值
+MIN_SHORT_SIDE = 256
+
+# 视频模型输出分辨率对应的短边像素
+VIDEO_SHORT_SIDES = {"480p": 480, "720p": 720, "1080p": 1080}
+
+MIME_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png"}
+
+# 生成结果写入输出目录的格式：original 按服务端返回的字节原样保存，png/jpeg/webp 与原格式不同时转换一次
+OUTPUT_FORMAT = env_str("OUTPUT_FORMAT", "original").strip().upper()
+EXTENSIONS = {"PNG": "png", "JPEG": "jpg", "WEBP": "webp"}
+
+
+def tensor_to_uint8(image):
+    """
+    将 ComfyUI 单帧图片张量（[H,W,C] 或 [1,H,W,C]，取值 0-1）量化为 uint8 numpy 数组
+
+    在张量所在设备上一次完成截断、四舍五入和量化，只把 uint8 结果传回 CPU
+    """
+    if image.dim() == 4:
+        image = image[0]
+    if image.dtype == torch.uint8:
+        return image.cpu().numpy()
+    pixels = image.detach().mul(255.0)
+    pixels.clamp_(0.0, 255.0).round_()
+    return pixels.to(torch.uint8).cpu().numpy()
+
+
+def _save(pil_image, fmt, quality=None, compress_level=None):
+    buffer = io.BytesIO()
+    if fmt == "PNG":
+        pil_image.save(buffer, format="PNG",
+                       compress_level=PNG_COMPRESS_LEVEL if compress_level is None else compress_level)
+    else:
+        pil_image.save(buffer, format=fmt, quality=JPEG_QUALITY if quality is None else quality)
+    return buffer.getbuffer()
+
+
+def encode_image(image, fmt="JPEG", quality=None, compress_level=None):
+    """将单帧图片张量编码为 JPEG/PNG，返回编码缓冲区的 memoryview（避免再复制一份）"""
+    return _save(Image.fromarray(tensor_to_uint8(image)), fmt, quality, compress_level)
+
+
+def decode_image(data):
+    """
+    将服务端返回的图片字节解码为 [1,H,W,3] float32 张量，返回 (张量, 图片格式)
+
+    uint8 像素只做一次到 float32 的转换，除以 255 原地完成
+    """
+    with Image.open(io.BytesIO(data)) as pil_image:
+        fmt = pil_image.format
+        if pil_image.mode != "RGB":
+            pil_image = pil_image.convert("RGB")
+        pixels = np.array(pil_image)
+    return torch.from_numpy(pixels).float().div_(255.0).unsqueeze(0), fmt
+
+
+def image_extension(data, default="img"):
+    """只读取文件头识别图片字节的格式，返回对应的扩展名（无法识别时返回 default）"""
+    try:
+        with Image.open(io.BytesIO(data)) as pil_image:
+            fmt = pil_image.format
+    except (OSError, ValueError):
+        return default
+    return EXTENSIONS.get(fmt) or (fmt.lower() if fmt else default)
+
+
+def output_data(data, fmt):
+    """
+    返回写入输出目录的 (数据, 扩展名)
+
+    格式与 OUTPUT_FORMAT 一致（或配置为 original）时原样返回服务端的字节，不重新编码；否则只转换一次
+    """
+    target = fmt if OUTPUT_FORMAT == "ORIGINAL" else OUTPUT_FORMAT
+    if target == fmt and fmt in EXTENSIONS:
+        return data, EXTENSIONS[fmt]
+    if target not in EXTENSIONS:
+        target = "PNG"
+    with Image.open(io.BytesIO(data)) as pil_image:
+        if target == "JPEG" and pil_image.mode != "RGB":
+            pil_image = pil_image.convert("RGB")
+        return _save(pil_image, target), EXTENSIONS[target]
+
+
+def parse_ratio(ratio):
+    """将 "16:9" 这类宽高比解析为 宽/高，keep_ratio、adaptive 等返回 None"""
+    try:
+        width, height = ratio.split(":")
+        return float(width) / float(height)
+    except (AttributeError, ValueError, ZeroDivisionError):
+        return None
+
+
+def resize(image, scale):
+    """按比例缩放单帧图片张量（[H,W,C]），缩小时启用抗锯齿"""
+    if image.dim() == 4:
+        image = image[0]
+    if image.dtype == torch.uint8:
+        image = image.float() / 255.0
+    size = (max(1, round(image.shape[0] * scale)), max(1, round(image.shape[1] * scale)))
+    pixels = image.movedim(-1, 0).unsqueeze(0)
+    pixels = F.interpolate(pixels, size=size, mode="bilinear", align_corners=False, antialias=scale < 1)
+    return pixels.squeeze(0).movedim(0, -1)
+
+
+def fit_to_target(image, short_side=None, ratio=None):
+    """
+    按模型实际输出规格预处理输入图片：先按目标宽高比居中裁剪，再把短边缩小到 short_side
+
+    只缩小不放大；ratio 不是具体比例（如 adaptive）时不裁剪
+    """
+    if image.dim() == 4:
+        image = image[0]
+    height, width = image.shape[0], image.shape[1]
+    target = parse_ratio(ratio)
+    if target and abs(width / height - target) / target > 0.01:
+        if width / height > target:
+            new_width = max(1, round(height * target))
+            left = (width - new_width) // 2
+            image = image[:, left:left + new_width]
+        else:
+            new_height = max(1, round(width / target))
+            top = (height - new_height) // 2
+            image = image[top:top + new_height]
+        height, width = image.shape[0], image.shape[1]
+    if short_side and min(height, width) > short_side:
+        image = resize(image, short_side / min(height, width))
+    return image
+
+
+def encode_within_budget(image, fmt="JPEG", max_bytes=None):
+    """
+    编码单帧图片并尽量满足体积预算，返回 (编码数据, 实际格式)
+
+    先用首选格式和默认参数编码；超出预算时改用 JPEG 逐级降低质量，仍超出则缩小到 0.75 倍后重试，
+    直到短边低于 MIN_SHORT_SIDE 为止（此时返回最后一次的结果）
+    """
+    if max_bytes is None:
+        max_bytes = UPLOAD_BUDGET_KB * 1024
+    data = encode_image(image, fmt)
+    if not max_bytes or len(data) <= max_bytes:
+        return data, fmt
+
+    if image.dim() == 4:
+        image = image[0]
+    qualities = [JPEG_QUALITY] + [q for q in (85, 75, 60) if q < JPEG_QUALITY]
+    # 首选格式为 JPEG 时默认质量已经试过
+    skip_first = fmt == "JPEG"
+    while True:
+        for quality in qualities[1:] if skip_first else qualities:
+            data = encode_image(image, "JPEG", quality=quality)
+            if len(data) <= max_bytes:
+                return data, "JPEG"
+        if min(image.shape[0], image.shape[1]) * 0.75 < MIN_SHORT_SIDE:
+            logger.warning("图片压缩到 %s bytes 仍超过上传预算 %s bytes", len(data), max_bytes)
+            return data, "JPEG"
+        image = resize(image, 0.75)
+        skip_first = False
+
+
+def to_data_uri(data, fmt):
+    """将已编码的图片数据包装为 data URI"""
+    return f"data:{MIME_TYPES[fmt]};base64,{base64.b64encode(data).decode('ascii')}"
+
+
+def encode_base64(image, fmt="JPEG", quality=None, compress_level=None):
+    """将单帧图片张量编码为 base64 字符串"""
+    return base64.b64encode(encode_image(image, fmt, quality, compress_level)).decode("ascii")
+
+
+def encode_data_uri(image, fmt="PNG", quality=None, compress_level=None):
+    """将单帧图片张量编码为 data URI"""
+    return to_data_uri(encode_image(image, fmt, quality, compress_level), fmt)
@@ -0,0 +1,96 @@
+import json
+import logging
+
+from .config import env_int, env_str
+
+# 日志级别：DEBUG 时输出完整的请求/响应摘要，默认 INFO 只输出任务进度
+LOG_LEVEL = env_str("LOG_LEVEL", "INFO").upper()
+
+# 单个字符串字段与整条摘要的最大长度，超出部分截断
+MAX_FIELD_CHARS = env_int("LOG_MAX_FIELD_CHARS", 256)
+MAX_MESSAGE_CHARS = env_int("LOG_MAX_MESSAGE_CHARS", 4096)
+
+# 日志中需要脱敏的字段名（不区分大小写）
+SENSITIVE_KEYS = {"authorization", "access_key", "secret_key", "ark_api_key", "accesskeyid", "secretaccesskey"}
+
+# 字段名中包含这些片段的长字符串按图片数据处理，只记录长度
+BINARY_KEY_HINTS = ("base64", "binary")
+
+_root = logging.getLogger("jm_volcengine")
+_root.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+if not logging.getLogger().handlers:
+    # 宿主未配置日志时自行输出到标准错误，保持与原先 print 一致的可见性
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("[%(name)s] %(levelname)s %(message)s"))
+    _root.addHandler(_handler)
+    _root.propagate = False
+
+
+def get_logger(name):
+    """获取插件子模块的 logger，统一挂在 jm_volcengine 下"""
+    return logging.getLogger(f"jm_volcengine.{name}")
+
+
+def _truncate(text, limit):
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}...({len(text)} chars)"
+
+
+def _scrub(value, key=""):
+    """返回适合写入日志的副本：凭证脱敏，base64/data URI 只保留长度，长字符串截断"""
+    lowered = key.lower()
+    if lowered in SENSITIVE_KEYS:
+        return "***"
+    if isinstance(value, dict):
+        return {k: _scrub(v, str(k)) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_scrub(item, key) for item in value]
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"<{len(value)} bytes>"
+    if isinstance(value, str):
+        if value.startswith("data:") and ";base64," in value:
+            return f"{value[:value.index(';base64,') + 8]}<{len(value)} chars>"
+        if len(value) > MAX_FIELD_CHARS and any(hint in lowered for hint in BINARY_KEY_HINTS):
+            return f"<base64 {len(value)} chars>"
+        if value.startswith("Bearer "):
+            return "Bearer ***"
+        return _truncate(value, MAX_FIELD_CHARS)
+    if hasattr(value, "status_code") and hasattr(value, "text"):
+        # requests.Response：能解析为 JSON 时按字段脱敏，否则截断原始文本
+        try:
+            return _scrub(value.json())
+        except ValueError:
+            return _truncate(value.text, MAX_FIELD_CHARS)
+    if hasattr(value, "prefix") and hasattr(value, "data"):
+        # request_body.Base64Field
+        return f"{value.prefix.decode('ascii')}<base64 {len(value.data)} chars>"
+    return value
+
+
+class _Summary:
+    """延迟格式化的日志参数，只有日志真正输出时才调用 __str__"""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        scrubbed = _scrub(self.value)
+        if isinstance(scrubbed, str):
+            return _truncate(scrubbed, MAX_MESSAGE_CHARS)
+        try:
+            text = json.dumps(scrubbed, ensure_ascii=False, default=str)
+        except (TypeError, ValueError):
+            text = repr(scrubbed)
+        return _truncate(text, MAX_MESSAGE_CHARS)
+
+
+def summarize(value):
+    """
+    包装日志参数：logger.debug("响应: %s", summarize(result))
+
+    脱敏、截断和 JSON 序列化都推迟到日志真正输出时，关闭 DEBUG 时热路径上没有格式化开销
+    """
+    return _Summary(value)
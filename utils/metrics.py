@@ -0,0 +1,289 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from .config import env_bool, env_float, env_str
+from .log import get_logger
+
+logger = get_logger("metrics")
+
+METRICS_ENABLED = env_bool("METRICS_ENABLED", True)
+
+# 设置后按固定间隔把指标快照写入该 JSON 文件（适合无法访问 ComfyUI HTTP 服务的场景）
+METRICS_JSON_PATH = env_str("METRICS_JSON_PATH", "")
+METRICS_FLUSH_SECONDS = env_float("METRICS_FLUSH_SECONDS", 30.0)
+
+# 注册在 ComfyUI 服务上的 Prometheus 文本格式端点
+METRICS_ROUTE = "/jm_volcengine/metrics"
+
+# 各阶段耗时直方图的桶上界（秒），覆盖从编码/签名的毫秒级到视频生成的分钟级
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+PHASE_SECONDS = "jm_volcengine_phase_seconds"
+BYTES_TOTAL = "jm_volcengine_bytes_total"
+TASKS_TOTAL = "jm_volcengine_tasks_total"
+CREDENTIAL_SUBMITS_TOTAL = "jm_volcengine_credential_submits_total"
+CREDENTIAL_OUTSTANDING = "jm_volcengine_credential_outstanding"
+CREDENTIAL_HEALTHY = "jm_volcengine_credential_healthy"
+
+METRIC_HELP = {
+    PHASE_SECONDS: ("histogram", "各阶段耗时（encode/sign/submit/queue_wait/run/download/decode/save）"),
+    BYTES_TOTAL: ("counter", "上传与下载的字节数"),
+    TASKS_TOTAL: ("counter", "按最终状态统计的任务数"),
+    CREDENTIAL_SUBMITS_TOTAL: ("counter", "凭证池中各凭证的提交次数（ok/failed）"),
+    CREDENTIAL_OUTSTANDING: ("gauge", "凭证池中各凭证进行中的任务数"),
+    CREDENTIAL_HEALTHY: ("gauge", "凭证池中各凭证是否可用（1 可用，0 连续失败后暂停中）"),
+}
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in items) + "}"
+
+
+class MetricsRegistry:
+    """进程内指标表：直方图与计数器按 (指标名, 标签) 聚合，瞬时值（gauge）在导出时向登记的采集函数读取"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._collectors = []
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def add_collector(self, collect):
+        """登记采集函数：collect() 返回 [(指标名, 值, 标签字典)]，每次导出时调用"""
+        with self._lock:
+            self._collectors.append(collect)
+
+    def _gauges(self):
+        with self._lock:
+            collectors = list(self._collectors)
+        gauges = {}
+        for collect in collectors:
+            try:
+                for name, value, labels in collect():
+                    gauges[(name, tuple(sorted(labels.items())))] = value
+            except Exception as e:
+                logger.warning("采集指标失败: %s", e)
+        return gauges
+
+    def render_prometheus(self):
+        """导出 Prometheus 文本格式"""
+        gauges = self._gauges()
+        with self._lock:
+            histograms = {key: (list(h.counts), h.sum, h.count) for key, h in self._histograms.items()}
+            counters = dict(self._counters)
+        counters.update(gauges)
+
+        lines = []
+        for name, (kind, help_text) in METRIC_HELP.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "histogram":
+                for (metric, labels), (counts, total, count) in sorted(histograms.items()):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, bucket_count in zip(BUCKETS, counts):
+                        cumulative += bucket_count
+                        lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {count}")
+            else:
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """导出 JSON 可序列化的快照"""
+        gauges = [{"name": name, "labels": dict(labels), "value": value}
+                  for (name, labels), value in self._gauges().items()]
+        with self._lock:
+            histograms = [
+                {"name": name, "labels": dict(labels), "buckets": dict(zip(map(str, BUCKETS), h.counts)),
+                 "sum": h.sum, "count": h.count}
+                for (name, labels), h in self._histograms.items()
+            ]
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in self._counters.items()
+            ]
+        return {"timestamp": time.time(), "histograms": histograms, "counters": counters, "gauges": gauges}
+
+    def flush_json(self, path):
+        """把快照原子写入 JSON 文件"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+_registry = MetricsRegistry()
+
+
+def get_registry():
+    return _registry
+
+
+def observe_phase(phase, model, seconds):
+    """记录某个模型/req_key 在某阶段的耗时"""
+    if METRICS_ENABLED:
+        _registry.observe(PHASE_SECONDS, seconds, model=model, phase=phase)
+
+
+@contextmanager
+def timer(phase, model):
+    """统计 with 块耗时：with metrics.timer("encode", self.req_key): ..."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_phase(phase, model, time.perf_counter() - start)
+
+
+def count_bytes(model, direction, size):
+    """累计上传（upload）或下载（download）字节数"""
+    if METRICS_ENABLED and size:
+        _registry.inc(BYTES_TOTAL, size, model=model, direction=direction)
+
+
+def count_task(model, status):
+    """按最终状态（success/failed/timeout/cancelled）累计任务数"""
+    if METRICS_ENABLED:
+        _registry.inc(TASKS_TOTAL, model=model, status=status)
+
+
+def count_credential_submit(credential, status):
+    """按凭证名称累计提交结果（ok/failed），凭证原文不会出现在指标中"""
+    if METRICS_ENABLED:
+        _registry.inc(CREDENTIAL_SUBMITS_TOTAL, credential=credential, status=status)
+
+
+def register_gauges(collect):
+    """登记瞬时值指标的采集函数，见 MetricsRegistry.add_collector"""
+    if METRICS_ENABLED:
+        _registry.add_collector(collect)
+
+
+class TaskClock:
+    """
+    跟踪异步任务在服务端的排队与生成耗时
+
+    提交后创建；轮询时首次看到生成中状态调用 running()，任务结束时调用 finish()。
+    受轮询间隔影响，两个阶段的分界精度约为一个轮询间隔
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.started = time.monotonic()
+        self.running_at = None
+        self.finished = False
+
+    def running(self):
+        if self.running_at is None:
+            self.running_at = time.monotonic()
+
+    def finish(self, status):
+        if self.finished:
+            return
+        self.finished = True
+        now = time.monotonic()
+        running_at = self.running_at if self.running_at is not None else now
+        observe_phase("queue_wait", self.model, running_at - self.started)
+        observe_phase("run", self.model, now - running_at)
+        count_task(self.model, status)
+
+    def track(self, future, succeeded=bool):
+        """
+        任务 Future 完成时记录耗时，succeeded(结果) 为真记为 success，否则记为 failed，被取消记为 cancelled；
+        已记录的超时不重复统计
+        """
+        def on_done(f):
+            if f.cancelled():
+                self.finish("cancelled")
+                return
+            ok = f.exception() is None and succeeded(f.result())
+            self.finish("success" if ok else "failed")
+
+        future.add_done_callback(on_done)
+        return future
+
+
+_setup_done = False
+_setup_lock = threading.Lock()
+
+
+def _flush_loop(path, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            _registry.flush_json(path)
+        except OSError as e:
+            logger.warning("写入指标文件失败: %s", e)
+
+
+def setup():
+    """在插件加载时调用：向 ComfyUI 服务注册指标端点，并按配置启动 JSON 定时导出"""
+    global _setup_done
+    if not METRICS_ENABLED:
+        return
+    with _setup_lock:
+        if _setup_done:
+            return
+        _setup_done = True
+
+    if METRICS_JSON_PATH:
+        threading.Thread(target=_flush_loop, args=(METRICS_JSON_PATH, METRICS_FLUSH_SECONDS),
+                         name="jm-volcengine-metrics", daemon=True).start()
+
+    try:
+        from aiohttp import web
+        from server import PromptServer
+        routes = PromptServer.instance.routes
+    except (ImportError, AttributeError):
+        # 不在 ComfyUI 服务中运行（如单独导入测试）时只保留 JSON 导出
+        return
+
+    @routes.get(METRICS_ROUTE)
+    async def metrics_endpoint(request):
+        return web.Response(text=_registry.render_prometheus(), content_type="text/plain", charset="utf-8")
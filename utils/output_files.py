@@ -0,0 +1,133 @@
+import hashlib
+import os
+import re
+import threading
+import time
+
+from .config import env_str
+from .log import get_logger
+
+logger = get_logger("output_files")
+
+# 输出子目录分片：none 直接写入输出目录；date 按日期（YYYY-MM-DD）分目录；hash 按文件名哈希分到 256 个子目录
+SHARDING = env_str("OUTPUT_SHARDING", "none").strip().lower()
+
+_OPEN_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+
+
+def _hash_shard(filename):
+    return hashlib.md5(filename.encode("utf-8")).hexdigest()[:2]
+
+
+class FilenameAllocator:
+    """
+    输出文件名分配器，生成 prefix_0001.ext、prefix_0002.ext ... 形式的文件名
+
+    每个 (目录, 前缀, 扩展名) 在首次使用时扫描一次目录得到已有的最大序号，之后在内存中递增；
+    文件名以 O_EXCL 创建占位，多个线程或进程（包括 ComfyUI 的其他插件）不会拿到同一个文件名
+    """
+
+    def __init__(self, sharding=SHARDING):
+        self.sharding = sharding
+        self._lock = threading.Lock()
+        self._next = {}
+
+    def _scan(self, directories, prefix, extension):
+        """扫描目录，返回已有文件的最大序号 + 1"""
+        pattern = re.compile(rf"{re.escape(prefix)}_(\d+)\.{re.escape(extension)}$")
+        highest = 0
+        for directory in directories:
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        match = pattern.match(entry.name)
+                        if match:
+                            highest = max(highest, int(match.group(1)))
+            except FileNotFoundError:
+                continue
+        return highest + 1
+
+    def _shard_dirs(self, directory):
+        """hash 分片时参与扫描的全部子目录"""
+        try:
+            with os.scandir(directory) as entries:
+                return [entry.path for entry in entries if entry.is_dir() and len(entry.name) == 2]
+        except FileNotFoundError:
+            return []
+
+    def _claim_counter(self, directory, prefix, extension):
+        if self.sharding == "date":
+            directory = os.path.join(directory, time.strftime("%Y-%m-%d"))
+        key = (os.path.abspath(directory), prefix, extension)
+        with self._lock:
+            counter = self._next.get(key)
+            if counter is None:
+                scan = self._shard_dirs(directory) if self.sharding == "hash" else [directory]
+                counter = self._scan(scan, prefix, extension)
+            self._next[key] = counter + 1
+        return directory, counter
+
+    def create(self, directory, prefix, extension):
+        """
+        分配并以 O_EXCL 创建一个新文件，返回 (文件路径, 文件描述符)
+
+        prefix 可以包含子目录（如 "videos/seedance"），与 ComfyUI 保存节点的约定一致
+        """
+        subdir, prefix = os.path.split(prefix)
+        directory = os.path.join(directory, subdir)
+        while True:
+            target_dir, counter = self._claim_counter(directory, prefix, extension)
+            filename = f"{prefix}_{counter:04d}.{extension}"
+            if self.sharding == "hash":
+                target_dir = os.path.join(target_dir, _hash_shard(filename))
+            path = os.path.join(target_dir, filename)
+            os.makedirs(target_dir, exist_ok=True)
+            try:
+                return path, os.open(path, _OPEN_FLAGS, 0o666)
+            except FileExistsError:
+                # 文件在扫描之后被其他进程创建，序号已经递增，继续尝试下一个
+                logger.debug("文件名已被占用，跳过: %s", path)
+
+
+_allocator = None
+_allocator_lock = threading.Lock()
+
+
+def get_allocator():
+    """获取进程级共享的文件名分配器"""
+    global _allocator
+    if _allocator is None:
+        with _allocator_lock:
+            if _allocator is None:
+                _allocator = FilenameAllocator()
+    return _allocator
+
+
+def allocate(directory, prefix, extension):
+    """分配一个新的输出文件并创建为空文件，返回路径；调用方随后覆盖写入或用 os.replace 替换"""
+    path, fd = get_allocator().create(directory, prefix, extension)
+    os.close(fd)
+    return path
+
+
+def open_new(directory, prefix, extension):
+    """分配一个新的输出文件并以二进制写方式打开，返回 (路径, 文件对象)"""
+    path, fd = get_allocator().create(directory, prefix, extension)
+    return path, os.fdopen(fd, "wb")
+
+
+def write_new(directory, prefix, extension, data):
+    """分配一个新的输出文件并写入 data，返回路径"""
+    path, f = open_new(directory, prefix, extension)
+    with f:
+        f.write(data)
+    return path
+
+
+def discard(path):
+    """删除 allocate 预留后没有用上的空文件；已写入内容的文件保留"""
+    try:
+        if os.path.getsize(path) == 0:
+            os.remove(path)
+    except OSError:
+        pass
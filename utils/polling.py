@@ -0,0 +1,123 @@
+import random
+import threading
+import time
+from collections import deque
+
+from .config import env_float
+
+# 每个模型保留的最近完成耗时样本数，以及启用自适应调度所需的最少样本数
+HISTORY_SIZE = 50
+MIN_SAMPLES = 5
+
+_history = {}
+_history_lock = threading.Lock()
+
+
+def record_completion(key, duration):
+    """记录某个模型(req_key/model)一次任务从提交到完成的耗时（秒）"""
+    with _history_lock:
+        _history.setdefault(key, deque(maxlen=HISTORY_SIZE)).append(duration)
+
+
+def completion_window(key, low=0.1, high=0.9):
+    """返回该模型完成耗时的 (低分位, 高分位)，样本不足时返回 None"""
+    with _history_lock:
+        samples = sorted(_history.get(key, ()))
+    if len(samples) < MIN_SAMPLES:
+        return None
+    return (samples[int(low * (len(samples) - 1))], samples[int(high * (len(samples) - 1))])
+
+
+class PollingPolicy:
+    """
+    轮询调度策略：首次短延迟 + 指数退避(带抖动) + 总体截止时间
+
+    自适应模式下根据该模型历史完成耗时分布调整间隔：
+    预计完成之前直接等待到低分位点，分布区间内按最小间隔密集轮询，超过高分位后再指数退避
+    """
+
+    def __init__(self, first_delay, interval, max_interval, multiplier=1.5, jitter=0.1,
+                 deadline=600.0, adaptive=True):
+        self.first_delay = first_delay
+        self.interval = interval
+        self.max_interval = max_interval
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.deadline = deadline
+        self.adaptive = adaptive
+
+    def session(self, key, started_at=None):
+        """为一个任务创建轮询会话，key 用于区分不同模型的耗时统计"""
+        return PollSession(self, key, started_at)
+
+    def next_delay(self, key, elapsed, backoff_step):
+        """计算下一次轮询前的等待时间（未加抖动），返回 (delay, 是否处于退避阶段)"""
+        window = completion_window(key) if self.adaptive else None
+        if window is not None:
+            low, high = window
+            if elapsed < low:
+                return max(self.interval, low - elapsed), False
+            if elapsed <= high:
+                return self.interval, False
+        delay = min(self.max_interval, self.interval * (self.multiplier ** backoff_step))
+        return delay, True
+
+    def _with_jitter(self, delay):
+        if self.jitter <= 0:
+            return delay
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+class PollSession:
+    """单个任务的轮询状态；循环调用 wait() 后发起查询，任务完成时调用 done()"""
+
+    def __init__(self, policy, key, started_at=None):
+        self.policy = policy
+        self.key = key
+        self.started_at = started_at or time.monotonic()
+        self.attempt = 0
+        self._backoff_step = 0
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started_at
+
+    def delay(self):
+        """下一次轮询前应等待的秒数，超过截止时间时返回 None"""
+        remaining = self.policy.deadline - self.elapsed
+        if remaining <= 0:
+            return None
+        if self.attempt == 0:
+            delay = self.policy.first_delay
+        else:
+            delay, backing_off = self.policy.next_delay(self.key, self.elapsed, self._backoff_step)
+            self._backoff_step = self._backoff_step + 1 if backing_off else 0
+        return min(self.policy._with_jitter(delay), remaining)
+
+    def wait(self):
+        """等待到下一次轮询时间；已超过截止时间则返回 False"""
+        delay = self.delay()
+        if delay is None:
+            return False
+        if delay > 0:
+            time.sleep(delay)
+        self.attempt += 1
+        return True
+
+    def done(self):
+        """任务成功完成，记录耗时供后续自适应调度使用"""
+        record_completion(self.key, self.elapsed)
+
+
+# 各类任务的默认策略，截止时间可通过环境变量覆盖
+# 图片编辑通常几秒到几十秒完成，间隔上限 1 秒以便完成后尽快返回
+IMAGE_POLICY = PollingPolicy(
+    first_delay=1.0, interval=0.5, max_interval=1.0, multiplier=1.5,
+    deadline=env_float("POLL_IMAGE_DEADLINE", 300.0),
+)
+
+# 视频生成需要数分钟，间隔更长以节省查询配额
+VIDEO_POLICY = PollingPolicy(
+    first_delay=5.0, interval=2.0, max_interval=15.0, multiplier=1.5,
+    deadline=env_float("POLL_VIDEO_DEADLINE", 900.0),
+)
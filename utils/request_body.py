@@ -0,0 +1,92 @@
+import base64
+import hashlib
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 序列化骨架时代替大字段的占位字符串
+_PLACEHOLDER = "@@jm-volcengine-base64-field@@"
+_QUOTED_PLACEHOLDER = f'"{_PLACEHOLDER}"'.encode("ascii")
+
+
+def dumps(obj):
+    """紧凑 JSON 序列化为 UTF-8 bytes；安装了 orjson 时使用 orjson"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class Base64Field:
+    """
+    请求体中的 base64 大字段（图片数据）
+
+    构造时把编码后的图片数据一次性转为 base64 ASCII 字节，原始数据随即可以释放；
+    序列化时直接拼接进请求体，不经过 str，也不参与 JSON 转义扫描
+    """
+
+    __slots__ = ("data", "prefix")
+
+    def __init__(self, image_data, prefix=""):
+        self.data = base64.b64encode(image_data)
+        self.prefix = prefix.encode("ascii")
+
+    def __len__(self):
+        return len(self.prefix) + len(self.data)
+
+
+class JsonBody:
+    """最终发送的 JSON 请求体：data 为发送的 bytes，SHA-256 在首次使用时计算一次并缓存"""
+
+    __slots__ = ("data", "_digest")
+
+    def __init__(self, data):
+        self.data = data
+        self._digest = None
+
+    @property
+    def digest(self):
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.data).digest()
+        return self._digest
+
+    @property
+    def hexdigest(self):
+        return self.digest.hex()
+
+    def __len__(self):
+        return len(self.data)
+
+
+def _strip(value, fields):
+    """把 Base64Field 替换为占位字符串，返回只含小字段的骨架"""
+    if isinstance(value, Base64Field):
+        fields.append(value)
+        return _PLACEHOLDER
+    if isinstance(value, dict):
+        return {key: _strip(item, fields) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_strip(item, fields) for item in value]
+    return value
+
+
+def build(obj):
+    """
+    构造 JSON 请求体：先序列化不含图片数据的骨架，再把各 Base64Field 按出现顺序拼接进去
+
+    整个过程只为最终请求体分配一次与图片数据等大的内存
+    """
+    fields = []
+    head = dumps(_strip(obj, fields))
+    if not fields:
+        return JsonBody(head)
+
+    parts = head.split(_QUOTED_PLACEHOLDER)
+    if len(parts) != len(fields) + 1:
+        raise ValueError("请求体中包含与占位符相同的字符串")
+    pieces = [parts[0]]
+    for field, part in zip(fields, parts[1:]):
+        pieces.extend((b'"', field.prefix, field.data, b'"', part))
+    return JsonBody(b"".join(pieces))
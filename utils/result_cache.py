@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from .config import env_bool, env_int, env_str
+from .log import get_logger
+
+logger = get_logger("result_cache")
+
+# 结果缓存目录与容量上限，超出后按最近最少使用淘汰
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache")
+CACHE_DIR = env_str("CACHE_DIR", DEFAULT_DIR)
+CACHE_MAX_BYTES = env_int("CACHE_MAX_MB", 2048) * 1024 * 1024
+CACHE_ENABLED = env_bool("CACHE_ENABLED", True)
+
+# 节点上 cache_mode 输入的可选值：auto 仅缓存指定了种子的请求，always 种子为 -1 时也缓存，off 不使用磁盘缓存
+CACHE_MODES = ["auto", "always", "off"]
+
+# 不参与缓存键计算的输入（凭证和输出命名不影响生成结果）
+IGNORED_INPUTS = ("access_key", "secret_key", "ark_api_key", "filename_prefix", "cache_mode")
+
+
+def cache_key(kind, params, images=()):
+    """按 (req_key/model, 所有参数, 输入图片数据) 计算内容地址"""
+    digest = hashlib.sha256()
+    digest.update(kind.encode("utf-8"))
+    digest.update(b"\0")
+    clean = {k: v for k, v in params.items() if k not in IGNORED_INPUTS and not hasattr(v, "shape")}
+    digest.update(json.dumps(clean, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8"))
+    for image in images:
+        digest.update(b"\0")
+        if image is None:
+            continue
+        array = image.detach().cpu().contiguous().numpy()
+        digest.update(str((array.shape, array.dtype.str)).encode("utf-8"))
+        digest.update(memoryview(array).cast("B"))
+    return digest.hexdigest()
+
+
+def should_cache(seed, mode="auto"):
+    """种子为 -1 的随机请求默认不走缓存，除非 mode 为 always"""
+    if not CACHE_ENABLED or mode == "off":
+        return False
+    return mode == "always" or seed != -1
+
+
+def is_changed(kind, params, images=(), seed=-1, mode="auto"):
+    """
+    供节点 IS_CHANGED 使用：可缓存的确定性请求返回缓存键（输入不变即命中），
+    随机请求返回 NaN 使其每次都重新执行
+    """
+    if mode != "always" and seed == -1:
+        return float("nan")
+    return cache_key(kind, params, images)
+
+
+class ResultCache:
+    """磁盘结果缓存：每个条目为 <key>.<ext> 数据文件加 <key>.json 元数据，按访问时间 LRU 淘汰"""
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._total = 0
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                data_path = os.path.join(self.directory, meta["file"])
+                stat = os.stat(data_path)
+            except (OSError, ValueError, KeyError):
+                continue
+            entries.append((stat.st_mtime, name[:-5], meta["file"], stat.st_size))
+        for _, key, filename, size in sorted(entries):
+            self._entries[key] = (filename, size)
+            self._total += size
+
+    def get(self, key):
+        """命中时返回 (数据文件路径, 元数据)，否则返回 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+        path = os.path.join(self.directory, entry[0])
+        try:
+            os.utime(path)
+            with open(os.path.join(self.directory, key + ".json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            self._drop(key)
+            return None
+        return path, meta.get("meta", {})
+
+    def put(self, key, ext, data=None, src_path=None, meta=None):
+        """写入缓存条目，data 为字节数据，或 src_path 为已存在的文件（复制一份）"""
+        filename = f"{key}.{ext}"
+        path = os.path.join(self.directory, filename)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            if data is not None:
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+            else:
+                with open(src_path, "rb") as src, open(tmp_path, "wb") as f:
+                    while True:
+                        chunk = src.read(1024 * 1024)
+                        if not chunk:
+                            break
+                        f.write(chunk)
+            os.replace(tmp_path, path)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"file": filename, "meta": meta or {}, "created_at": time.time()}, f, ensure_ascii=False)
+            os.replace(tmp_path, os.path.join(self.directory, key + ".json"))
+        except OSError as e:
+            logger.error("写入结果缓存失败: %s", e)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+
+        size = os.path.getsize(path)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total -= old[1]
+            self._entries[key] = (filename, size)
+            self._total += size
+            evicted = []
+            while self._total > self.max_bytes and len(self._entries) > 1:
+                old_key, (old_file, old_size) = self._entries.popitem(last=False)
+                self._total -= old_size
+                evicted.append((old_key, old_file))
+        for old_key, old_file in evicted:
+            self._remove_files(old_key, old_file)
+        return path
+
+    def _drop(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._total -= entry[1]
+        if entry is not None:
+            self._remove_files(key, entry[0])
+
+    def _remove_files(self, key, filename):
+        for name in (filename, key + ".json"):
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """获取进程级共享的结果缓存"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache()
+    return _cache
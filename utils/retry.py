@@ -0,0 +1,224 @@
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from urllib3.exceptions import NewConnectionError
+
+from . import governor
+from .config import env_float, env_int
+from .log import get_logger
+from .task_poller import Defer
+
+logger = get_logger("retry")
+
+# 提交请求遇到暂时性错误时的最大重试次数，退避时间为 min(上限, 基数 * 2^n) 并带随机抖动
+RETRY_ATTEMPTS = env_int("RETRY_ATTEMPTS", 3)
+RETRY_BASE_DELAY = env_float("RETRY_BASE_DELAY", 0.5)
+RETRY_MAX_DELAY = env_float("RETRY_MAX_DELAY", 8.0)
+
+# 熔断：同一服务接口连续暂时性失败达到该次数后打开，期间请求直接失败，到期后放行一个探测请求
+BREAKER_FAILURES = env_int("BREAKER_FAILURES", 5)
+BREAKER_RESET_SECONDS = env_float("BREAKER_RESET_SECONDS", 30.0)
+
+# 状态查询在该时长（秒）内未返回时再发出一个相同请求，取先返回的结果；0 表示不发对冲请求
+HEDGE_AFTER = env_float("HEDGE_AFTER", 0.0)
+
+# 错误分类
+OK = "ok"
+THROTTLED = "throttled"
+TRANSIENT = "transient"
+PERMANENT = "permanent"
+
+TRANSIENT_STATUSES = {408, 425, 429}
+# 视觉服务的暂时性错误码：QPS/并发超限与服务内部错误；其余错误码（鉴权、参数、审核）重试无意义
+VISUAL_TRANSIENT_CODES = {50429, 50430, 50500, 50501}
+# 方舟的暂时性错误码前缀
+ARK_TRANSIENT_PREFIXES = ("RateLimitExceeded", "ServerOverloaded", "InternalServiceError", "ServiceUnavailable")
+
+# 查询到这些任务状态时任务不可能再完成
+FAILED_STATUSES = {"failed", "not_found", "expired"}
+
+
+class CircuitOpenError(Exception):
+    """服务接口处于熔断状态，请求未发出"""
+
+
+def _error_code(response):
+    try:
+        result = response.json()
+    except ValueError:
+        return None
+    if not isinstance(result, dict):
+        return None
+    error = result.get("error")
+    return error.get("code") if isinstance(error, dict) else result.get("code")
+
+
+def classify(response=None, error=None):
+    """
+    判断一次请求的结果：OK、THROTTLED（由 governor 处理）、TRANSIENT（可重试）或 PERMANENT（不可重试）
+
+    传入 error 时按异常分类：超时与连接错误为暂时性，其他异常视为不可重试
+    """
+    if error is not None:
+        transient = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+        return TRANSIENT if isinstance(error, transient) else PERMANENT
+    if governor.classify(response)[0]:
+        return THROTTLED
+    status = response.status_code
+    code = _error_code(response)
+    if status in TRANSIENT_STATUSES or status >= 500 or code in VISUAL_TRANSIENT_CODES or (
+            isinstance(code, str) and code.startswith(ARK_TRANSIENT_PREFIXES)):
+        return TRANSIENT
+    if status >= 400:
+        return PERMANENT
+    # 方舟成功响应没有 code；视觉服务以 10000 表示成功
+    if code is None or code == 10000:
+        return OK
+    return PERMANENT
+
+
+def connect_failed(error):
+    """请求确定没有到达服务端：连接超时，或无法建立连接（DNS 解析失败、连接被拒绝）"""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if not isinstance(error, requests.ConnectionError) or not error.args:
+        return False
+    return isinstance(getattr(error.args[0], "reason", None), NewConnectionError)
+
+
+def backoff(attempt):
+    """第 attempt 次重试前的等待时间（秒）"""
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)
+    return delay * random.uniform(0.5, 1.0)
+
+
+class CircuitBreaker:
+    """单个服务接口的熔断器：closed 正常放行，open 直接拒绝，到期后 half-open 只放行一个探测请求"""
+
+    def __init__(self, name, failures=BREAKER_FAILURES, reset_seconds=BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failures
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    def before(self):
+        """请求前调用，熔断中抛出 CircuitOpenError"""
+        with self._lock:
+            if self.opened_at is None:
+                return
+            remaining = self.opened_at + self.reset_seconds - time.monotonic()
+            if remaining > 0 or self.probing:
+                raise CircuitOpenError(f"{self.name} 熔断中，{max(remaining, 0):.0f} 秒后重试")
+            self.probing = True
+
+    def skip(self):
+        """请求未发出（限速中，稍后再试），不影响熔断状态"""
+        with self._lock:
+            self.probing = False
+
+    def record(self, outcome):
+        """记录请求结果；只有暂时性失败计入熔断，不可重试的错误说明服务本身可用"""
+        with self._lock:
+            self.probing = False
+            if outcome != TRANSIENT:
+                if self.opened_at is not None:
+                    logger.info("%s 已恢复，关闭熔断", self.name)
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning("%s 连续 %s 次暂时性失败，熔断 %.0f 秒", self.name, self.failures,
+                                   self.reset_seconds)
+                self.opened_at = time.monotonic()
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(service, endpoint):
+    """获取 (服务, 接口) 的进程级熔断器，如 ("visual", "submit")、("ark", "poll")"""
+    key = (service, endpoint)
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = _breakers[key] = CircuitBreaker(f"{service}/{endpoint}")
+    return breaker
+
+
+_hedge_executor = None
+_hedge_lock = threading.Lock()
+
+
+def _get_hedge_executor():
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _hedge_lock:
+            if _hedge_executor is None:
+                _hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="jm-volcengine-hedge")
+    return _hedge_executor
+
+
+def _hedged(send, hedge_after):
+    """先发一个请求，hedge_after 秒内未返回时再发一个，返回先成功的结果（都失败时抛出第一个请求的异常）"""
+    executor = _get_hedge_executor()
+    first = executor.submit(send)
+    done, _ = wait([first], timeout=hedge_after)
+    if done:
+        return first.result()
+    logger.debug("请求 %.1f 秒未返回，发出对冲请求", hedge_after)
+    pending = {first, executor.submit(send)}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+    return first.result()
+
+
+def call(service, endpoint, send, retries=RETRY_ATTEMPTS, idempotent=False, hedge_after=0.0):
+    """
+    经过熔断器调用 send() 发送请求，暂时性错误按退避重试，返回最后一次的响应
+
+    非幂等请求（提交任务）只在确定服务端未接受请求时重试：连接失败，或限流响应（429、限流错误码）。
+    5xx、服务内部错误码与读取超时都无法确定服务端是否已创建任务，直接返回/抛出，避免重复提交计费。
+    幂等请求遇到暂时性错误也会重试；重试用尽后返回最后的响应或抛出最后的异常。
+    hedge_after 大于 0 时对幂等请求使用对冲请求
+    """
+    breaker = get_breaker(service, endpoint)
+    for attempt in range(retries + 1):
+        breaker.before()
+        try:
+            if idempotent and hedge_after > 0:
+                response = _hedged(send, hedge_after)
+            else:
+                response = send()
+        except Defer:
+            breaker.skip()
+            raise
+        except Exception as e:
+            outcome = classify(error=e)
+            breaker.record(outcome)
+            retryable = outcome == TRANSIENT and (idempotent or connect_failed(e))
+            if not retryable or attempt == retries:
+                raise
+            logger.warning("%s/%s 请求异常（%s），第 %s 次重试", service, endpoint, e, attempt + 1)
+        else:
+            outcome = classify(response)
+            breaker.record(outcome)
+            # 限流响应由 governor 按 Retry-After 重试，关闭调度时才在这里重试
+            retryable = (outcome == THROTTLED and not governor.GOVERNOR_ENABLED) or (
+                    idempotent and outcome == TRANSIENT)
+            if not retryable or attempt == retries:
+                return response
+            logger.warning("%s/%s %s (HTTP %s)，第 %s 次重试", service, endpoint,
+                           "被限流" if outcome == THROTTLED else "暂时性错误", response.status_code, attempt + 1)
+        time.sleep(backoff(attempt))
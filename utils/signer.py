@@ -0,0 +1,82 @@
+import datetime
+import hashlib
+import hmac
+from functools import lru_cache
+from urllib.parse import urlencode
+
+ALGORITHM = "HMAC-SHA256"
+CONTENT_TYPE = "application/json"
+SIGNED_HEADERS = "content-type;host;x-content-sha256;x-date"
+
+DEFAULT_REGION = "cn-north-1"
+DEFAULT_SERVICE = "cv"
+
+
+def _hmac_sha256(key, msg):
+    return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+
+
+@lru_cache(maxsize=256)
+def get_signing_key(secret_key, date_stamp, region, service):
+    """派生签名密钥，按 (secret, 日期, region, service) 缓存，每天每个密钥只计算一次"""
+    k_date = _hmac_sha256(secret_key.encode("utf-8"), date_stamp)
+    k_region = _hmac_sha256(k_date, region)
+    k_service = _hmac_sha256(k_region, service)
+    return _hmac_sha256(k_service, "request")
+
+
+def canonical_query(query_params):
+    """规范化查询字符串（按参数名排序并进行URL编码）"""
+    return urlencode(sorted(query_params.items()))
+
+
+def sign_request(access_key, secret_key, host, query_params, body,
+                 method="POST", region=DEFAULT_REGION, service=DEFAULT_SERVICE, timestamp=None,
+                 payload_hash=None):
+    """
+    火山引擎V4签名，返回需要附加到请求上的headers
+
+    body 应为最终发送的请求体；传入 bytes 时直接哈希，避免重复编码。
+    已知请求体的 SHA-256（十六进制）时可通过 payload_hash 传入，不再重复哈希
+    """
+    if not access_key or not secret_key:
+        raise ValueError("Access key and secret key are required.")
+
+    t = timestamp or datetime.datetime.utcnow()
+    current_date = t.strftime("%Y%m%dT%H%M%SZ")
+    date_stamp = current_date[:8]
+
+    if payload_hash is None:
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        payload_hash = hashlib.sha256(body).hexdigest()
+
+    canonical_request = (
+        f"{method}\n/\n{canonical_query(query_params)}\n"
+        f"content-type:{CONTENT_TYPE}\n"
+        f"host:{host}\n"
+        f"x-content-sha256:{payload_hash}\n"
+        f"x-date:{current_date}\n"
+        f"\n{SIGNED_HEADERS}\n{payload_hash}"
+    )
+
+    credential_scope = f"{date_stamp}/{region}/{service}/request"
+    string_to_sign = (
+        f"{ALGORITHM}\n{current_date}\n{credential_scope}\n"
+        f"{hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()}"
+    )
+
+    signing_key = get_signing_key(secret_key, date_stamp, region, service)
+    signature = hmac.new(signing_key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+
+    authorization = (
+        f"{ALGORITHM} Credential={access_key}/{credential_scope}, "
+        f"SignedHeaders={SIGNED_HEADERS}, Signature={signature}"
+    )
+
+    return {
+        "X-Date": current_date,
+        "Authorization": authorization,
+        "X-Content-Sha256": payload_hash,
+        "Content-Type": CONTENT_TYPE,
+    }
@@ -0,0 +1,216 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from .config import env_bool, env_float, env_str
+from .log import get_logger
+
+logger = get_logger("task_journal")
+
+# 任务日志默认保存在插件目录下，可通过环境变量改到持久化存储
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "task_journal.sqlite3")
+JOURNAL_PATH = env_str("JOURNAL_PATH", DEFAULT_PATH)
+JOURNAL_ENABLED = env_bool("JOURNAL_ENABLED", True)
+
+# 服务端结果URL有有效期，超过该时长（小时）的记录不再复用，打开任务日志时删除
+MAX_AGE_HOURS = env_float("JOURNAL_MAX_AGE_HOURS", 24.0)
+
+# 任务状态
+SUBMITTED = "submitted"
+DONE = "done"
+SAVED = "saved"
+FAILED = "failed"
+# 执行被中断后不再查询、但服务端无法取消而仍在生成的任务，相同请求再次运行时可以接上
+ABANDONED = "abandoned"
+# 已在服务端取消的任务
+CANCELLED = "cancelled"
+# 查询超过截止时间仍未完成的任务，相同请求再次运行时重新提交
+EXPIRED = "expired"
+# 进入这些状态后本进程不再查询该任务
+_RELEASED = (DONE, SAVED, FAILED, ABANDONED, CANCELLED, EXPIRED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    fingerprint TEXT NOT NULL,
+    node_type TEXT NOT NULL,
+    task_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    result_url TEXT,
+    result_path TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    account TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_fingerprint ON tasks (fingerprint, created_at);
+"""
+
+
+def fingerprint(node_type, credential, body):
+    """
+    请求指纹：节点类型 + 凭证摘要 + 请求体（含输入图片数据）
+
+    body 可以是最终发送的 bytes（直接哈希）、dict（规范化为 JSON 后哈希），
+    或 request_body.JsonBody（使用其已计算的摘要，不再哈希一遍请求体）
+    """
+    if hasattr(body, "digest"):
+        body = body.digest
+    elif isinstance(body, dict):
+        body = json.dumps(body, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    digest = hashlib.sha256()
+    digest.update(node_type.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(hashlib.sha256(credential.encode("utf-8")).digest())
+    digest.update(b"\0")
+    digest.update(body)
+    return digest.hexdigest()
+
+
+class TaskJournal:
+    """
+    基于 SQLite 的任务日志，在每次状态变化时记录请求指纹、task_id、节点类型、状态和结果
+
+    进程重启或执行被中断后，相同指纹的请求可以重新接上进行中或已完成的任务，而不是重新提交
+    """
+
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        # 本进程中正在查询的任务，以及正在查找/提交中的指纹（值为 [锁, 引用数]）
+        self._claimed = set()
+        self._submitting = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        # 旧版本创建的数据库没有 account 列（提交任务的账号标识）
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(tasks)")}
+        if "account" not in columns:
+            self._conn.execute("ALTER TABLE tasks ADD COLUMN account TEXT")
+        self.prune()
+
+    def prune(self, max_age_hours=MAX_AGE_HOURS):
+        """删除创建时间超过 max_age_hours 的记录（结果URL已过期，不会再被复用），返回删除的条数"""
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM tasks WHERE created_at < ?", (time.time() - max_age_hours * 3600,)
+            ).rowcount
+        if deleted:
+            logger.info("已清理 %s 条过期的任务记录", deleted)
+        return deleted
+
+    def record(self, fp, node_type, task_id, account=None):
+        """记录新提交的任务；account 为提交账号的标识（governor.account_id），查询该任务时必须使用同一账号"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tasks (fingerprint, node_type, task_id, status, created_at, updated_at, account) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (fp, node_type, task_id, SUBMITTED, now, now, account),
+            )
+            self._claimed.add(task_id)
+
+    def update(self, task_id, status, result_url=None, result_path=None):
+        """更新任务状态，未提供的结果字段保持不变"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE tasks SET status = ?, result_url = COALESCE(?, result_url), "
+                "result_path = COALESCE(?, result_path), updated_at = ? WHERE task_id = ?",
+                (status, result_url, result_path, time.time(), task_id),
+            )
+            if status in _RELEASED:
+                self._claimed.discard(task_id)
+
+    @contextmanager
+    def submitting(self, fp):
+        """
+        串行化同一指纹的 claim() 与提交、record()：并发提交相同请求时，
+        后来者总能看到先提交的任务，是否复用不取决于线程调度
+        """
+        with self._lock:
+            entry = self._submitting.setdefault(fp, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._submitting[fp]
+
+    def claim(self, fp, include_finished=True, shared=True):
+        """
+        查找可复用的最近任务并登记为本进程正在查询；include_finished 为 False 时只返回仍在进行中的任务
+
+        shared 为 False（种子为 -1，每次提交都应得到独立的随机结果）时跳过本进程中已有查询者的任务，
+        只接上进程重启或执行中断后遗留的任务
+        """
+        statuses = (SUBMITTED, ABANDONED, DONE, SAVED) if include_finished else (SUBMITTED, ABANDONED)
+        min_created = time.time() - MAX_AGE_HOURS * 3600
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT task_id, status, result_url, result_path, account FROM tasks "
+                f"WHERE fingerprint = ? AND created_at >= ? AND status IN ({','.join('?' * len(statuses))}) "
+                "ORDER BY created_at DESC",
+                (fp, min_created, *statuses),
+            ).fetchall()
+            row = next((row for row in rows if shared or row[0] not in self._claimed), None)
+            if row is None:
+                return None
+            if row[1] in (SUBMITTED, ABANDONED):
+                self._claimed.add(row[0])
+        return {"task_id": row[0], "status": row[1], "result_url": row[2], "result_path": row[3], "account": row[4]}
+
+    def saved_path(self, task_id):
+        """任务结果已保存且文件仍存在时返回本地路径"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result_path FROM tasks WHERE task_id = ? AND status = ?", (task_id, SAVED)
+            ).fetchone()
+        if row and row[0] and os.path.exists(row[0]):
+            return row[0]
+        return None
+
+
+class _NullJournal:
+    """禁用任务日志时使用的空实现"""
+
+    def record(self, fp, node_type, task_id, account=None):
+        pass
+
+    def update(self, task_id, status, result_url=None, result_path=None):
+        pass
+
+    def submitting(self, fp):
+        return nullcontext()
+
+    def claim(self, fp, include_finished=True, shared=True):
+        return None
+
+    def saved_path(self, task_id):
+        return None
+
+
+_journal = None
+_journal_lock = threading.Lock()
+
+
+def get_journal():
+    """获取进程级共享的任务日志；无法打开数据库时退化为不记录"""
+    global _journal
+    if _journal is None:
+        with _journal_lock:
+            if _journal is None:
+                journal = _NullJournal()
+                if JOURNAL_ENABLED:
+                    try:
+                        journal = TaskJournal()
+                    except sqlite3.Error as e:
+                        logger.warning("任务日志不可用，将不记录任务: %s", e)
+                _journal = journal
+    return _journal
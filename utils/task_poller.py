@@ -0,0 +1,130 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+
+from .config import env_int
+
+# 执行单次状态查询的线程数；调度本身只占用一个后台线程
+CHECK_WORKERS = env_int("POLLER_WORKERS", 8)
+
+# check 函数返回此值表示任务仍在进行中，需要按轮询策略再次查询
+PENDING = object()
+
+
+class Defer(Exception):
+    """check 函数抛出此异常表示本次未发出查询（如账号限速中），delay 秒后再执行，不计入查询次数"""
+
+    def __init__(self, delay):
+        super().__init__(f"{delay:.2f} 秒后再查询")
+        self.delay = delay
+
+
+class TaskPoller:
+    """
+    进程级后台轮询器，统一管理所有节点的未完成任务
+
+    每个任务登记一个 check 函数和一个 PollSession，调度线程按下次到期时间维护一个优先队列，
+    到期后把单次查询交给查询线程池执行；check 返回 PENDING 以外的值时完成对应的 Future
+    """
+
+    def __init__(self, workers=CHECK_WORKERS):
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jm-volcengine-poll")
+        self._thread = threading.Thread(target=self._run, name="jm-volcengine-poller", daemon=True)
+        self._thread.start()
+
+    def submit(self, check, poll_session, timeout_result=None):
+        """
+        登记一个任务，返回在任务完成（或超过截止时间）时得到结果的 Future
+
+        timeout_result 为超时时的结果；传入可调用对象时在超时时调用以生成结果
+        """
+        future = Future()
+        self._schedule(check, poll_session, future, timeout_result)
+        return future
+
+    def _schedule(self, check, poll_session, future, timeout_result, delay=None):
+        if delay is None:
+            delay = poll_session.delay()
+        if delay is None:
+            future.set_result(timeout_result() if callable(timeout_result) else timeout_result)
+            return
+        with self._cond:
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._seq),
+                                        check, poll_session, future, timeout_result))
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                due = self._heap[0][0]
+                now = time.monotonic()
+                if due > now:
+                    self._cond.wait(due - now)
+                    continue
+                job = heapq.heappop(self._heap)
+            self._executor.submit(self._check, *job[2:])
+
+    def _check(self, check, poll_session, future, timeout_result):
+        # 被取消（节点执行被中断）的任务不再查询，直接移出调度
+        if future.cancelled():
+            return
+        poll_session.attempt += 1
+        try:
+            try:
+                result = check()
+            except Defer as e:
+                # 等待期间不占用查询线程，由调度线程在到期后重新执行
+                poll_session.attempt -= 1
+                self._schedule(check, poll_session, future, timeout_result, e.delay)
+                return
+            except Exception as e:
+                future.set_exception(e)
+                return
+            if result is PENDING:
+                self._schedule(check, poll_session, future, timeout_result)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            # 查询进行期间任务被取消
+            pass
+
+
+def then(future, fn):
+    """返回一个新的 Future，其结果为 fn(future.result())；取消两者之一时另一个也被取消"""
+    chained = Future()
+
+    def on_done(f):
+        if f.cancelled():
+            chained.cancel()
+            return
+        try:
+            chained.set_result(fn(f.result()))
+        except InvalidStateError:
+            pass
+        except Exception as e:
+            chained.set_exception(e)
+
+    future.add_done_callback(on_done)
+    chained.add_done_callback(lambda c: c.cancelled() and future.cancel())
+    return chained
+
+
+_poller = None
+_poller_lock = threading.Lock()
+
+
+def get_poller():
+    """获取进程级共享的后台轮询器"""
+    global _poller
+    if _poller is None:
+        with _poller_lock:
+            if _poller is None:
+                _poller = TaskPoller()
+    return _poller
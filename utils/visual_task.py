@@ -0,0 +1,170 @@
+from . import cancellation, governor, http_client, log, metrics, polling, request_body, retry, signer, task_journal, task_poller
+from .config import VISUAL_ENDPOINT
+
+logger = log.get_logger("visual_task")
+
+# 视觉服务异步任务接口（CVSync2AsyncSubmitTask / CVSync2AsyncGetResult）的签名参数
+SERVICE = "cv"
+REGION = "cn-north-1"
+HOST = "visual.volcengineapi.com"
+API_VERSION = "2022-08-31"
+
+# 查询到这些状态时任务仍在进行中
+PENDING_STATUSES = ("in_queue", "generating")
+
+
+def _url(action):
+    query_params = {"Action": action, "Version": API_VERSION}
+    return query_params, f"{VISUAL_ENDPOINT}?" + signer.canonical_query(query_params)
+
+
+def _sign(access_key, secret_key, query_params, payload):
+    return signer.sign_request(access_key, secret_key, HOST, query_params, payload.data,
+                               region=REGION, service=SERVICE, payload_hash=payload.hexdigest)
+
+
+def submit(req_key, credential, body_params, seed=-1):
+    """
+    提交视觉服务异步任务，返回 (task_id, 查询该任务必须使用的凭证)，提交失败时 task_id 为 None
+
+    相同请求存在进行中（或已完成且指定了种子）的任务时直接接上，不重复提交
+    """
+    access_key, secret_key = credential.access_key, credential.secret_key
+    query_params, url = _url("CVSync2AsyncSubmitTask")
+    # 请求体只序列化一次，指纹、签名和发送使用同一份 bytes 与同一个摘要
+    payload = request_body.build(body_params)
+
+    journal = task_journal.get_journal()
+    fingerprint = task_journal.fingerprint(req_key, credential.scope, payload)
+    # 同一请求的查找、提交与登记串行执行；种子为 -1 时不接上本进程中其他节点/帧正在查询的任务
+    with journal.submitting(fingerprint):
+        entry = journal.claim(fingerprint, include_finished=seed != -1, shared=seed != -1)
+        if entry:
+            # 任务只能用提交它的账号查询
+            owner = credential.resume(entry["account"])
+            if owner is not None:
+                logger.info("复用已提交的任务，task_id: %s (状态: %s)", entry["task_id"], entry["status"])
+                return entry["task_id"], owner
+            logger.warning("任务 %s 的提交凭证已不在凭证池中，重新提交", entry["task_id"])
+
+        with metrics.timer("sign", req_key):
+            headers = _sign(access_key, secret_key, query_params, payload)
+
+        # 占用账号的任务并发名额并按提交速率限速，任务结束时释放名额
+        with governor.task_slot(access_key) as slot:
+            try:
+                # 连接失败按退避重试（5xx 时服务端可能已创建任务，不重试），服务持续故障时熔断直接失败
+                with metrics.timer("submit", req_key):
+                    response = retry.call("visual", "submit", lambda: governor.request(
+                        access_key, "submit", lambda: http_client.post(
+                            url, headers=headers, data=payload.data, read_timeout=30)))
+                metrics.count_bytes(req_key, "upload", len(payload))
+                logger.debug("提交任务响应状态码: %s", response.status_code)
+
+                if response.status_code == 200:
+                    result = response.json()
+                    logger.debug("提交任务响应: %s", log.summarize(result))
+
+                    if result.get("code") == 10000:
+                        task_id = result["data"]["task_id"]
+                        journal.record(fingerprint, req_key, task_id, credential.account)
+                        slot.bind(task_id)
+                        credential.report(True)
+                        return task_id, credential
+                    logger.error("任务提交失败: %s", result.get("message", "未知错误"))
+                else:
+                    logger.error("HTTP请求失败: %s - %s", response.status_code, log.summarize(response))
+
+            except retry.CircuitOpenError as e:
+                # 熔断说明服务接口故障，请求未发出，不计为该凭证的失败
+                logger.error("%s", e)
+                return None, credential
+            except Exception as e:
+                logger.error("请求异常: %s", e)
+            credential.report(False)
+            return None, credential
+
+
+def watch(req_key, access_key, secret_key, task_id, on_done, poll_policy, extra_body=None):
+    """
+    将任务登记到后台轮询器，返回任务结果的 Future（失败或超时为 None）
+
+    on_done(data) 把状态为 done 的查询结果转换为 (结果, 结果URL)，结果为 None 表示任务失败；
+    extra_body 为查询请求体中的附加字段（如 req_json）。执行被中断取消 Future 时调用 abandon(task_id)
+    """
+    poll_session = poll_policy.session(req_key)
+    query_params, url = _url("CVSync2AsyncGetResult")
+    payload = request_body.build(dict({"req_key": req_key, "task_id": task_id}, **(extra_body or {})))
+    journal = task_journal.get_journal()
+    clock = metrics.TaskClock(req_key)
+
+    def fail(*args):
+        logger.error(*args)
+        journal.update(task_id, task_journal.FAILED)
+        return None
+
+    def check():
+        try:
+            headers = _sign(access_key, secret_key, query_params, payload)
+            # 查询失败时不在此重试，由轮询器按策略再次查询；可选对冲请求降低慢响应的影响
+            response = retry.call("visual", "poll", lambda: governor.request(
+                access_key, "poll", lambda: http_client.post(
+                    url, headers=headers, data=payload.data, read_timeout=30), retries=0, wait=False),
+                retries=0, idempotent=True, hedge_after=retry.HEDGE_AFTER)
+
+            if response.status_code == 200:
+                result = response.json()
+                logger.debug("查询结果 (第%s次): %s", poll_session.attempt, log.summarize(result))
+
+                if result.get("code") == 10000:
+                    data = result.get("data", {})
+                    status = data.get("status", "")
+
+                    if status == "done":
+                        poll_session.done()
+                        value, result_url = on_done(data)
+                        if value is None:
+                            return fail("任务 %s 完成但未获取到结果", task_id)
+                        journal.update(task_id, task_journal.DONE, result_url=result_url)
+                        return value
+                    if status in retry.FAILED_STATUSES:
+                        # failed、not_found、expired 的任务不可能再完成
+                        return fail("任务 %s 失败，状态: %s", task_id, status)
+                    if status == "generating":
+                        clock.running()
+                    if status in PENDING_STATUSES:
+                        logger.debug("任务进行中，状态: %s", status)
+                    else:
+                        logger.warning("未知状态: %s", status)
+                elif retry.classify(response) == retry.TRANSIENT:
+                    logger.warning("查询遇到暂时性错误: %s", result.get("message", "未知错误"))
+                else:
+                    return fail("查询失败: %s", result.get("message", "未知错误"))
+            elif retry.classify(response) == retry.PERMANENT:
+                # 鉴权失败、参数错误等重试无意义，不再等到截止时间
+                return fail("查询失败（不可重试）: %s - %s", response.status_code, log.summarize(response))
+            else:
+                logger.warning("HTTP请求失败: %s - %s", response.status_code, log.summarize(response))
+
+        except task_poller.Defer:
+            # 账号限速中，本次未发出查询，由轮询器稍后重新调度
+            raise
+        except Exception as e:
+            logger.warning("查询异常: %s", e)
+        return task_poller.PENDING
+
+    def on_timeout():
+        logger.error("任务 %s 超过查询截止时间仍未完成", task_id)
+        journal.update(task_id, task_journal.EXPIRED)
+        clock.finish("timeout")
+        return None
+
+    future = task_poller.get_poller().submit(check, poll_session, timeout_result=on_timeout)
+    cancellation.on_cancel(future, lambda: abandon(task_id))
+    return governor.track_task(task_id, clock.track(future))
+
+
+def abandon(task_id):
+    """执行被中断时调用：视觉服务没有取消任务的接口，停止查询并在任务日志中标记为 abandoned"""
+    logger.warning("任务 %s 已停止查询，服务端仍会完成该任务，相同请求再次运行时可以接上", task_id)
+    task_journal.get_journal().update(task_id, task_journal.ABANDONED)
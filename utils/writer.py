@@ -0,0 +1,148 @@
+import atexit
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+
+from . import output_files
+from .config import env_bool, env_int
+from .log import get_logger
+
+logger = get_logger("writer")
+
+# 启用后图片结果在后台写盘，节点预留好文件名后继续处理其他结果，写盘与下载、解码重叠进行
+ASYNC_WRITES = env_bool("ASYNC_WRITES", False)
+WRITER_WORKERS = env_int("WRITER_WORKERS", 2)
+
+# 尚未写盘的数据总量上限，超出时提交方阻塞等待，避免慢速存储上内存无限增长
+MAX_PENDING_BYTES = env_int("WRITER_MAX_PENDING_MB", 256) * 1024 * 1024
+
+
+def _notify(on_saved, path):
+    if on_saved is None:
+        return
+    try:
+        on_saved(path)
+    except Exception as e:
+        logger.error("写入完成回调失败: %s (%s)", path, e)
+
+
+class BackgroundWriter:
+    """
+    有界的后台写盘线程池
+
+    文件名由调用方预先占用（output_files 创建的空文件），数据先写入同目录临时文件再原子替换。
+    写完之前该路径是空的占位文件，路径交给下游之前须调用 wait(path)。进程退出前会等待所有写入完成
+    """
+
+    def __init__(self, workers=WRITER_WORKERS, max_pending_bytes=MAX_PENDING_BYTES):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jm-volcengine-writer")
+        self._cond = threading.Condition()
+        self._max_pending_bytes = max_pending_bytes
+        self._pending_bytes = 0
+        self._pending = {}
+
+    def submit(self, path, data, on_saved=None):
+        """登记一次写入，返回写入完成的 Future；on_saved(path) 在文件写完后于写盘线程中调用"""
+        size = len(data)
+        with self._cond:
+            # 队列为空时单个超大文件也允许提交
+            while self._pending_bytes and self._pending_bytes + size > self._max_pending_bytes:
+                self._cond.wait()
+            self._pending_bytes += size
+            future = self._executor.submit(self._write, path, data, on_saved)
+            self._pending[path] = future
+        future.add_done_callback(lambda f: self._release(path, size))
+        return future
+
+    def _release(self, path, size):
+        with self._cond:
+            self._pending_bytes -= size
+            self._pending.pop(path, None)
+            self._cond.notify_all()
+
+    def _write(self, path, data, on_saved):
+        tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.part")
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error("后台写入失败: %s (%s)", path, e)
+            for leftover in (tmp_path, path):
+                try:
+                    os.remove(leftover)
+                except OSError:
+                    pass
+            raise
+        _notify(on_saved, path)
+        return path
+
+    def wait(self, path, timeout=None):
+        """
+        等待指定文件写完，返回文件是否已完整写入（写入失败或超时为 False）
+
+        文件不在队列中（已写完或从未登记）时立即按文件是否存在返回
+        """
+        with self._cond:
+            future = self._pending.get(path)
+        if future is None:
+            return os.path.exists(path)
+        done, _ = wait_futures([future], timeout)
+        return bool(done) and future.exception() is None
+
+    def flush(self, timeout=None):
+        """等待当前所有写入完成，返回是否全部完成"""
+        with self._cond:
+            futures = list(self._pending.values())
+        if not futures:
+            return True
+        _, not_done = wait_futures(futures, timeout)
+        return not not_done
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def _flush_at_exit():
+    if _writer is not None and not _writer.flush():
+        logger.warning("退出时仍有未完成的后台写入")
+
+
+def get_writer():
+    """获取进程级共享的后台写盘线程池，首次创建时注册退出前的 flush"""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = BackgroundWriter()
+                atexit.register(_flush_at_exit)
+    return _writer
+
+
+def save(directory, prefix, extension, data, on_saved=None):
+    """
+    把 data 保存为输出目录中的新文件并返回路径
+
+    ASYNC_WRITES 关闭时同步写入后返回；开启时先占用文件名，写盘交给后台线程池，
+    调用方可以继续处理其他结果，把路径交给下游之前用 wait(path) 等待写完
+    """
+    if not ASYNC_WRITES:
+        path = output_files.write_new(directory, prefix, extension, data)
+        _notify(on_saved, path)
+        return path
+    path = output_files.allocate(directory, prefix, extension)
+    get_writer().submit(path, data, on_saved)
+    return path
+
+
+def wait(path, timeout=None):
+    """等待 save 返回的文件写完，返回文件是否已完整写入（同步模式下立即返回）"""
+    if _writer is None:
+        return os.path.exists(path)
+    return _writer.wait(path, timeout)
+
+
+def flush(timeout=None):
+    """等待所有后台写入完成，返回是否全部完成"""
+    return _writer.flush(timeout) if _writer is not None else True